@@ -6,11 +6,19 @@ Test suite for Unique Browser
 This file contains unit tests for the Unique Browser application.
 """
 
+import base64
+import hashlib
+import os
 import sys
+import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
-from PyQt5.QtCore import QUrl, Qt
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QByteArray, QUrl, Qt, QEventLoop, QTimer
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkCookie, QNetworkProxy, QNetworkProxyFactory, QNetworkRequest
+from PyQt5.QtWidgets import QApplication, QShortcut
 
 # Set up Qt application properly for testing
 if not QApplication.instance():
@@ -20,7 +28,14 @@ if not QApplication.instance():
 
 # Import the browser module
 try:
-    from unique_browser import UniqueBrowser, QWebEngineView, QLineEdit
+    from unique_browser import (UniqueBrowser, QWebEngineView, QLineEdit, TabSearchIndex, TabTreeModel,
+                                TabTeardownQueue, TabThrottler, FilterEngine, RequestBlocker, NetworkLog, NavigationPredictor,
+                                HttpCachePolicy, QWebEngineProfile, InternalSchemeHandler, OfflineArchive, ProxyManager,
+                                CookieManager, BrowsingDataCleaner, DownloadItem,
+                                DownloadManager, DownloadProgressAggregator, DownloadsPanel, QWebEngineDownloadItem,
+                                SegmentedDownload, DownloadVerifier, ContentDarkMode, QWebEngineScript,
+                                ThemeEngine, SiteZoom, FindBar, QWebEnginePage, QWebEngineContextMenuData,
+                                UserScriptEngine, PluginManager, CustomWebEnginePage)
 except ImportError:
     print("Error: Could not import browser modules. Make sure unique_browser.py is in the same directory.")
     sys.exit(1)
@@ -106,5 +121,1401 @@ class TestUniqueBrowser(unittest.TestCase):
         self.browser.tabs.append(QWebEngineView())
         self.assertEqual(len(self.browser.tabs), initial_tab_count + 1)
 
+    def test_context_menu_from_menu_data(self):
+        """Test that one context menu is built from contextMenuData without clipboard or script calls"""
+        view = MagicMock()
+        data = view.page().contextMenuData()
+        data.isValid.return_value = True
+        data.linkUrl.return_value = QUrl("https://example.com/a")
+        data.mediaType.return_value = QWebEngineContextMenuData.MediaTypeNone
+        data.mediaUrl.return_value = QUrl()
+        data.selectedText.return_value = "hello world"
+        data.isContentEditable.return_value = False
+
+        self.browser.plugins = MagicMock()
+        menu = self.browser.build_context_menu(view, data)
+        self.browser.plugins.dispatch.assert_called_once_with('context_menu', menu, data, view)
+        labels = [action.text() for action in menu.actions() if not action.isSeparator()]
+        self.assertIn("เปิดในแท็บใหม่", labels)
+        self.assertIn('ค้นหา "hello world"', labels)
+        self.assertNotIn("ย้อนกลับ", labels)
+        view.page().triggerAction.assert_not_called()
+        view.page().runJavaScript.assert_not_called()
+
+    @patch('unique_browser.QDataStream')
+    def test_private_tabs_not_remembered(self, mock_stream):
+        """Test that closed private tabs (named private profile) are not kept for undo-close"""
+        self.browser.private_mode = False
+        self.browser.closed_tabs = []
+        normal, private = MagicMock(), MagicMock()
+        normal.page().profile.return_value = QWebEngineProfile.defaultProfile()
+        normal.url.return_value = QUrl("https://example.com/")
+        self.browser.remember_closed_tab(normal)
+        self.browser.remember_closed_tab(private)
+        self.assertEqual([entry['url'] for entry in self.browser.closed_tabs], ["https://example.com/"])
+
+    @patch('unique_browser.UniqueBrowser.add_new_tab')
+    def test_reopen_restores_history_without_loading(self, mock_add_tab):
+        """Test that undo-close creates the tab without a load and lets the history load the page"""
+        view = MagicMock()
+        mock_add_tab.return_value = view
+        self.browser.closed_tabs = [{'url': "https://example.com/", 'title': "Example", 'history': QByteArray()}]
+        with patch('unique_browser.QDataStream') as mock_stream:
+            self.browser.reopen_closed_tab()
+        mock_add_tab.assert_called_once_with(QUrl("https://example.com/"), "Example", load=False)
+        mock_stream.return_value.__rshift__.assert_called_once_with(view.page().history())
+        view.setUrl.assert_not_called()
+
+    def test_swapped_in_page_follows_dark_mode(self):
+        """Test that a prerendered page swapped into a tab is tracked by content dark mode"""
+        for name in ('content_dark_mode', 'tab_index', 'tab_tree', 'plugins', 'user_scripts'):
+            setattr(self.browser, name, MagicMock())
+        browser, page = MagicMock(), MagicMock()
+        with patch.object(self.browser, 'update_urlbar'), patch.object(self.browser, 'on_load_finished'):
+            self.browser.swap_in_page(browser, page)
+        browser.setPage.assert_called_once_with(page)
+        self.browser.content_dark_mode.attach.assert_called_once_with(page)
+
+    def test_swap_adopts_speculative_page(self):
+        """Test that plugins and user scripts first see a prerendered page when it is swapped into a tab"""
+        for name in ('content_dark_mode', 'tab_index', 'tab_tree', 'plugins', 'user_scripts'):
+            setattr(self.browser, name, MagicMock())
+        browser, page = MagicMock(), MagicMock(speculative=True)
+        self.browser.plugins.dispatch.return_value = False
+        self.browser.swap_in_page(browser, page)
+        self.browser.plugins.dispatch.assert_called_once_with(
+            'navigation', page, page.url(), QWebEnginePage.NavigationTypeTyped, True)
+        page.deleteLater.assert_called_once()
+        browser.setPage.assert_not_called()
+
+        self.browser.plugins.dispatch.return_value = True
+        with patch.object(self.browser, 'update_urlbar'), patch.object(self.browser, 'on_load_finished'):
+            self.browser.swap_in_page(browser, page)
+        self.assertIs(page.speculative, False)
+        self.browser.user_scripts.prepare.assert_called_once_with(page, page.url())
+        browser.setPage.assert_called_once_with(page)
+
+class TestTabSearchIndex(unittest.TestCase):
+    """Test cases for the cross-window tab search index"""
+
+    def setUp(self):
+        """Set up an index with a few tabs"""
+        self.index = TabSearchIndex()
+        self.window = MagicMock()
+        self.github = MagicMock()
+        self.docs = MagicMock()
+        self.index.update(self.window, self.github, title="GitHub - AppBrowser", url="https://github.com/Osiragen/AppBrowser")
+        self.index.update(self.window, self.docs, title="Qt Documentation", url="https://doc.qt.io/qt-5/")
+
+    def test_fuzzy_search(self):
+        """Test fuzzy matching on title and URL"""
+        results = self.index.search("gh apb")
+        self.assertEqual(results[0]['browser'], self.github)
+        self.assertEqual(self.index.search("doc.qt")[0]['browser'], self.docs)
+        self.assertEqual(self.index.search("zzz"), [])
+
+    def test_find_by_url(self):
+        """Test finding an already open tab for a typed URL"""
+        entry = self.index.find_by_url("https://DOC.qt.io/qt-5")
+        self.assertEqual(entry['browser'], self.docs)
+        self.assertIsNone(self.index.find_by_url("https://doc.qt.io/qt-5", exclude=self.docs))
+
+    def test_incremental_update(self):
+        """Test that URL changes and removal update the index"""
+        self.index.update(self.window, self.docs, url="https://example.com/")
+        self.assertIsNone(self.index.find_by_url("https://doc.qt.io/qt-5/"))
+        self.index.remove(self.docs)
+        self.assertIsNone(self.index.find_by_url("https://example.com"))
+        self.assertEqual(len(self.index.search("")), 1)
+
+    def test_private_tabs_kept_apart(self):
+        """Test that private tabs are only found from private tabs and never listed for normal ones"""
+        private_window, secret = MagicMock(), MagicMock()
+        self.index.update(private_window, secret, title="Secret GitHub", url="https://github.com/secret", private=True)
+        self.index.update(private_window, secret, title="Secret GitHub page")
+        self.assertIsNone(self.index.find_by_url("https://github.com/secret"))
+        self.assertIs(self.index.find_by_url("https://github.com/secret", private=True)['browser'], secret)
+        self.assertIsNone(self.index.find_by_url("https://doc.qt.io/qt-5/", private=True))
+        self.assertNotIn(secret, [entry['browser'] for entry in self.index.search("github")])
+        self.assertNotIn(secret, [entry['browser'] for entry in self.index.search("")])
+        self.assertEqual([entry['browser'] for entry in self.index.search("github", private=True)], [secret])
+
+class TestTabTreeModel(unittest.TestCase):
+    """Test cases for the vertical tab tree model"""
+
+    def setUp(self):
+        """Set up a parent tab with two children"""
+        self.model = TabTreeModel()
+        self.parent_tab, self.child_a, self.child_b = MagicMock(), MagicMock(), MagicMock()
+        self.model.add_tab(self.parent_tab, "Parent")
+        self.model.add_tab(self.child_a, "Child A", opener=self.parent_tab)
+        self.model.add_tab(self.child_b, "Child B", opener=self.parent_tab)
+
+    def test_group_by_opener(self):
+        """Test that tabs are grouped under their opener"""
+        self.assertEqual(self.model.rowCount(), 1)
+        parent_index = self.model.index_for_browser(self.parent_tab)
+        self.assertEqual(self.model.rowCount(parent_index), 2)
+        self.assertEqual(self.model.parent(self.model.index_for_browser(self.child_b)), parent_index)
+
+    def test_remove_promotes_children(self):
+        """Test that closing a tab moves its children up one level"""
+        self.model.remove_tab(self.parent_tab)
+        self.assertEqual(self.model.rowCount(), 2)
+        self.assertEqual(self.model.browser_at(self.model.index(1, 0)), self.child_b)
+        self.assertEqual(self.model.index_for_browser(self.child_b).row(), 1)
+        self.model.remove_tab(self.child_a)
+        self.assertEqual(self.model.index_for_browser(self.child_b).row(), 0)
+
+    def test_set_title(self):
+        """Test updating a tab title"""
+        self.model.set_title(self.child_a, "Renamed")
+        self.assertEqual(self.model.data(self.model.index_for_browser(self.child_a)), "Renamed")
+
+class TestTabThrottler(unittest.TestCase):
+    """Test cases for the background tab throttling policy"""
+
+    def setUp(self):
+        """Set up a throttler with a one-minute threshold and four tabs"""
+        self.window = MagicMock()
+        self.window.settings = {'throttling': {'freeze_after_minutes': 1}}
+        self.throttler = TabThrottler(self.window)
+        self.lifecycle = patch.object(self.throttler, '_set_lifecycle', return_value=True).start()
+        self.cpu = {}
+        patch.object(self.throttler, '_read_cpu_seconds',
+                     side_effect=lambda page: self.cpu.get(page)).start()
+        self.clock = patch('unique_browser.time.time', return_value=1000.0).start()
+
+        self.idle, self.audio, self.pinned, self.active = [MagicMock() for _ in range(4)]
+        self.idle.page().recentlyAudible.return_value = False
+        self.audio.page().recentlyAudible.return_value = True
+        self.pinned.page().recentlyAudible.return_value = False
+        for tab in (self.idle, self.audio, self.pinned, self.active):
+            self.throttler.tab_activated(tab)
+        self.throttler.toggle_pin(self.pinned)
+
+    def tearDown(self):
+        patch.stopall()
+        self.throttler.timer.stop()
+
+    def check_at(self, now, idle_cpu):
+        self.clock.return_value = now
+        self.cpu[self.idle.page()] = idle_cpu
+        self.throttler.check()
+
+    def test_freeze_after_threshold_with_exemptions(self):
+        """Test that only the silent unpinned tab is frozen, and only after the threshold"""
+        self.check_at(1030.0, 10.0)
+        self.assertEqual(self.throttler.stats()['frozen'], 0)
+        self.check_at(1070.0, 12.0)
+        self.lifecycle.assert_called_with(self.idle.page(), 'Frozen')
+        frozen = [state['browser'] for state in self.throttler.states.values() if state['frozen_since']]
+        self.assertEqual(frozen, [self.idle])
+        self.assertEqual(self.throttler.stats()['pinned'], 1)
+
+    def test_unfreeze_on_activation_counts_cpu_saved(self):
+        """Test that activating a frozen tab wakes it and adds the estimated CPU time saved"""
+        self.check_at(1030.0, 10.0)
+        self.check_at(1070.0, 12.0)
+        self.clock.return_value = 1170.0
+        self.throttler.tab_activated(self.idle)
+        self.lifecycle.assert_called_with(self.idle.page(), 'Active')
+        stats = self.throttler.stats()
+        self.assertEqual(stats['frozen'], 0)
+        # 2 CPU seconds over 40 s sampled = 0.05/s, frozen for 100 s
+        self.assertAlmostEqual(stats['cpu_saved'], 5.0)
+
+class TestTabTeardownQueue(unittest.TestCase):
+    """Test cases for the closed tab teardown queue"""
+
+    def test_detach_and_batch_release(self):
+        """Test that tabs are stopped at once and released in small batches"""
+        queue = TabTeardownQueue(batch_size=2)
+        tabs = [MagicMock() for _ in range(5)]
+        for tab in tabs:
+            queue.enqueue(tab)
+            tab.stop.assert_called_once()
+            tab.page().setAudioMuted.assert_called_with(True)
+
+        queue.process_batch()
+        self.assertEqual(len(queue.pending), 3)
+        tabs[0].deleteLater.assert_called_once()
+        tabs[2].deleteLater.assert_not_called()
+
+        queue.process_batch()
+        queue.process_batch()
+        self.assertEqual(len(queue.pending), 0)
+        self.assertFalse(queue.timer.isActive())
+
+class TestFilterEngine(unittest.TestCase):
+    """Test cases for the EasyList request filtering engine"""
+
+    def setUp(self):
+        """Set up an engine with a small filter list"""
+        self.engine = FilterEngine()
+        self.engine.load_lines([
+            "! comment",
+            "example.com##.ad-banner",
+            "||doubleclick.net^",
+            "||tracker.io^$third-party",
+            "/banner/*/ads_",
+            "&adtype=$script",
+            "@@||good.com/banner/"
+        ])
+
+    def test_domain_rules(self):
+        """Test domain rules match subdomains and respect third-party"""
+        self.assertTrue(self.engine.should_block("https://ad.doubleclick.net/x.js", "script", "https://news.com/"))
+        self.assertTrue(self.engine.should_block("https://tracker.io/p.gif", "image", "https://news.com/"))
+        self.assertFalse(self.engine.should_block("https://tracker.io/p.gif", "image", "https://tracker.io/"))
+
+    def test_substring_rules(self):
+        """Test wildcard substring rules, type options and exceptions"""
+        self.assertTrue(self.engine.should_block("https://cdn.com/banner/300/ads_1.png", "image"))
+        self.assertFalse(self.engine.should_block("https://good.com/banner/300/ads_1.png", "image"))
+        self.assertTrue(self.engine.should_block("https://x.com/q?a=1&adtype=2", "script"))
+        self.assertFalse(self.engine.should_block("https://x.com/q?a=1&adtype=2", "image"))
+        self.assertFalse(self.engine.should_block("https://example.org/app.js", "script"))
+
+    def test_skipped_rules(self):
+        """Test that cosmetic rules and comments are not counted"""
+        self.assertEqual(self.engine.rule_count, 5)
+
+    def test_leaf_states_cached_once(self):
+        """Test that states with no edges are cached as empty and not decoded again"""
+        rules = self.engine.block
+        url = "https://cdn.com/banner/300/ads_1.png"
+        rules.candidates(url)
+        cached = rules.cached_states
+        self.assertIn({}, rules.edge_cache)
+        for _ in range(3):
+            rules.candidates(url)
+        self.assertEqual(rules.cached_states, cached)
+
+    def test_cache_round_trip(self):
+        """Test the memory-mapped cache matches the compiled engine and rejects stale signatures"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "filters.cache")
+            self.engine.save(path, b"a" * 32)
+            self.assertIsNone(FilterEngine.load(path, b"b" * 32))
+
+            cached = FilterEngine.load(path, b"a" * 32)
+            self.assertEqual(cached.rule_count, 5)
+            for url, resource_type, first_party in [
+                    ("https://ad.doubleclick.net/x.js", "script", "https://news.com/"),
+                    ("https://tracker.io/p.gif", "image", "https://tracker.io/"),
+                    ("https://cdn.com/banner/300/ads_1.png", "image", ""),
+                    ("https://good.com/banner/300/ads_1.png", "image", ""),
+                    ("https://x.com/q?a=1&adtype=2", "script", "")]:
+                self.assertEqual(cached.should_block(url, resource_type, first_party),
+                                 self.engine.should_block(url, resource_type, first_party))
+            del cached
+
+class TestRequestBlocker(unittest.TestCase):
+    """Test cases for the request interceptor installed on each profile"""
+
+    def setUp(self):
+        """Set up a blocker that blocks every request and does not log"""
+        self.blocker = RequestBlocker()
+        self.blocker.engine = MagicMock()
+        self.blocker.engine.should_block.return_value = True
+        self.blocker.network_log = MagicMock(enabled=False)
+
+    def make_profile(self):
+        profile = MagicMock()
+        properties = {}
+        profile.property.side_effect = properties.get
+        profile.setProperty.side_effect = properties.__setitem__
+        return profile
+
+    def test_installed_once_per_profile(self):
+        """Test that the installed flag lives on the profile itself rather than its id"""
+        first, second = self.make_profile(), self.make_profile()
+        for profile in (first, second, first):
+            self.blocker.install(profile)
+        first.setUrlRequestInterceptor.assert_called_once_with(self.blocker)
+        second.setUrlRequestInterceptor.assert_called_once_with(self.blocker)
+
+    def test_private_requests_not_logged(self):
+        """Test that private profiles get an interceptor that filters but keeps requests out of the HAR log"""
+        self.blocker.network_log.enabled = True
+        normal, private = self.make_profile(), self.make_profile()
+        self.blocker.install(normal)
+        self.blocker.install(private, private=True)
+        private_interceptor = private.setUrlRequestInterceptor.call_args[0][0]
+        self.assertIsNot(private_interceptor, self.blocker)
+
+        info = MagicMock()
+        info.resourceType.return_value = 5
+        private_interceptor.interceptRequest(info)
+        info.block.assert_called_once_with(True)
+        self.blocker.network_log.record.assert_not_called()
+        self.blocker.interceptRequest(info)
+        self.blocker.network_log.record.assert_called_once()
+
+    def test_request_plugins_see_allowed_requests(self):
+        """Test that on_request runs after the filters and only for requests they let through"""
+        self.blocker.plugins = MagicMock()
+        info = MagicMock()
+        info.resourceType.return_value = 5
+        self.blocker.handle(info, False)
+        info.block.assert_called_once_with(True)
+        self.blocker.plugins.dispatch.assert_not_called()
+
+        self.blocker.engine.should_block.return_value = False
+        self.blocker.handle(info, False)
+        self.blocker.plugins.dispatch.assert_called_once_with('request', info)
+
+    def test_blocked_counts_are_bounded(self):
+        """Test that per-page blocked counts keep only the most recent pages"""
+        for number in range(RequestBlocker.MAX_COUNTED_PAGES + 10):
+            info = MagicMock()
+            info.resourceType.return_value = 5
+            info.firstPartyUrl().toString.return_value = f"https://site{number}.test/"
+            self.blocker.interceptRequest(info)
+            info.block.assert_called_once_with(True)
+        self.assertEqual(len(self.blocker.counts), RequestBlocker.MAX_COUNTED_PAGES)
+        self.assertNotIn("https://site0.test/", self.blocker.counts)
+        self.assertEqual(self.blocker.blocked_count(QUrl("https://site265.test/")), 1)
+
+class TestNetworkLog(unittest.TestCase):
+    """Test cases for the network request log and HAR export"""
+
+    def setUp(self):
+        """Set up a log with a page load"""
+        self.log = NetworkLog(capacity=3)
+        self.log.record("https://news.com/", "document", "https://news.com/")
+        self.log.record("https://cdn.com/app.js", "script", "https://news.com/")
+        self.log.record("https://ads.com/x.js", "script", "https://news.com/", blocked=True)
+
+    def test_ring_buffer(self):
+        """Test that the oldest requests are dropped when the log is full"""
+        self.log.record("https://other.com/", "document", "https://other.com/")
+        self.assertEqual(len(self.log), 3)
+        self.assertEqual(self.log.records[0]['url'], "https://cdn.com/app.js")
+
+    def test_timing_and_har(self):
+        """Test merging Resource Timing entries and exporting HAR"""
+        self.log.add_timing("News", {
+            'origin': 1700000000000.0,
+            'document': "https://news.com/",
+            'entries': [{'name': "https://cdn.com/app.js", 'entryType': "resource", 'startTime': 100.0,
+                         'duration': 50.0, 'domainLookupStart': 101.0, 'domainLookupEnd': 105.0,
+                         'connectStart': 105.0, 'connectEnd': 120.0, 'requestStart': 120.0,
+                         'responseStart': 140.0, 'responseEnd': 150.0, 'nextHopProtocol': "h2"}]
+        })
+        har = self.log.to_har()['log']
+        self.assertEqual(har['version'], "1.2")
+        self.assertEqual(har['pages'][0]['title'], "News")
+        script = har['entries'][1]
+        self.assertEqual(script['timings']['dns'], 4.0)
+        self.assertEqual(script['timings']['wait'], 20.0)
+        self.assertEqual(script['request']['httpVersion'], "h2")
+        self.assertEqual(script['startedDateTime'], "2023-11-14T22:13:20.100Z")
+        self.assertTrue(har['entries'][2]['_blocked'])
+
+    def test_cache_stats(self):
+        """Test cache hit estimates from transfer sizes"""
+        for record, transfer in zip(self.log.records, (0, 300, 5000)):
+            record['timing'] = {'transferSize': transfer, 'encodedBodySize': 4000, 'decodedBodySize': 9000}
+        stats = self.log.cache_stats()
+        self.assertEqual((stats['hits'], stats['revalidated'], stats['misses']), (1, 1, 1))
+        self.assertEqual(stats['saved_bytes'], 8000)
+
+class TestNavigationPredictor(unittest.TestCase):
+    """Test cases for the history-driven navigation predictor"""
+
+    def setUp(self):
+        """Set up a predictor trained on a short history"""
+        window = MagicMock()
+        window.settings = {}
+        self.predictor = NavigationPredictor(window)
+        history = []
+        for i in range(10):
+            history.append({'url': "https://news.com/", 'timestamp': i * 100})
+            history.append({'url': "https://github.com/Osiragen/AppBrowser", 'timestamp': i * 100 + 10})
+        history.append({'url': "https://gitlab.com/", 'timestamp': 5000})
+        self.predictor.load_history(history)
+
+    def test_speculative_pages_skip_plugins_and_scripts(self):
+        """Test that prerender pages do not run navigation plugins or install user scripts"""
+        with patch('unique_browser.CustomWebEnginePage'):
+            self.assertIs(self.predictor._spare_page(QWebEngineProfile.defaultProfile()).speculative, True)
+        self.predictor.spare = None
+
+        page = CustomWebEnginePage(QWebEngineProfile.defaultProfile())
+        page.speculative = True
+        url = QUrl("https://github.com/")
+        with patch('unique_browser.PluginManager.shared') as plugins, \
+                patch('unique_browser.UserScriptEngine.shared') as scripts, \
+                patch.object(QWebEnginePage, 'acceptNavigationRequest', return_value=True):
+            self.assertTrue(page.acceptNavigationRequest(url, QWebEnginePage.NavigationTypeTyped, True))
+            plugins.return_value.dispatch.assert_not_called()
+            scripts.return_value.prepare.assert_not_called()
+            page.speculative = False
+            self.assertTrue(page.acceptNavigationRequest(url, QWebEnginePage.NavigationTypeTyped, True))
+            plugins.return_value.dispatch.assert_called_once()
+            scripts.return_value.prepare.assert_called_once_with(page, url)
+
+    def test_transition_confidence(self):
+        """Test that transitions from the current origin raise confidence"""
+        from_news = self.predictor.predict("https://news.com/", "git")[0]
+        self.assertEqual(from_news['origin'], "https://github.com")
+        self.assertEqual(from_news['url'], "https://github.com/Osiragen/AppBrowser")
+        self.assertGreater(from_news['url_confidence'], 0.8)
+        self.assertLess(self.predictor.predict("https://other.com/", "git")[0]['confidence'], 0.8)
+        self.assertEqual(self.predictor.predict("https://news.com/", "gitl")[0]['origin'], "https://gitlab.com")
+        self.assertEqual(self.predictor.predict("https://news.com/", "git hub"), [])
+
+    def test_metrics(self):
+        """Test hit and miss accounting on navigation"""
+        self.predictor.preconnected = {"https://github.com": 0, "https://gitlab.com": 0}
+        self.predictor.navigated("https://news.com/", "https://github.com/", remember=False)
+        stats = self.predictor.stats()
+        self.assertEqual((stats['preconnect_hits'], stats['preconnect_misses']), (1, 1))
+        self.assertEqual(self.predictor.visits["https://github.com"], 10)
+
+    def test_prerendered_page_stays_in_its_profile(self):
+        """Test that a prerendered page is only handed to a tab of the same profile"""
+        default_profile, private_profile = MagicMock(), MagicMock()
+        self.predictor.spare = MagicMock()
+        self.predictor.spare.profile.return_value = default_profile
+        self.predictor.spare_url = "https://github.com/Osiragen/AppBrowser"
+        self.assertIsNone(self.predictor.take_prerendered(self.predictor.spare_url, private_profile))
+        spare = self.predictor.spare
+        self.assertIs(self.predictor.take_prerendered(self.predictor.spare_url, default_profile), spare)
+
+    def test_no_speculation_in_private_tabs(self):
+        """Test that typing in a private tab does not preconnect or prerender"""
+        window = self.predictor.window
+        window.is_private_browser.return_value = True
+        window.url_bar.text.return_value = "git"
+        window.current_browser().url.return_value = QUrl("https://news.com/")
+        with patch.object(self.predictor, 'prerender') as prerender, \
+                patch.object(self.predictor, 'preconnect') as preconnect:
+            self.predictor.speculate()
+            window.is_private_browser.return_value = False
+            self.predictor.speculate()
+        prerender.assert_called_once()
+        preconnect.assert_not_called()
+
+class TestHttpCachePolicy(unittest.TestCase):
+    """Test cases for the per-profile HTTP cache policy"""
+
+    def make_profile(self, name="Default"):
+        """Create a mock profile that has no policy applied yet"""
+        profile = MagicMock()
+        profile.property.return_value = None
+        profile.storageName.return_value = name
+        profile.isOffTheRecord.return_value = False
+        return profile
+
+    def test_apply_policy(self):
+        """Test disk cache for normal profiles and a capped memory cache for private ones"""
+        with tempfile.TemporaryDirectory() as directory:
+            policy = HttpCachePolicy()
+            policy.configure({'disk_cache_mb': 64, 'path': directory})
+            profile = self.make_profile()
+            policy.apply(profile)
+            profile.setHttpCacheType.assert_called_with(QWebEngineProfile.DiskHttpCache)
+            profile.setCachePath.assert_called_with(os.path.join(directory, "Default"))
+            profile.setHttpCacheMaximumSize.assert_called_with(64 * 1024 * 1024)
+
+            private = self.make_profile("PrivateProfile")
+            policy.apply(private, private=True)
+            private.setHttpCacheType.assert_called_with(QWebEngineProfile.MemoryHttpCache)
+            private.setHttpCacheMaximumSize.assert_called_with(32 * 1024 * 1024)
+            private.setCachePath.assert_not_called()
+
+    def test_disk_usage(self):
+        """Test counting cache entries and on-disk size"""
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "Cache"))
+            for name, size in (("0123456789abcdef_0", 100), ("0123456789abcdef_1", 50), ("index", 10)):
+                with open(os.path.join(directory, "Cache", name), "wb") as f:
+                    f.write(b"x" * size)
+            profile = self.make_profile()
+            profile.cachePath.return_value = directory
+            self.assertEqual(HttpCachePolicy().disk_usage(profile), (160, 1))
+
+class TestInternalSchemeHandler(unittest.TestCase):
+    """Test cases for the unique:// internal pages"""
+
+    def setUp(self):
+        """Set up a handler and a window with some history"""
+        self.handler = InternalSchemeHandler()
+        self.window = MagicMock()
+        self.window.settings = {'history': [{'url': f"https://site{i}.com/", 'title': f"Site {i}", 'timestamp': i}
+                                            for i in range(250)]}
+
+    def test_pagination(self):
+        """Test newest-first paging through the history store"""
+        first = self.handler.query('history', self.window, offset=0, limit=100)
+        self.assertEqual(first['total'], 250)
+        self.assertEqual(first['next'], 100)
+        self.assertEqual(first['items'][0]['title'], "Site 249")
+        last = self.handler.query('history', self.window, offset=200, limit=100)
+        self.assertEqual(len(last['items']), 50)
+        self.assertIsNone(last['next'])
+
+    def test_search_and_render(self):
+        """Test filtered paging and the cached page template"""
+        with patch.object(self.handler, 'format_time', return_value="") as format_time:
+            result = self.handler.query('history', self.window, offset=1, limit=5, text="SITE2")
+        self.assertEqual(result['total'], 61)
+        # only the rows of the requested page are turned into items
+        self.assertEqual(format_time.call_count, 5)
+        self.assertEqual(result['items'][0]['title'], "Site 248")
+        page = self.handler.render('history')
+        self.assertIn("ประวัติการเข้าชม".encode('utf-8'), page)
+        self.assertIs(self.handler.render('history'), page)
+
+class TestOfflineArchive(unittest.TestCase):
+    """Test cases for the content-addressed offline archive"""
+
+    @staticmethod
+    def make_mhtml(html, saved=b'Mon, 1 Jan 2024 10:00:00 -0000', frame=b'1'):
+        """Build a small MHTML document with a page and a shared image, stamped like one Chromium save"""
+        return (b'From: <Saved by Blink>\r\n'
+                b'Snapshot-Content-Location: https://example.com/\r\n'
+                b'Date: ' + saved + b'\r\n'
+                b'MIME-Version: 1.0\r\n'
+                b'Content-Type: multipart/related;\r\n\ttype="text/html";\r\n\tboundary="----B----"\r\n\r\n'
+                b'------B----\r\nContent-Type: text/html\r\nContent-ID: <frame-' + frame + b'@mhtml.blink>\r\n'
+                b'Content-Location: https://example.com/\r\n'
+                b'Content-Transfer-Encoding: quoted-printable\r\n\r\n' + html + b'\r\n'
+                b'------B----\r\nContent-Type: image/png\r\nContent-Location: https://example.com/logo.png\r\n'
+                b'Content-Transfer-Encoding: base64\r\n\r\nAAECAwQFBgcICQ==\r\n'
+                b'------B------\r\n')
+
+    def test_dedup_and_assemble(self):
+        """Test that shared resources are stored once and pages reassemble"""
+        with tempfile.TemporaryDirectory() as directory:
+            archive = OfflineArchive(root=directory)
+            first, first_new = archive.ingest(self.make_mhtml(b'<p>one</p>'), "https://example.com/", "One")
+            second, second_new = archive.ingest(self.make_mhtml(b'<p>two</p>'), "https://example.com/two", "Two")
+            self.assertEqual(first['parts'], 2)
+            self.assertLess(second_new, first_new)
+            self.assertEqual(len(OfflineArchive(root=directory).list_entries()), 2)
+
+            path = archive.assemble(second['id'])
+            with open(path, 'rb') as f:
+                reassembled = f.read()
+            entry, new_bytes = archive.ingest(reassembled, "https://example.com/two", "Two")
+            self.assertEqual(entry['id'], second['id'])
+            self.assertEqual(new_bytes, 0)
+
+    def test_resave_unchanged_page(self):
+        """Test that saving the same page again updates its entry instead of adding a new one"""
+        with tempfile.TemporaryDirectory() as directory:
+            archive = OfflineArchive(root=directory)
+            first, _ = archive.ingest(self.make_mhtml(b'<p>one</p>'), "https://example.com/", "One")
+            again, new_bytes = archive.ingest(
+                self.make_mhtml(b'<p>one</p>', b'Tue, 2 Jan 2024 11:30:00 -0000', b'2'), "https://example.com/", "One")
+            self.assertEqual(again['id'], first['id'])
+            self.assertEqual(new_bytes, 0)
+            self.assertEqual(len(OfflineArchive(root=directory).list_entries()), 1)
+
+            with open(archive.assemble(again['id']), 'rb') as f:
+                reassembled = f.read()
+            self.assertIn(b'Date: Tue, 2 Jan 2024 11:30:00 -0000\r\n', reassembled)
+            self.assertIn(b'Content-ID: <frame-2@mhtml.blink>\r\n', reassembled)
+
+class StandInProxyHandler(BaseHTTPRequestHandler):
+    """Answers every request itself, like a forward proxy that never goes upstream"""
+
+    def do_GET(self):
+        body = f"proxied {self.path}".encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestProxyManager(unittest.TestCase):
+    """Test cases for PAC evaluation and proxy resolution"""
+
+    def setUp(self):
+        """Start a local stand-in proxy and write a PAC script that points at it"""
+        self.server = HTTPServer(('127.0.0.1', 0), StandInProxyHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.pac_path = os.path.join(self.directory.name, 'proxy.pac')
+        with open(self.pac_path, 'w', encoding='utf-8') as f:
+            f.write('function FindProxyForURL(url, host) {\n'
+                    '  if (isPlainHostName(host) || dnsDomainIs(host, ".local")) return "DIRECT";\n'
+                    '  if (shExpMatch(host, "*.test")) return "PROXY 127.0.0.1:%d; DIRECT";\n'
+                    '  return "SOCKS5 10.0.0.1:1080";\n'
+                    '}\n' % self.server.server_port)
+        self.manager = ProxyManager()
+        self.manager.configure({'mode': 'pac', 'pac_url': self.pac_path})
+
+    def tearDown(self):
+        QNetworkProxy.setApplicationProxy(QNetworkProxy(QNetworkProxy.DefaultProxy))
+        QNetworkProxyFactory.setUseSystemConfiguration(True)
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test_resolution_is_cached_per_host(self):
+        """Test PAC results, proxy parsing and the per-host TTL cache"""
+        proxies = self.manager.resolve(QUrl("http://site.test/a"))
+        self.assertEqual(proxies[0].type(), QNetworkProxy.HttpProxy)
+        self.assertEqual(proxies[0].port(), self.server.server_port)
+        self.assertEqual(proxies[1].type(), QNetworkProxy.NoProxy)
+        self.manager.resolve(QUrl("http://site.test/b?q=1"))
+        self.assertEqual(self.manager.stats['misses'], 1)
+        self.assertEqual(self.manager.stats['hits'], 1)
+        self.assertEqual(self.manager.resolve(QUrl("http://intranet/"))[0].type(), QNetworkProxy.NoProxy)
+        self.assertEqual(self.manager.resolve(QUrl("https://example.com/"))[0].type(), QNetworkProxy.Socks5Proxy)
+
+        self.manager.settings['pac_cache_ttl'] = 0
+        self.manager.resolve(QUrl("http://other.test/"))
+        self.manager.resolve(QUrl("http://other.test/"))
+        self.assertEqual(self.manager.stats['misses'], 5)
+
+    def test_remote_pac_fetched_in_background(self):
+        """Test that a remote PAC script is fetched off the calling thread and cached for the next start"""
+        with open(self.pac_path, 'r', encoding='utf-8') as f:
+            script = f.read()
+        release = threading.Event()
+        cache_path = os.path.join(self.directory.name, 'proxy_pac.json')
+        with patch.object(ProxyManager, 'pac_cache_path', return_value=cache_path):
+            manager = ProxyManager()
+            with patch.object(manager, 'load_pac', side_effect=lambda location: release.wait(5) and script):
+                manager.configure({'mode': 'pac', 'pac_url': "http://pac.invalid/proxy.pac"})
+                self.assertEqual(manager.resolve(QUrl("http://site.test/"))[0].type(), QNetworkProxy.NoProxy)
+                release.set()
+                manager.fetch_thread.join(5)
+            self.assertEqual(manager.resolve(QUrl("http://site.test/"))[0].type(), QNetworkProxy.HttpProxy)
+            self.assertEqual(ProxyManager().cached_pac("http://pac.invalid/proxy.pac"), script)
+
+    def test_requests_go_through_stand_in_proxy(self):
+        """Test that Qt network requests are routed by the installed PAC factory"""
+        self.manager.apply()
+        manager = QNetworkAccessManager()
+        reply = manager.get(QNetworkRequest(QUrl("http://site.test/page")))
+        loop = QEventLoop()
+        reply.finished.connect(loop.quit)
+        QTimer.singleShot(5000, loop.quit)
+        loop.exec_()
+        self.assertEqual(bytes(reply.readAll()), b"proxied http://site.test/page")
+
+class TestCookieManager(unittest.TestCase):
+    """Test cases for the domain-indexed cookie manager"""
+
+    def setUp(self):
+        """Set up a manager fed with cookies from several sites"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = CookieManager(path=os.path.join(self.directory.name, 'ages.json'))
+        self.manager.store = MagicMock()
+        for domain, name in [('.example.com', b'a'), ('www.example.com', b'b'), ('.ads.tracker.net', b'id'),
+                             ('cdn.tracker.net', b'id'), ('192.168.1.1', b'session')]:
+            cookie = QNetworkCookie(name, b'value')
+            cookie.setDomain(domain)
+            cookie.setPath('/')
+            self.manager.cookie_added(cookie)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_index_and_removal(self):
+        """Test that cookies are grouped by site and kept in sync with the store"""
+        counts = dict(self.manager.site_counts())
+        self.assertEqual(counts['example.com'], 2)
+        self.assertEqual(counts['tracker.net'], 2)
+        self.assertEqual(counts['192.168.1.1'], 1)
+        self.assertEqual([site for site, _ in self.manager.site_counts('track')], ['tracker.net'])
+
+        key, cookie, _ = self.manager.cookies_for('tracker.net')[0]
+        self.manager.cookie_removed(cookie)
+        self.assertEqual(len(self.manager.cookies_for('tracker.net')), 1)
+        self.assertNotIn(key, self.manager.first_seen)
+
+    def test_bulk_delete_by_pattern_and_age(self):
+        """Test deleting by domain pattern and by first-seen age"""
+        keys = self.manager.keys_matching('ads.*')
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(len(self.manager.keys_matching('*.tracker.net')), 2)
+        self.assertEqual(self.manager.delete(keys), 1)
+        self.manager.delete_batch()
+        self.manager.store.deleteCookie.assert_called_once()
+
+        old = self.manager.cookies_for('example.com')[0][0]
+        self.manager.first_seen[old] -= 40 * 86400
+        self.assertEqual(self.manager.keys_older_than(30 * 86400), [old])
+        self.manager.save_ages(prune=True)
+        self.assertEqual(len(CookieManager(path=self.manager.path).first_seen), len(self.manager))
+
+    def test_initial_load_has_unknown_age(self):
+        """Test that cookies read from the store on first attach are kept out of time-ranged clears"""
+        manager = CookieManager(path=os.path.join(self.directory.name, 'fresh.json'))
+        manager.attach(MagicMock())
+        self.assertTrue(manager.loading)
+        existing = QNetworkCookie(b'existing', b'value')
+        existing.setDomain('.example.com')
+        manager.cookie_added(existing)
+        QApplication.processEvents()
+        self.assertFalse(manager.loading)
+
+        added = QNetworkCookie(b'added', b'value')
+        added.setDomain('.example.com')
+        manager.cookie_added(added)
+        self.assertEqual(manager.keys_seen_since(time.time() - 3600), [manager.key(added)])
+        self.assertEqual(manager.keys_older_than(-60), [manager.key(added)])
+        self.assertEqual(len(manager.keys_seen_since(0)), 2)
+
+class TestBrowsingDataCleaner(unittest.TestCase):
+    """Test cases for the time-ranged browsing data cleaner"""
+
+    def setUp(self):
+        """Set up a window with a large history, one entry every 20 seconds"""
+        now = int(time.time())
+        self.window = MagicMock()
+        self.window.settings = {'history': [{'url': f"https://site{i % 50}.com/{i}", 'title': str(i),
+                                             'timestamp': now - (8000 - i) * 20 + 10} for i in range(8000)]}
+        self.window.download_manager = DownloadManager()
+        for path, start_time in [('/tmp/old', now - 86400), ('/tmp/new', now - 60)]:
+            item = DownloadItem("https://example.com/file", path)
+            item.state, item.start_time = 'completed', start_time
+            self.window.download_manager.items.append(item)
+        self.window.cookie_manager.pending = []
+        self.profile = MagicMock()
+        self.cleaner = BrowsingDataCleaner(self.window, self.profile)
+        self.cleaner.BATCH_SIZE = 500
+
+    def run_cleaner(self, types, seconds):
+        """Run the cleaner to completion and return its summary and progress updates"""
+        updates, summary = [], []
+        self.cleaner.progress.connect(lambda text, value: updates.append(value))
+        loop = QEventLoop()
+        self.cleaner.finished.connect(summary.append)
+        self.cleaner.finished.connect(loop.quit)
+        self.assertTrue(self.cleaner.start(types, seconds))
+        QTimer.singleShot(5000, loop.quit)
+        loop.exec_()
+        return summary, updates
+
+    def test_time_range_in_batches(self):
+        """Test that only data inside the range is removed, batch by batch"""
+        summary, updates = self.run_cleaner(['history', 'downloads', 'visited_links'], 3600)
+        self.assertEqual(len(summary), 1)
+        self.assertFalse(self.cleaner.running())
+        history = self.window.settings['history']
+        self.assertEqual(len(history), 8000 - 180)
+        self.assertTrue(all(item['timestamp'] < time.time() - 3600 for item in history))
+        self.assertEqual([d.path for d in self.window.download_manager.items], ['/tmp/old'])
+        self.window.predictor.load_history.assert_called_once_with(history)
+        self.assertGreater(len(updates), 16)
+        self.assertEqual(updates, sorted(updates))
+        cleared = self.profile.clearVisitedLinks.call_args[0][0]
+        self.assertEqual(len(cleared), 180)
+
+    def test_clear_everything(self):
+        """Test the all-time range for cookies, cache and visited links"""
+        self.window.cookie_manager.keys_seen_since.return_value = ['a', 'b']
+        self.window.cookie_manager.delete.return_value = 2
+        summary, _ = self.run_cleaner(['cookies', 'cache', 'visited_links'], None)
+        self.window.cookie_manager.keys_seen_since.assert_called_once_with(0)
+        self.profile.clearHttpCache.assert_called_once()
+        self.profile.clearAllVisitedLinks.assert_called_once()
+        self.assertEqual(self.window.settings['history'][0]['title'], "0")
+        self.assertIn("ลิงก์ที่เคยเข้าชม", summary[0])
+
+    def test_history_added_while_clearing_is_kept(self):
+        """Test that an entry appended between two batches survives the clear"""
+        history = self.window.settings['history']
+        entry = {'url': "https://new.test/", 'title': "new", 'timestamp': int(time.time())}
+        self.cleaner.progress.connect(lambda text, value: entry not in history and history.append(entry))
+        self.run_cleaner(['history'], 3600)
+        self.assertIs(self.window.settings['history'][-1], entry)
+        self.assertEqual(len(self.window.settings['history']), 8000 - 180 + 1)
+
+class TestDownloadManager(unittest.TestCase):
+    """Test cases for the download queue"""
+
+    def setUp(self):
+        """Set up a manager with a temporary download folder"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = DownloadManager()
+        self.manager.configure({'max_concurrent': 2, 'per_host': 1}, self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_item(self, url, name):
+        """Create a queued item backed by a mock WebEngine download"""
+        job = MagicMock()
+        job.isPaused.return_value = False
+        job.state.return_value = QWebEngineDownloadItem.DownloadCompleted
+        job.receivedBytes.return_value = 100
+        return DownloadItem(url, self.manager.unique_path(name), job)
+
+    def test_conflict_free_names(self):
+        """Test that existing files and in-flight downloads get distinct names"""
+        open(os.path.join(self.directory.name, 'file.zip'), 'w').close()
+        first = self.make_item("https://a.com/file.zip", "file.zip")
+        self.manager.add(first)
+        self.assertEqual(os.path.basename(first.path), "file (1).zip")
+        self.assertEqual(os.path.basename(self.manager.unique_path("file.zip")), "file (2).zip")
+        self.assertEqual(os.path.basename(self.manager.unique_path("../x.tar.gz")), "x.tar.gz")
+        open(os.path.join(self.directory.name, 'x.tar.gz'), 'w').close()
+        self.assertEqual(os.path.basename(self.manager.unique_path("x.tar.gz")), "x (1).tar.gz")
+
+    def test_global_and_per_host_limits(self):
+        """Test that the queue respects both limits and starts the next item when one finishes"""
+        a1 = self.make_item("https://a.com/1", "1")
+        a2 = self.make_item("https://a.com/2", "2")
+        b1 = self.make_item("https://b.com/1", "3")
+        c1 = self.make_item("https://c.com/1", "4")
+        for item in (a1, a2, b1, c1):
+            self.manager.add(item)
+        self.assertEqual([i.state for i in (a1, a2, b1, c1)], ['downloading', 'queued', 'downloading', 'queued'])
+        a2.job.pause.assert_called_once()
+
+        a2.job.isPaused.return_value = True
+        self.manager.job_finished(a1)
+        self.assertEqual(a1.state, 'completed')
+        self.assertEqual(a2.state, 'downloading')
+        a2.job.resume.assert_called_once()
+        self.assertEqual(c1.state, 'queued')
+
+    def test_throughput_and_eta(self):
+        """Test the smoothed speed and remaining time estimate"""
+        item = DownloadItem("https://a.com/big.iso", "/tmp/big.iso")
+        item.sample = (time.monotonic() - 1.0, 0)
+        item.update(1000, 5000)
+        self.assertAlmostEqual(item.speed, 1000, delta=50)
+        self.assertAlmostEqual(item.eta(), 4, delta=0.3)
+        item.state, item.speed = 'downloading', 1000.0
+        self.assertEqual(DownloadManager().describe(item), "1000 B / 4.9 KB • 1000 B/s • เหลือ 4 วินาที")
+
+class RangeFileHandler(BaseHTTPRequestHandler):
+    """Serves a fixed payload with Range support, slowly enough to pause mid-download"""
+
+    payload = bytes(range(256)) * 4096
+    ranges = []
+    # (Host, Cookie) of every request
+    cookies = []
+
+    def do_GET(self):
+        RangeFileHandler.cookies.append((self.headers.get('Host', '').split(':')[0], self.headers.get('Cookie')))
+        if self.path.startswith('/gone'):
+            self.send_error(404)
+            return
+        if self.path.startswith('/moved'):
+            self.send_response(302)
+            self.send_header('Location', f"http://localhost:{self.server.server_port}/file.bin")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        header = self.headers.get('Range', '')
+        start, end = 0, len(self.payload) - 1
+        if header.startswith('bytes='):
+            first, _, last = header[6:].partition('-')
+            start, end = int(first), int(last) if last else end
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(self.payload)}")
+        else:
+            self.send_response(200)
+        RangeFileHandler.ranges.append((start, end))
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        try:
+            for offset in range(start, end + 1, 16384):
+                self.wfile.write(self.payload[offset:min(offset + 16384, end + 1)])
+                time.sleep(0.002)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+class TestSegmentedDownload(unittest.TestCase):
+    """Test cases for the parallel Range downloader against a local server"""
+
+    def setUp(self):
+        """Start a local Range-capable server and a temporary download folder"""
+        RangeFileHandler.ranges = []
+        RangeFileHandler.cookies = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeFileHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/file.bin"
+        self.path = os.path.join(self.directory.name, 'file.bin')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def make_job(self, job):
+        job.MIN_SEGMENT = 64 * 1024
+        job.SAVE_INTERVAL = 0
+        return job
+
+    def wait(self, job, condition=None):
+        """Run the event loop until the job finishes or the condition holds"""
+        loop = QEventLoop()
+        job.finished.connect(loop.quit)
+        if condition:
+            job.downloadProgress.connect(lambda *args: condition() and loop.quit())
+        QTimer.singleShot(10000, loop.quit)
+        loop.exec_()
+
+    def test_parallel_segments(self):
+        """Test that the file is split into ranges and reassembled byte for byte"""
+        job = self.make_job(SegmentedDownload(self.url, self.path, segments=4))
+        job.resume()
+        self.wait(job)
+        self.assertEqual(job.state(), QWebEngineDownloadItem.DownloadCompleted)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), RangeFileHandler.payload)
+        self.assertGreaterEqual(len(RangeFileHandler.ranges), 4)
+        self.assertFalse(os.path.exists(job.part_path()) or os.path.exists(job.state_path()))
+        digest, hashed = job.checksum_state()
+        self.assertGreater(hashed, 0)
+        self.assertEqual(digest.hexdigest(), hashlib.sha256(RangeFileHandler.payload[:hashed]).hexdigest())
+
+    def test_resume_from_saved_state(self):
+        """Test that a paused download resumes from its state file with only the missing ranges"""
+        job = self.make_job(SegmentedDownload(self.url, self.path, segments=4))
+        job.resume()
+        self.wait(job, lambda: job.receivedBytes() > len(RangeFileHandler.payload) // 3)
+        job.pause()
+        received = job.receivedBytes()
+        self.assertLess(received, len(RangeFileHandler.payload))
+
+        RangeFileHandler.ranges = []
+        restored = self.make_job(SegmentedDownload.restore(job.state_path()))
+        self.assertEqual(restored.receivedBytes(), received)
+        restored.resume()
+        self.wait(restored)
+        self.assertEqual(restored.state(), QWebEngineDownloadItem.DownloadCompleted)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), RangeFileHandler.payload)
+        self.assertNotIn(0, [start for start, _ in RangeFileHandler.ranges])
+
+    def test_cookies_rebuilt_for_redirect_target(self):
+        """Test that a cross-host redirect gets the new host's cookies, not the original host's"""
+        job = self.make_job(SegmentedDownload(self.url.replace('file.bin', 'moved'), self.path, segments=2))
+        job.cookie_header = lambda url: "session=first" if url.host() == '127.0.0.1' else ''
+        job.resume()
+        self.wait(job)
+        self.assertEqual(job.state(), QWebEngineDownloadItem.DownloadCompleted)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), RangeFileHandler.payload)
+        self.assertIn(('127.0.0.1', "session=first"), RangeFileHandler.cookies)
+        self.assertEqual({cookie for host, cookie in RangeFileHandler.cookies if host == 'localhost'}, {None})
+
+    def test_permanent_failure_discards_state(self):
+        """Test that a 4xx response removes the partial file so it is not resumed on every launch"""
+        job = self.make_job(SegmentedDownload(self.url, self.path, segments=4))
+        job.resume()
+        self.wait(job, lambda: job.receivedBytes() > len(RangeFileHandler.payload) // 3)
+        job.pause()
+        self.assertTrue(os.path.exists(job.state_path()))
+
+        restored = self.make_job(SegmentedDownload.restore(job.state_path()))
+        restored.url = self.url.replace('file.bin', 'gone.bin')
+        restored.resume()
+        self.wait(restored)
+        self.assertEqual(restored.state(), QWebEngineDownloadItem.DownloadInterrupted)
+        self.assertFalse(os.path.exists(job.part_path()) or os.path.exists(job.state_path()))
+
+class TestDownloadProgressAggregator(unittest.TestCase):
+    """Test cases for combined, rate-limited download progress"""
+
+    def setUp(self):
+        """Set up two downloads with known sizes"""
+        self.manager = DownloadManager()
+        self.aggregator = DownloadProgressAggregator(self.manager)
+        self.published = []
+        self.aggregator.updated.connect(self.published.append)
+        self.items = []
+        for total in (1000, 3000):
+            item = DownloadItem("https://example.com/f", f"/tmp/f{total}")
+            item.state, item.total, item.speed = 'downloading', total, 100.0
+            self.manager.items.append(item)
+            self.items.append(item)
+
+    def test_combined_summary(self):
+        """Test that progress from all items is combined into one update"""
+        for received in range(0, 1000, 10):
+            self.items[0].update(received, 1000)
+            self.items[1].update(received, 3000)
+        self.aggregator.publish()
+        self.aggregator.publish()
+        self.assertEqual(len(self.published), 1)
+        summary = self.published[0]
+        self.assertEqual(summary['total'], 4000)
+        self.assertEqual(summary['percent'], 1980 * 100 // 4000)
+        self.assertEqual(summary['count'], 2)
+
+    def test_stops_when_idle(self):
+        """Test that publishing stops once nothing is left to download"""
+        self.aggregator.wake()
+        self.assertTrue(self.aggregator.timer.isActive())
+        self.aggregator.publish()
+        for item in self.items:
+            item.state = 'completed'
+        self.aggregator.publish()
+        self.assertIsNone(self.published[-1])
+        self.assertFalse(self.aggregator.timer.isActive())
+        self.assertEqual(self.aggregator.timer.interval(), 250)
+
+    def test_panel_summary_once_per_tick(self):
+        """Test that the downloads panel reuses the published summary instead of recomputing it per row"""
+        panel = DownloadsPanel(self.manager, self.aggregator)
+        with patch.object(panel, 'isVisible', return_value=True), \
+                patch.object(self.aggregator, 'snapshot', wraps=self.aggregator.snapshot) as snapshot:
+            self.aggregator.publish()
+        self.assertEqual(snapshot.call_count, 1)
+        self.assertTrue(panel.summary_label.text().startswith("ดาวน์โหลด 2 รายการ"))
+
+class TestDownloadVerifier(unittest.TestCase):
+    """Test cases for post-download SHA-256 checks and duplicate linking"""
+
+    def setUp(self):
+        """Set up a manager and verifier over a temporary download folder"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = DownloadManager()
+        self.manager.configure({}, self.directory.name)
+        self.verifier = DownloadVerifier(self.manager, os.path.join(self.directory.name, 'hashes.json'))
+        self.data = os.urandom(200000)
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def complete(self, name):
+        """Write a finished download and wait for the verifier"""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as f:
+            f.write(self.data)
+        item = DownloadItem("https://example.com/" + name, path)
+        item.state = 'completed'
+        loop = QEventLoop()
+        self.verifier.checked.connect(loop.quit)
+        QTimer.singleShot(5000, loop.quit)
+        self.manager.changed.emit(item)
+        loop.exec_()
+        return item
+
+    def test_duplicate_is_hardlinked(self):
+        """Test that identical content already in the folder is linked instead of stored twice"""
+        with open(os.path.join(self.directory.name, 'original.bin'), 'wb') as f:
+            f.write(self.data)
+        item = self.complete('copy.bin')
+        self.assertEqual(item.sha256, self.sha256)
+        self.assertEqual(item.check, 'hashed')
+        self.assertEqual(os.path.basename(item.duplicate_of), 'original.bin')
+        self.assertTrue(os.path.samefile(item.path, item.duplicate_of))
+
+    def test_expected_hash_formats(self):
+        """Test hex, SRI and Digest header forms, and resuming a partial digest"""
+        encoded = base64.b64encode(bytes.fromhex(self.sha256)).decode('ascii')
+        self.assertEqual(DownloadVerifier.normalize(self.sha256.upper()), self.sha256)
+        self.assertEqual(DownloadVerifier.normalize(f"sha256-{encoded}"), self.sha256)
+        self.assertEqual(DownloadVerifier.normalize(f"md5=:AAAA:, sha-256=:{encoded}:"), self.sha256)
+        self.assertEqual(DownloadVerifier.normalize("a" * 128), '')
+
+        item = self.complete('file.bin')
+        self.assertTrue(self.verifier.set_expected(item, f"sha256-{encoded}"))
+        self.assertEqual(item.check, 'ok')
+        self.assertFalse(self.verifier.set_expected(item, "0" * 64, replace=False))
+        self.verifier.set_expected(item, "0" * 64)
+        self.assertEqual(item.check, 'mismatch')
+
+        prefix = hashlib.sha256(self.data[:1000])
+        self.assertEqual(self.verifier.hash_file(item.path, prefix, 1000), self.sha256)
+
+class TestContentDarkMode(unittest.TestCase):
+    """Test cases for reload-free web content dark mode"""
+
+    def make_page(self, profile):
+        page = MagicMock()
+        page.profile.return_value = profile
+        return page
+
+    def test_toggle_messages_live_pages(self):
+        """Test that the script is installed once per profile and toggling reloads nothing"""
+        dark_mode = ContentDarkMode()
+        profile = MagicMock()
+        pages = [self.make_page(profile), self.make_page(profile)]
+        for page in pages + pages:
+            dark_mode.attach(page)
+        self.assertEqual(profile.scripts().insert.call_count, 1)
+        script = profile.scripts().insert.call_args[0][0]
+        self.assertEqual(script.injectionPoint(), QWebEngineScript.DocumentCreation)
+        self.assertIn("})(false);", script.sourceCode())
+
+        dark_mode.set_enabled(True)
+        self.assertIn("})(true);", profile.scripts().insert.call_args[0][0].sourceCode())
+        for page in pages:
+            page.runJavaScript.assert_called_once_with(
+                "window.__uniqueDarkMode && window.__uniqueDarkMode(true)", QWebEngineScript.ApplicationWorld)
+            page.reload.assert_not_called()
+
+class TestThemeEngine(unittest.TestCase):
+    """Test cases for the cached application-level theme"""
+
+    def tearDown(self):
+        QApplication.instance().setStyleSheet("")
+
+    def test_theme_compiled_once(self):
+        """Test that each theme is built once and switching is a single application-level change"""
+        engine = ThemeEngine()
+        with patch.object(engine, 'build', wraps=engine.build) as build:
+            for name in ('dark', 'light', 'dark', 'dark', 'light'):
+                engine.apply(name)
+        self.assertEqual(build.call_count, 2)
+        self.assertEqual(engine.current, 'light')
+        self.assertEqual(QApplication.instance().styleSheet(), "")
+        stylesheet, palette = engine.compile('dark')
+        self.assertIn("QStatusBar { background-color: #333333;", stylesheet)
+        self.assertEqual(palette.color(palette.Window).red(), 53)
+
+class TestSiteZoom(unittest.TestCase):
+    """Test cases for per-host zoom memory"""
+
+    def setUp(self):
+        """Set up a zoom map backed by a temporary file"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'site_zoom.json')
+        self.zoom = SiteZoom(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_view(self, url, private=False):
+        view = MagicMock()
+        view.url.return_value = QUrl(url)
+        view.zoomFactor.return_value = 1.0
+        self.zoom.attach(view, private)
+        return view
+
+    def test_zoom_follows_host(self):
+        """Test that zooming applies to every tab of the host and is saved after a delay"""
+        first = self.make_view("https://a.com/1")
+        second = self.make_view("https://a.com/2")
+        other = self.make_view("https://b.com/")
+        private = self.make_view("https://a.com/3", private=True)
+        self.zoom.set(first, 1.5)
+        second.setZoomFactor.assert_called_once_with(1.5)
+        other.setZoomFactor.assert_not_called()
+        private.setZoomFactor.assert_not_called()
+        self.zoom.set(private, 0.5)
+        self.assertEqual(self.zoom.levels, {'a.com': 1.5})
+
+        self.assertTrue(self.zoom.save_timer.isActive())
+        self.assertFalse(os.path.exists(self.path))
+        self.zoom.save()
+        self.assertEqual(SiteZoom(self.path).levels, {'a.com': 1.5})
+
+    def test_applied_on_navigation(self):
+        """Test that the host's level is applied when the URL changes"""
+        self.zoom.levels['a.com'] = 1.25
+        view = self.make_view("https://b.com/")
+        navigate = view.urlChanged.connect.call_args[0][0]
+        navigate(QUrl("https://A.com/page"))
+        view.setZoomFactor.assert_called_once_with(1.25)
+        view.zoomFactor.return_value = 1.25
+        navigate(QUrl("https://a.com/other"))
+        self.assertEqual(view.setZoomFactor.call_count, 1)
+
+class TestFindBar(unittest.TestCase):
+    """Test cases for the incremental find bar"""
+
+    def setUp(self):
+        """Set up a find bar over a mock window with one tab"""
+        self.window = MagicMock()
+        self.page = self.window.current_browser().page()
+        self.bar = FindBar(None)
+        self.bar.browser_window = self.window
+
+    def tearDown(self):
+        self.bar.deleteLater()
+
+    def type_text(self, text):
+        for length in range(1, len(text) + 1):
+            self.bar.field.setText(text[:length])
+            self.bar.field.textEdited.emit(text[:length])
+
+    def test_typing_is_debounced(self):
+        """Test that a burst of keystrokes sends one search for the final text"""
+        self.type_text("browser")
+        self.page.findText.assert_not_called()
+        loop = QEventLoop()
+        QTimer.singleShot(FindBar.FRAME_MS * 4, loop.quit)
+        loop.exec_()
+        self.assertEqual(self.page.findText.call_count, 1)
+        self.assertEqual(self.page.findText.call_args[0][0], "browser")
+
+    def test_match_count_and_close(self):
+        """Test the "n of m" label from the async result and clearing on close"""
+        self.bar.field.setText("tab")
+        self.bar.find_previous()
+        self.assertEqual(self.page.findText.call_args[0][1], QWebEnginePage.FindBackward)
+        self.page.findTextFinished.connect.assert_called_once_with(self.bar.show_result)
+        result = MagicMock()
+        result.numberOfMatches.return_value = 12
+        result.activeMatch.return_value = 3
+        self.bar.show_result(result)
+        self.assertEqual(self.bar.count_label.text(), "3 จาก 12")
+        self.bar.close_bar()
+        self.page.findText.assert_called_with("")
+        self.assertEqual(self.bar.count_label.text(), "")
+
+    def test_shortcuts_limited_to_field(self):
+        """Test that Shift+Return and Escape only act while the find field has focus"""
+        shortcuts = self.bar.field.findChildren(QShortcut)
+        self.assertEqual(len(shortcuts), 2)
+        self.assertTrue(all(shortcut.context() == Qt.WidgetShortcut for shortcut in shortcuts))
+
+class TestUserScriptEngine(unittest.TestCase):
+    """Test cases for the host-indexed user script engine"""
+
+    SCRIPTS = {
+        'news.user.js': "// ==UserScript==\n// @name News fix\n// @match *://*.example.com/news/*\n"
+                        "// @exclude-match https://beta.example.com/*\n// @run-at document-start\n"
+                        "// ==/UserScript==\nGM_addStyle('.ad { display: none }');\n",
+        'wiki.user.js': "// ==UserScript==\n// @name Wiki\n// @include https://wiki.test/*\n// @noframes\n"
+                        "// ==/UserScript==\ndocument.title = 'wiki';\n"
+    }
+
+    def setUp(self):
+        """Set up an engine over a temporary scripts folder"""
+        self.directory = tempfile.TemporaryDirectory()
+        for name, source in self.SCRIPTS.items():
+            with open(os.path.join(self.directory.name, name), 'w', encoding='utf-8') as f:
+                f.write(source)
+        self.engine = UserScriptEngine(self.directory.name)
+        self.assertEqual(self.engine.load(), 2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def names(self, url):
+        return [script.name for script in self.engine.scripts_for(QUrl(url))]
+
+    def test_host_index_and_patterns(self):
+        """Test that scripts are found through the host index and then checked against the full URL"""
+        self.assertEqual(set(self.engine.suffix), {'example.com'})
+        self.assertEqual(set(self.engine.exact), {'wiki.test'})
+        self.assertEqual(self.engine.anywhere, [])
+        self.assertEqual(self.names("http://example.com/news/1"), ['News fix'])
+        self.assertEqual(self.names("https://www.example.com:8443/news/a?b"), ['News fix'])
+        self.assertEqual(self.names("https://beta.example.com/news/1"), [])
+        self.assertEqual(self.names("https://example.com/shop"), [])
+        self.assertEqual(self.names("https://wiki.test/Main"), ['Wiki'])
+        self.assertEqual(self.names("https://notexample.com/news/1"), [])
+
+        news = self.engine.by_key['news.user.js'].web_script()
+        self.assertEqual(news.name(), 'userscript:news.user.js')
+        self.assertEqual(news.injectionPoint(), QWebEngineScript.DocumentCreation)
+        self.assertEqual(news.worldId(), QWebEngineScript.UserWorld)
+
+    def test_scripts_swapped_on_navigation(self):
+        """Test that pages only get matching scripts and unchanged sets leave the page alone"""
+        page = MagicMock()
+        page.user_scripts = []
+        self.engine.prepare(page, QUrl("https://other.test/"))
+        page.scripts.assert_not_called()
+
+        self.engine.prepare(page, QUrl("https://wiki.test/a"))
+        inserted = page.scripts().insert.call_args[0][0]
+        self.assertEqual(inserted.name(), 'userscript:wiki.user.js')
+        self.engine.prepare(page, QUrl("https://wiki.test/b"))
+        self.assertEqual(page.scripts().insert.call_count, 1)
+
+        self.engine.prepare(page, QUrl("https://other.test/"))
+        page.scripts().findScripts.assert_called_with('userscript:wiki.user.js')
+        self.assertEqual(page.user_scripts, [])
+
+    def test_execution_time_recorded(self):
+        """Test that timing messages from the wrapper are collected per script"""
+        prefix = UserScriptEngine.TIMING_PREFIX
+        self.assertTrue(self.engine.record(prefix + '["wiki.user.js", 2.5]'))
+        self.assertTrue(self.engine.record(prefix + '["wiki.user.js", 0.5]'))
+        self.assertFalse(self.engine.record("ordinary log"))
+        wiki = self.engine.by_key['wiki.user.js']
+        self.assertEqual((wiki.runs, wiki.total_ms, wiki.max_ms), (2, 3.0, 2.5))
+        self.assertIn("Wiki: รัน 2 ครั้ง, เฉลี่ย 1.5 ms", self.engine.stats_text())
+
+class TestPluginManager(unittest.TestCase):
+    """Test cases for lazily loaded plugins with per-hook latency budgets"""
+
+    PLUGINS = {
+        'marker.py': '"""Adds a menu entry"""\nimported = True\n'
+                     'def on_context_menu(menu, data, browser):\n    menu.addAction("plugin")\n'
+                     'def on_navigation(page, url, navigation_type, is_main_frame):\n'
+                     '    return "blocked" not in url\n',
+        'slow.py': 'import time\ndef on_request(info):\n    time.sleep(0.005)\n'
+    }
+
+    def setUp(self):
+        """Set up a manager over a temporary plugins folder"""
+        self.directory = tempfile.TemporaryDirectory()
+        for name, source in self.PLUGINS.items():
+            with open(os.path.join(self.directory.name, name), 'w', encoding='utf-8') as f:
+                f.write(source)
+        self.manager = PluginManager(self.directory.name)
+        self.assertEqual(self.manager.discover(), 2)
+        self.manager.configure(['marker', 'slow'])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_loaded_on_first_matching_event(self):
+        """Test that hooks are read without importing and the module loads on its first event"""
+        marker = self.manager.plugins['marker']
+        self.assertEqual(marker.hooks, ['context_menu', 'navigation'])
+        self.assertEqual(marker.description, 'Adds a menu entry')
+        self.assertFalse(self.manager.has_hook('load_finished'))
+        self.manager.dispatch('load_finished', MagicMock())
+        self.assertIsNone(marker.module)
+
+        menu = MagicMock()
+        self.assertTrue(self.manager.dispatch('context_menu', menu, MagicMock(), MagicMock()))
+        self.assertTrue(marker.module.imported)
+        menu.addAction.assert_called_once_with("plugin")
+        self.assertFalse(self.manager.dispatch('navigation', None, "https://blocked.test/", 0, True))
+        self.assertEqual(marker.stats['navigation'][0], 1)
+
+    def test_slow_plugin_disabled(self):
+        """Test that a plugin over its budget several times is disabled with a warning"""
+        warnings = []
+        self.manager.disabled.connect(lambda name, reason: warnings.append(name))
+        for _ in range(PluginManager.MAX_OVERRUNS + 2):
+            self.manager.dispatch('request', MagicMock())
+        slow = self.manager.plugins['slow']
+        self.assertEqual(slow.stats['request'][0], PluginManager.MAX_OVERRUNS)
+        self.assertIn('on_request', slow.disabled)
+        self.assertFalse(self.manager.has_hook('request'))
+        self.assertEqual(warnings, ['slow'])
+
+        self.manager.set_enabled('slow', True)
+        self.assertTrue(self.manager.has_hook('request'))
+        self.assertEqual(slow.stats['request'][3], 0)
+
+    def test_request_plugins_imported_when_enabled(self):
+        """Test that on_request plugins are imported up front so the IO thread never imports them"""
+        slow = self.manager.plugins['slow']
+        self.assertIsNotNone(slow.module)
+        self.assertIsNone(self.manager.plugins['marker'].module)
+
+        self.manager.set_enabled('slow', False)
+        slow.module = None
+        with patch.object(self.manager, 'load') as load:
+            self.manager.active['request'] = [slow]
+            self.manager.dispatch('request', MagicMock())
+            load.assert_not_called()
+        self.manager.set_enabled('slow', True)
+        self.assertIsNotNone(slow.module)
+
 if __name__ == "__main__":
     unittest.main()
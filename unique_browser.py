@@ -6,16 +6,55 @@ import webbrowser
 import platform
 import subprocess
 import shutil
-from PyQt5.QtCore import QUrl, Qt, QStandardPaths, QTimer, QSize, QPoint, QProcess
-from PyQt5.QtGui import QIcon, QKeySequence, QDesktopServices, QColor, QPalette, QCursor
+import socket
+import heapq
+import itertools
+import base64
+import email.policy
+import fnmatch
+import re
+import hashlib
+import mmap
+import struct
+import threading
+import zlib
+import urllib.request
+import ast
+import importlib.util
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from urllib.parse import urlsplit
+from PyQt5.QtCore import (QUrl, Qt, QStandardPaths, QTimer, QSize, QPoint, QProcess,
+                          QAbstractItemModel, QModelIndex, QByteArray, QDataStream, QIODevice,
+                          QFileSystemWatcher, QBuffer, QUrlQuery, QObject, pyqtSignal, pyqtSlot, QT_VERSION_STR,
+                          PYQT_VERSION_STR, QDateTime)
+from PyQt5.QtGui import QIcon, QKeySequence, QDesktopServices, QColor, QPalette, QPainter
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QToolBar, QLineEdit,
                             QAction, QMenu, QMessageBox, QStatusBar, QFileDialog,
                             QInputDialog, QShortcut, QLabel, QStyleFactory, QSystemTrayIcon,
                             QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QCheckBox,
-                            QGroupBox, QComboBox, QRadioButton, QProgressBar)
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineProfile, QWebEngineDownloadItem, QWebEngineSettings, QWebEnginePage
+                            QGroupBox, QComboBox, QRadioButton, QProgressBar, QListWidget,
+                            QListWidgetItem, QTreeView, QDockWidget, QSpinBox, QFormLayout, QWidget)
+from PyQt5.QtWebEngineWidgets import (QWebEngineView, QWebEngineProfile, QWebEngineDownloadItem, QWebEngineSettings,
+                                      QWebEnginePage, QWebEngineScript, QWebEngineContextMenuData)
+from PyQt5.QtWebEngineCore import (QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo,
+                                   QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob)
+try:
+    # QWebEngineUrlScheme มีตั้งแต่ Qt 5.12
+    from PyQt5.QtWebEngineCore import QWebEngineUrlScheme
+except ImportError:
+    QWebEngineUrlScheme = None
 from PyQt5.QtPrintSupport import QPrintDialog, QPrinter
-from PyQt5.QtNetwork import QNetworkProxyFactory
+from PyQt5.QtNetwork import (QNetworkCookie, QNetworkProxy, QNetworkProxyFactory, QNetworkProxyQuery,
+                             QNetworkAccessManager, QNetworkRequest, QNetworkReply)
+try:
+    # ใช้ประเมินสคริปต์ PAC (บาง distribution แยก QtQml เป็นแพ็กเกจต่างหาก)
+    from PyQt5.QtQml import QJSEngine, QJSValue
+except ImportError:
+    QJSEngine = QJSValue = None
 
 
 # คลาสสำหรับจัดการการเปิดลิงก์ในแท็บใหม่
@@ -25,31 +64,5823 @@ class CustomWebEnginePage(QWebEnginePage):
     def __init__(self, profile, parent=None):
         super().__init__(profile, parent)
         self.main_browser = parent
+        # สคริปต์ผู้ใช้ที่ติดตั้งในหน้านี้อยู่ (UserScript)
+        self.user_scripts = []
+        # หน้าที่โหลดล่วงหน้าซึ่งผู้ใช้ยังไม่ได้เปิด (NavigationPredictor) จนกว่า swap_in_page จะรับเข้าแท็บ
+        self.speculative = False
+
+    def acceptNavigationRequest(self, url, navigation_type, is_main_frame):
+        """ลิงก์เปิดหน้าจากคลังออฟไลน์ (unique://archive/open?id=...) เปิดจากไฟล์ MHTML ที่ประกอบขึ้นใหม่"""
+        if is_main_frame and url.scheme() == 'unique' and url.host() == 'archive' and url.path() == '/open':
+            window = getattr(self.main_browser, 'browser_window', None)
+            if window:
+                window.open_archived(QUrlQuery(url).queryItemValue('id'))
+            return False
+        if self.speculative:
+            # ไม่เรียกปลั๊กอิน (ไม่นับในงบเวลา) และไม่ติดตั้งสคริปต์ผู้ใช้ในหน้าที่ผู้ใช้ยังไม่ได้เปิด
+            return super().acceptNavigationRequest(url, navigation_type, is_main_frame)
+        plugins = PluginManager.shared()
+        if plugins.has_hook('navigation') and not plugins.dispatch('navigation', self, url, navigation_type, is_main_frame):
+            return False
+        accepted = super().acceptNavigationRequest(url, navigation_type, is_main_frame)
+        if accepted and is_main_frame:
+            # ติดตั้งเฉพาะสคริปต์ผู้ใช้ของโฮสต์ปลายทาง ก่อนเอกสารใหม่ถูกสร้าง
+            UserScriptEngine.shared().prepare(self, url)
+        return accepted
+
+    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
+        """ข้อความจับเวลาของสคริปต์ผู้ใช้ไม่แสดงในคอนโซล"""
+        if not UserScriptEngine.shared().record(message):
+            super().javaScriptConsoleMessage(level, message, line_number, source_id)
+
+    def createWindow(self, window_type):
+        """เมธอดที่ถูกเรียกเมื่อต้องการเปิดหน้าต่างใหม่"""
+        try:
+            print(f"Creating new window of type: {window_type}")
+
+            # ตรวจสอบประเภทของหน้าต่าง
+            if window_type == QWebEnginePage.WebBrowserWindow:
+                # เปิดในหน้าต่างใหม่
+                new_browser = UniqueBrowser()
+                new_browser.show()
+                # คืนค่า page ของแท็บแรกในหน้าต่างใหม่
+                return new_browser.current_browser().page()
+            else:
+                # สร้างแท็บใหม่และคืนค่า QWebEnginePage
+                if hasattr(self.main_browser, 'browser_window'):
+                    # ใช้เมธอดของคลาสหลักที่จะสร้างแท็บใหม่
+                    new_tab = self.main_browser.browser_window.add_new_tab(opener=self.main_browser)
+                    if new_tab:
+                        # คืนค่า page ไม่ใช่ view
+                        return new_tab.page()
+            return None
+        except Exception as e:
+            print(f"Error in CustomWebEnginePage.createWindow: {e}")
+            return None
+
+# ดัชนีแท็บที่ใช้ร่วมกันทุกหน้าต่าง
+class TabSearchIndex:
+    """ดัชนีชื่อและ URL ของทุกแท็บในทุกหน้าต่าง สำหรับค้นหาแบบ fuzzy
+    (แท็บส่วนตัวและแท็บปกติไม่ปรากฏในผลค้นหาของกันและกัน)"""
+
+    _shared = None
+
+    def __init__(self):
+        # id(browser) -> ข้อมูลแท็บ (เรียงตามลำดับที่เพิ่ม)
+        self.entries = {}
+        # URL ที่ปรับรูปแบบแล้ว -> ชุดของ id(browser) ที่เปิด URL นั้นอยู่
+        self.url_map = {}
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าดัชนีเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def normalize_url(url):
+        """ปรับรูปแบบ URL เพื่อใช้เปรียบเทียบหาแท็บซ้ำ"""
+        try:
+            parts = urlsplit(url.strip())
+        except ValueError:
+            return url
+        if not parts.scheme or not parts.netloc:
+            return url
+        path = parts.path.rstrip('/')
+        normalized = f"{parts.scheme.lower()}://{parts.netloc.lower()}{path}"
+        if parts.query:
+            normalized += '?' + parts.query
+        return normalized
+
+    def update(self, window, browser, title=None, url=None, private=None):
+        """เพิ่มหรืออัพเดทข้อมูลของแท็บ (เรียกเมื่อชื่อหรือ URL เปลี่ยน private ระบุตอนเพิ่มแท็บ)"""
+        key = id(browser)
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = {'window': window, 'browser': browser, 'title': '', 'url': '', 'normalized': '', 'private': False}
+            self.entries[key] = entry
+        entry['window'] = window
+        if private is not None:
+            entry['private'] = private
+
+        if title is not None:
+            entry['title'] = title
+        if url is not None and url != entry['url']:
+            self._unlink_url(key, entry['normalized'])
+            entry['url'] = url
+            entry['normalized'] = self.normalize_url(url)
+            self.url_map.setdefault(entry['normalized'], set()).add(key)
+
+        # เก็บข้อความตัวพิมพ์เล็กและชุดตัวอักษรไว้ล่วงหน้าเพื่อให้ค้นหาได้เร็ว
+        entry['title_lower'] = entry['title'].lower()
+        entry['url_lower'] = entry['url'].lower()
+        entry['chars'] = frozenset(entry['title_lower']) | frozenset(entry['url_lower'])
+
+    def remove(self, browser):
+        """ลบแท็บออกจากดัชนี"""
+        entry = self.entries.pop(id(browser), None)
+        if entry:
+            self._unlink_url(id(browser), entry['normalized'])
+
+    def remove_window(self, window):
+        """ลบทุกแท็บของหน้าต่างที่ถูกปิด"""
+        for entry in [e for e in self.entries.values() if e['window'] is window]:
+            self.remove(entry['browser'])
+
+    def _unlink_url(self, key, normalized):
+        """ลบ id ของแท็บออกจาก url_map"""
+        keys = self.url_map.get(normalized)
+        if keys:
+            keys.discard(key)
+            if not keys:
+                del self.url_map[normalized]
+
+    def find_by_url(self, url, exclude=None, private=False):
+        """หาแท็บที่เปิด URL นี้อยู่แล้ว (ถ้ามี) เฉพาะแท็บที่เป็นส่วนตัวเหมือนกับ private"""
+        for key in self.url_map.get(self.normalize_url(url), ()):
+            entry = self.entries[key]
+            if entry['browser'] is not exclude and entry['private'] == private:
+                return entry
+        return None
+
+    @staticmethod
+    def _fuzzy_score(term, text):
+        """คะแนนการจับคู่แบบ subsequence คืนค่า None ถ้าไม่ตรง"""
+        pos = text.find(term)
+        if pos >= 0:
+            # ตรงกันแบบต่อเนื่องได้คะแนนสูงสุด โดยเฉพาะที่ต้นคำ
+            bonus = 50 if pos == 0 or not text[pos - 1].isalnum() else 0
+            return 1000 + bonus - min(pos, 100)
+
+        score = 0
+        last = -1
+        for ch in term:
+            idx = text.find(ch, last + 1)
+            if idx < 0:
+                return None
+            if idx == last + 1:
+                score += 10
+            elif idx == 0 or not text[idx - 1].isalnum():
+                score += 6
+            else:
+                score -= min(idx - last - 1, 10)
+            last = idx
+        return score
+
+    def search(self, query, limit=20, private=False):
+        """ค้นหาแท็บแบบ fuzzy จากชื่อและ URL เฉพาะแท็บที่เป็นส่วนตัวเหมือนกับ private"""
+        terms = query.lower().split()
+        if not terms:
+            return [entry for entry in self.entries.values() if entry['private'] == private][:limit]
+
+        required = frozenset(''.join(terms))
+        fuzzy_score = self._fuzzy_score
+        scored = []
+        for order, entry in enumerate(self.entries.values()):
+            # ตัดแท็บที่ไม่มีตัวอักษรครบออกก่อนโดยไม่ต้องคำนวณคะแนน
+            if entry['private'] != private or not required <= entry['chars']:
+                continue
+            total = 0
+            for term in terms:
+                # ชื่อแท็บมีน้ำหนักมากกว่า URL
+                score = fuzzy_score(term, entry['title_lower'])
+                if score is not None:
+                    score *= 2
+                if score is None or score < 1800:
+                    # คะแนนจาก URL ชนะได้เฉพาะเมื่อชื่อไม่ได้ตรงแบบต่อเนื่อง
+                    url_score = fuzzy_score(term, entry['url_lower'])
+                    if url_score is not None and (score is None or url_score > score):
+                        score = url_score
+                if score is None:
+                    total = None
+                    break
+                total += score
+            if total is not None:
+                scored.append((total, -order, entry))
+
+        return [entry for _, _, entry in heapq.nlargest(limit, scored, key=lambda item: item[:2])]
+
+# โมเดลแท็บแนวตั้งแบบต้นไม้
+class TabTreeModel(QAbstractItemModel):
+    """โมเดลแท็บแบบต้นไม้ จัดกลุ่มตามแท็บที่เปิด (opener) แยกจาก widget ของแท็บ"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = {'browser': None, 'title': '', 'parent': None, 'children': [], 'row': 0}
+        # id(browser) -> โหนดของแท็บ
+        self.nodes = {}
+
+    def _row(self, node):
+        """ลำดับของโหนดภายใต้โหนดแม่ (เก็บไว้ในโหนด จึงไม่ต้องไล่หาในรายการลูก)"""
+        return node['row']
+
+    @staticmethod
+    def _renumber(parent_node, start):
+        """อัพเดทลำดับของโหนดลูกตั้งแต่แถว start หลังแทรกหรือลบ"""
+        children = parent_node['children']
+        for row in range(start, len(children)):
+            children[row]['row'] = row
+
+    def _index_for_node(self, node):
+        """สร้าง QModelIndex ของโหนด"""
+        if node is self.root:
+            return QModelIndex()
+        return self.createIndex(self._row(node), 0, node)
+
+    def index_for_browser(self, browser):
+        """คืนค่า QModelIndex ของแท็บ"""
+        node = self.nodes.get(id(browser))
+        return self._index_for_node(node) if node else QModelIndex()
+
+    def browser_at(self, index):
+        """คืนค่า browser ของแถวที่ระบุ"""
+        return index.internalPointer()['browser'] if index.isValid() else None
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        parent_node = parent.internalPointer() if parent.isValid() else self.root
+        return self.createIndex(row, column, parent_node['children'][row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self._index_for_node(index.internalPointer()['parent'])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = parent.internalPointer() if parent.isValid() else self.root
+        return len(node['children'])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return index.internalPointer()['title']
+        return None
+
+    def add_tab(self, browser, title, opener=None):
+        """เพิ่มแท็บเป็นลูกของแท็บที่เปิดมัน (หรือระดับบนสุด)"""
+        parent_node = self.nodes.get(id(opener), self.root) if opener is not None else self.root
+        row = len(parent_node['children'])
+        self.beginInsertRows(self._index_for_node(parent_node), row, row)
+        node = {'browser': browser, 'title': title, 'parent': parent_node, 'children': [], 'row': row}
+        parent_node['children'].append(node)
+        self.nodes[id(browser)] = node
+        self.endInsertRows()
+
+    def remove_tab(self, browser):
+        """ลบแท็บ และเลื่อนแท็บลูกขึ้นมาแทนที่"""
+        node = self.nodes.pop(id(browser), None)
+        if node is None:
+            return
+        parent_node = node['parent']
+        parent_index = self._index_for_node(parent_node)
+        row = self._row(node)
+        children = node['children']
+
+        self.beginRemoveRows(parent_index, row, row)
+        del parent_node['children'][row]
+        node['children'] = []
+        self._renumber(parent_node, row)
+        self.endRemoveRows()
+
+        if children:
+            self.beginInsertRows(parent_index, row, row + len(children) - 1)
+            for child in children:
+                child['parent'] = parent_node
+            parent_node['children'][row:row] = children
+            self._renumber(parent_node, row)
+            self.endInsertRows()
+
+    def set_title(self, browser, title):
+        """อัพเดทชื่อแท็บ (วาดใหม่เฉพาะแถวนั้น)"""
+        node = self.nodes.get(id(browser))
+        if node and node['title'] != title:
+            node['title'] = title
+            index = self._index_for_node(node)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.ToolTipRole])
+
+# ระบบลดการทำงานของแท็บพื้นหลัง
+class TabThrottler:
+    """ซ่อนและแช่แข็ง (freeze) แท็บที่อยู่เบื้องหลังนานเกินกำหนดเพื่อประหยัด CPU"""
+
+    DEFAULTS = {
+        'enabled': True,
+        'freeze_after_minutes': 5,
+        'exempt_audio': True,
+        'check_interval_seconds': 30
+    }
+
+    def __init__(self, window):
+        self.window = window
+        # id(browser) -> สถานะของแท็บ
+        self.states = {}
+        self.pinned = set()
+        self.active = None
+        self.cpu_saved = 0.0
+        self.clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.check)
+        self.timer.start(int(self.config('check_interval_seconds') * 1000))
+
+    def config(self, key):
+        """อ่านค่าตั้งค่าจาก settings['throttling'] หรือค่าเริ่มต้น"""
+        return self.window.settings.get('throttling', {}).get(key, self.DEFAULTS[key])
+
+    def _state(self, browser):
+        """คืนค่าสถานะของแท็บ (สร้างใหม่ถ้ายังไม่มี)"""
+        state = self.states.get(id(browser))
+        if state is None:
+            state = {'browser': browser, 'hidden_since': None, 'frozen_since': None,
+                     'cpu_rate': 0.0, 'last_cpu': None, 'last_sample': None}
+            self.states[id(browser)] = state
+        return state
+
+    def _set_lifecycle(self, page, name):
+        """ตั้งค่า lifecycle ของเพจ (ต้องใช้ Qt 5.14 ขึ้นไป)"""
+        if hasattr(QWebEnginePage, 'LifecycleState'):
+            page.setLifecycleState(getattr(QWebEnginePage.LifecycleState, name))
+            return True
+        return False
+
+    def _read_cpu_seconds(self, page):
+        """อ่านเวลา CPU ของ renderer process จาก /proc (เฉพาะ Linux)"""
+        if not hasattr(page, 'renderProcessPid'):
+            return None
+        try:
+            with open(f"/proc/{page.renderProcessPid()}/stat", 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            # utime และ stime อยู่ที่ฟิลด์ 14 และ 15 (นับจาก 1)
+            return (int(fields[11]) + int(fields[12])) / self.clock_ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def tab_activated(self, browser):
+        """เรียกเมื่อสลับแท็บ: แท็บเดิมถูกซ่อน แท็บใหม่กลับมาทำงานเต็มที่"""
+        now = time.time()
+        previous = self.active
+        self.active = browser
+
+        if previous is not None and previous is not browser and id(previous) in self.states:
+            state = self.states[id(previous)]
+            state['hidden_since'] = now
+            state['last_cpu'] = None
+            if self.config('enabled') and hasattr(previous.page(), 'setVisible'):
+                # แจ้ง Chromium ว่าเพจไม่แสดงผล เพื่อให้ลดความถี่ของ timer และ animation
+                previous.page().setVisible(False)
+
+        state = self._state(browser)
+        if state['frozen_since'] is not None:
+            self.cpu_saved += (now - state['frozen_since']) * state['cpu_rate']
+            state['frozen_since'] = None
+        state['hidden_since'] = None
+        page = browser.page()
+        if hasattr(page, 'setVisible'):
+            page.setVisible(True)
+        self._set_lifecycle(page, 'Active')
+
+    def check(self):
+        """ตรวจสอบแท็บพื้นหลังเป็นระยะ และแช่แข็งแท็บที่ซ่อนนานเกินกำหนด"""
+        if not self.config('enabled'):
+            return
+        try:
+            now = time.time()
+            freeze_after = self.config('freeze_after_minutes') * 60
+            for state in self.states.values():
+                browser = state['browser']
+                if browser is self.active or state['hidden_since'] is None or state['frozen_since'] is not None:
+                    continue
+                page = browser.page()
+
+                # วัดอัตราการใช้ CPU ขณะอยู่เบื้องหลัง เพื่อประมาณเวลาที่ประหยัดได้
+                cpu = self._read_cpu_seconds(page)
+                if cpu is not None:
+                    if state['last_cpu'] is not None and now > state['last_sample']:
+                        state['cpu_rate'] = max(cpu - state['last_cpu'], 0) / (now - state['last_sample'])
+                    state['last_cpu'] = cpu
+                    state['last_sample'] = now
+
+                if id(browser) in self.pinned:
+                    continue
+                if self.config('exempt_audio') and page.recentlyAudible():
+                    continue
+                if now - state['hidden_since'] >= freeze_after:
+                    if self._set_lifecycle(page, 'Frozen'):
+                        state['frozen_since'] = now
+        except Exception as e:
+            print(f"Error in TabThrottler.check: {e}")
+
+    def toggle_pin(self, browser):
+        """ปักหมุด/เลิกปักหมุดแท็บ (แท็บที่ปักหมุดจะไม่ถูกแช่แข็ง)"""
+        key = id(browser)
+        if key in self.pinned:
+            self.pinned.discard(key)
+            return False
+        self.pinned.add(key)
+        state = self.states.get(key)
+        if state and state['frozen_since'] is not None:
+            self.cpu_saved += (time.time() - state['frozen_since']) * state['cpu_rate']
+            state['frozen_since'] = None
+            self._set_lifecycle(browser.page(), 'Active')
+        return True
+
+    def is_pinned(self, browser):
+        """ตรวจสอบว่าแท็บถูกปักหมุดหรือไม่"""
+        return id(browser) in self.pinned
+
+    def remove(self, browser):
+        """ลบแท็บที่ถูกปิด"""
+        state = self.states.pop(id(browser), None)
+        if state and state['frozen_since'] is not None:
+            self.cpu_saved += (time.time() - state['frozen_since']) * state['cpu_rate']
+        self.pinned.discard(id(browser))
+        if self.active is browser:
+            self.active = None
+
+    def stats(self):
+        """สรุปจำนวนแท็บที่ถูกแช่แข็งและเวลา CPU ที่ประหยัดได้ (วินาที โดยประมาณ)"""
+        now = time.time()
+        frozen = [s for s in self.states.values() if s['frozen_since'] is not None]
+        ongoing = sum((now - s['frozen_since']) * s['cpu_rate'] for s in frozen)
+        return {
+            'tabs': len(self.states),
+            'frozen': len(frozen),
+            'pinned': len(self.pinned),
+            'cpu_saved': self.cpu_saved + ongoing
+        }
+
+# คิวสำหรับคืนทรัพยากรของแท็บที่ปิดแล้ว
+class TabTeardownQueue:
+    """ทยอยลบเพจของแท็บที่ปิดแล้วทีละน้อยในช่วงที่ event loop ว่าง"""
+
+    def __init__(self, batch_size=2):
+        self.batch_size = batch_size
+        self.pending = deque()
+
+        # timer ระยะ 0 ms จะทำงานเมื่อไม่มี event อื่นรออยู่
+        self.timer = QTimer()
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.process_batch)
+
+    def enqueue(self, browser):
+        """หยุดแท็บทันทีและเพิ่มเข้าคิวเพื่อลบภายหลัง"""
+        try:
+            browser.hide()
+            # ปิดเสียงทันทีแทนการรัน JavaScript เพื่อหยุดมีเดีย
+            browser.page().setAudioMuted(True)
+            browser.stop()
+        except Exception as e:
+            print(f"Error detaching tab: {e}")
+
+        self.pending.append(browser)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def process_batch(self):
+        """ลบเพจจำนวน batch_size รายการต่อรอบ"""
+        for _ in range(min(self.batch_size, len(self.pending))):
+            browser = self.pending.popleft()
+            try:
+                browser.page().deleteLater()
+                browser.deleteLater()
+            except Exception as e:
+                print(f"Error cleaning up tab resources: {e}")
+
+        if not self.pending:
+            self.timer.stop()
+
+class TabSwitcherDialog(QDialog):
+    """หน้าต่างค้นหาและสลับแท็บจากทุกหน้าต่าง (Ctrl+Shift+A)"""
+
+    def __init__(self, index, parent=None, private=False):
+        super().__init__(parent)
+        self.index = index
+        # แสดงเฉพาะแท็บที่เป็นส่วนตัวเหมือนแท็บที่เปิดหน้าต่างนี้
+        self.private = private
+        self.results = []
+
+        self.setWindowTitle("ค้นหาแท็บ")
+        self.resize(640, 420)
+
+        layout = QVBoxLayout(self)
+
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("พิมพ์ชื่อหรือ URL ของแท็บ...")
+        self.search_box.textChanged.connect(self.update_results)
+        self.search_box.returnPressed.connect(self.activate_selected)
+        layout.addWidget(self.search_box)
+
+        self.result_list = QListWidget()
+        self.result_list.itemActivated.connect(lambda _: self.activate_selected())
+        layout.addWidget(self.result_list)
+
+        self.update_results("")
+
+    def update_results(self, text):
+        """อัพเดทรายการผลลัพธ์ทุกครั้งที่พิมพ์"""
+        self.results = self.index.search(text, private=self.private)
+        self.result_list.clear()
+        for entry in self.results:
+            item = QListWidgetItem(f"{entry['title'] or entry['url']}\n{entry['url']}")
+            item.setToolTip(entry['url'])
+            self.result_list.addItem(item)
+        if self.results:
+            self.result_list.setCurrentRow(0)
+
+    def keyPressEvent(self, event):
+        """ใช้ลูกศรขึ้น/ลงเลือกผลลัพธ์ขณะพิมพ์"""
+        if event.key() in (Qt.Key_Down, Qt.Key_Up) and self.results:
+            step = 1 if event.key() == Qt.Key_Down else -1
+            row = (self.result_list.currentRow() + step) % len(self.results)
+            self.result_list.setCurrentRow(row)
+            return
+        super().keyPressEvent(event)
+
+    def activate_selected(self):
+        """สลับไปยังแท็บที่เลือก"""
+        row = self.result_list.currentRow()
+        if 0 <= row < len(self.results):
+            entry = self.results[row]
+            entry['window'].activate_tab(entry['browser'])
+            self.accept()
+
+# ชุดกฎกรองคำขอ (บล็อกหรือยกเว้น)
+class FilterRuleSet:
+    """กฎแบบ EasyList ที่คอมไพล์เป็นตารางแบบแบน: hash ของโดเมนที่เรียงลำดับ, Aho-Corasick automaton และข้อมูลกฎ"""
+
+    # ความยาวสูงสุดของคำสำคัญที่ใช้ใน automaton (ใช้คัดกรองก่อนตรวจ pattern เต็ม)
+    MAX_KEYWORD = 8
+
+    # จำนวน state สูงสุดที่ถอดจากตารางมาเก็บเป็น dict และจำนวน host ที่จำผลการค้นโดเมนไว้
+    STATE_CACHE_SIZE = 4096
+    HOST_CACHE_SIZE = 1024
+
+    # ตารางทั้งหมดและชนิดข้อมูล ใช้รูปแบบเดียวกันทั้งในหน่วยความจำและในไฟล์แคช
+    TABLES = (
+        ('domains', 'Q'),        # hash ของโดเมนที่บล็อกทั้งโดเมน (เรียงลำดับ)
+        ('domain_hashes', 'Q'),  # hash ของโดเมนที่มีเงื่อนไขเพิ่มเติม (เรียงลำดับ)
+        ('domain_ids', 'I'),     # id ของกฎที่คู่กับ domain_hashes
+        ('edge_start', 'I'),     # ตำแหน่งเริ่มของ edge ของแต่ละ state
+        ('edge_chars', 'I'),     # รหัสตัวอักษรของ edge (เรียงลำดับภายใน state)
+        ('edge_targets', 'I'),   # state ปลายทางของ edge
+        ('fail', 'I'),           # failure link ของแต่ละ state
+        ('output_start', 'I'),   # ตำแหน่งเริ่มของ output ของแต่ละ state
+        ('output_ids', 'I'),     # id ของกฎที่คำสำคัญสิ้นสุดที่ state นั้น
+        ('generic', 'I'),        # กฎที่ไม่มีคำสำคัญ ต้องตรวจทุกคำขอ
+        ('rule_offsets', 'I'),   # ตำแหน่งของข้อมูลกฎแต่ละข้อใน rule_data
+        ('rule_data', 'B')       # ข้อมูลกฎ (pattern และตัวเลือก) แบบ JSON ต่อกัน
+    )
+
+    def __init__(self):
+        # ข้อมูลระหว่างคอมไพล์
+        self.pending_rules = []
+        self.pending_domains = set()
+        self.pending_domain_rules = []
+        self.keywords = {}
+        self.generic_rules = []
+        self.load_tables(self.compile_tables())
+
+    @staticmethod
+    def hash_domain(domain):
+        """hash ขนาด 64 บิตของโดเมน (คงที่ทุกครั้งที่รัน จึงเก็บลงไฟล์ได้)"""
+        data = domain.encode('utf-8')
+        return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+    def add_rule(self, pattern, options):
+        """เพิ่มกฎหนึ่งข้อ (pattern ไม่รวม @@ และ $options)"""
+        rule_id = len(self.pending_rules)
+        self.pending_rules.append((pattern, options))
+
+        # ||domain^ คือกฎระดับโดเมน ใช้ hash ของโดเมนแทนการค้นหา substring
+        if pattern.startswith('||') and pattern.endswith('^'):
+            domain = pattern[2:-1]
+            if domain and all(c.isalnum() or c in '.-' for c in domain):
+                if not options:
+                    self.pending_domains.add(domain)
+                else:
+                    self.pending_domain_rules.append((domain, rule_id))
+                return
+
+        keyword = self._keyword(pattern)
+        if keyword:
+            self.keywords.setdefault(keyword, []).append(rule_id)
+        else:
+            self.generic_rules.append(rule_id)
+
+    def _keyword(self, pattern):
+        """เลือกข้อความคงที่ที่ยาวที่สุดใน pattern เป็นคำสำคัญ"""
+        body = pattern.lstrip('|').rstrip('|')
+        for ch in '*^':
+            body = body.replace(ch, '\0')
+        parts = [part for part in body.split('\0') if len(part) >= 3]
+        if not parts:
+            return None
+        return max(parts, key=len)[:self.MAX_KEYWORD]
+
+    def compile_tables(self):
+        """คอมไพล์กฎที่เพิ่มไว้เป็นตารางแบบแบน (array)"""
+        tables = {name: array(code) for name, code in self.TABLES}
+
+        tables['domains'].extend(sorted({self.hash_domain(d) for d in self.pending_domains}))
+        for domain_hash, rule_id in sorted((self.hash_domain(d), r) for d, r in self.pending_domain_rules):
+            tables['domain_hashes'].append(domain_hash)
+            tables['domain_ids'].append(rule_id)
+
+        # สร้าง Aho-Corasick automaton จากคำสำคัญทั้งหมด
+        goto, fail, output = [{}], [0], [[]]
+        for keyword, rule_ids in self.keywords.items():
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    fail.append(0)
+                    output.append([])
+                state = next_state
+            output[state].extend(rule_ids)
+
+        # คำนวณ failure link แบบ BFS และรวม output ของ state ปลายทาง
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                link = fail[state]
+                while link and ch not in goto[link]:
+                    link = fail[link]
+                fail[next_state] = goto[link].get(ch, 0)
+                output[next_state].extend(output[fail[next_state]])
+
+        for state, edges in enumerate(goto):
+            tables['edge_start'].append(len(tables['edge_chars']))
+            for ch in sorted(edges):
+                tables['edge_chars'].append(ord(ch))
+                tables['edge_targets'].append(edges[ch])
+            tables['output_start'].append(len(tables['output_ids']))
+            tables['output_ids'].extend(output[state])
+        tables['edge_start'].append(len(tables['edge_chars']))
+        tables['output_start'].append(len(tables['output_ids']))
+        tables['fail'].extend(fail)
+        tables['generic'].extend(self.generic_rules)
+
+        # ข้อมูลกฎเก็บเป็น JSON แยกข้อ เพื่อถอดรหัสเฉพาะกฎที่ถูกใช้จริง
+        tables['rule_offsets'].append(0)
+        for pattern, options in self.pending_rules:
+            stored = dict(options)
+            if 'types' in stored:
+                stored['types'] = sorted(stored['types'])
+            if 'domains' in stored:
+                stored['domains'] = [sorted(stored['domains'][0]), sorted(stored['domains'][1])]
+            tables['rule_data'].frombytes(json.dumps([pattern, stored]).encode('utf-8'))
+            tables['rule_offsets'].append(len(tables['rule_data']))
+        return tables
+
+    def load_tables(self, tables):
+        """ใช้ตาราง (array หรือ memoryview จากไฟล์แคช) สำหรับการตรวจคำขอ"""
+        self.tables = tables
+        for name, _ in self.TABLES:
+            setattr(self, name, memoryview(tables[name]))
+        # กฎที่ถอดรหัสแล้ว (ถอดรหัสเมื่อใช้ครั้งแรกเท่านั้น)
+        self.rules = {}
+        # edge ของ state ที่ใช้บ่อยถูกถอดเป็น dict ส่วนที่เหลืออ่านจากตารางโดยตรง
+        self.edge_cache = [None] * (len(self.edge_start) - 1)
+        self.cached_states = 0
+        self.outputs = {}
+        self.root = self._edges(0)
+        # host -> ผลการค้นกฎโดเมน (คำขอในหน้าเดียวกันมักมาจาก host ซ้ำ ๆ)
+        self.host_cache = {}
+
+    def _edges(self, state):
+        """ถอด edge และ output ของ state จากตาราง"""
+        lo, hi = self.edge_start[state], self.edge_start[state + 1]
+        edges = {chr(code): target for code, target in zip(self.edge_chars[lo:hi], self.edge_targets[lo:hi])}
+        start, end = self.output_start[state], self.output_start[state + 1]
+        if start != end:
+            self.outputs[state] = tuple(self.output_ids[start:end])
+        if self.edge_cache[state] is None and self.cached_states < self.STATE_CACHE_SIZE:
+            self.edge_cache[state] = edges
+            self.cached_states += 1
+        return edges
+
+    def build(self):
+        """คอมไพล์กฎที่เพิ่มไว้และเริ่มใช้งาน"""
+        self.load_tables(self.compile_tables())
+        self.pending_rules, self.pending_domains, self.pending_domain_rules = [], set(), []
+        self.keywords, self.generic_rules = {}, []
+
+    def rule(self, rule_id):
+        """ถอดรหัสข้อมูลกฎจาก rule_data (เก็บไว้ใช้ซ้ำ)"""
+        rule = self.rules.get(rule_id)
+        if rule is None:
+            data = self.rule_data[self.rule_offsets[rule_id]:self.rule_offsets[rule_id + 1]]
+            pattern, options = json.loads(data.tobytes().decode('utf-8'))
+            rule = {'pattern': pattern, 'regex': None}
+            if 'types' in options:
+                rule['types'] = set(options['types'])
+            if 'third_party' in options:
+                rule['third_party'] = options['third_party']
+            if 'domains' in options:
+                rule['domains'] = (set(options['domains'][0]), set(options['domains'][1]))
+            self.rules[rule_id] = rule
+        return rule
+
+    def candidates(self, text):
+        """คืนค่า id ของกฎที่คำสำคัญปรากฏใน text"""
+        edge_cache, fail, outputs = self.edge_cache, self.fail, self.outputs
+        root = self.root
+        found = []
+        state, edges = 0, root
+        for ch in text:
+            next_state = edges.get(ch)
+            # ตาม failure link จนกว่าจะมี edge สำหรับตัวอักษรนี้ หรือกลับถึง root
+            while next_state is None and state:
+                state = fail[state]
+                edges = edge_cache[state]
+                if edges is None:
+                    edges = self._edges(state)
+                next_state = edges.get(ch)
+            if next_state:
+                state = next_state
+                # state ปลายทางมี edge เป็น dict ว่าง จึงต้องเทียบกับ None
+                edges = edge_cache[state]
+                if edges is None:
+                    edges = self._edges(state)
+                if state in outputs:
+                    found.extend(outputs[state])
+            else:
+                state, edges = 0, root
+        found.extend(self.generic)
+        return set(found)
+
+    @staticmethod
+    def _compile(pattern):
+        """แปลง pattern แบบ EasyList เป็น regular expression"""
+        regex = ''
+        if pattern.startswith('||'):
+            regex = r'^[a-z][a-z0-9+.-]*://([^/?#]*\.)?'
+            pattern = pattern[2:]
+        elif pattern.startswith('|'):
+            regex = '^'
+            pattern = pattern[1:]
+        end = ''
+        if pattern.endswith('|'):
+            end = '$'
+            pattern = pattern[:-1]
+        for ch in pattern:
+            if ch == '*':
+                regex += '.*'
+            elif ch == '^':
+                regex += r'(?:[^\w\-.%]|$)'
+            else:
+                regex += re.escape(ch)
+        return re.compile(regex + end)
+
+    def _rule_applies(self, rule, url, resource_type, first_party_host, third_party):
+        """ตรวจเงื่อนไขของกฎและ pattern เต็ม"""
+        types = rule.get('types')
+        if types is not None and resource_type not in types:
+            return False
+        if 'third_party' in rule and rule['third_party'] != third_party:
+            return False
+        domains = rule.get('domains')
+        if domains is not None and not FilterEngine.host_matches(first_party_host, domains):
+            return False
+        if rule['regex'] is None:
+            # คอมไพล์ pattern เมื่อใช้ครั้งแรกเท่านั้น
+            rule['regex'] = self._compile(rule['pattern'])
+        return rule['regex'].search(url) is not None
+
+    def lookup_host(self, host):
+        """ค้นกฎโดเมนของ host และโดเมนแม่ทุกระดับ (True ถ้าถูกบล็อกทั้งโดเมน)"""
+        domains, domain_hashes = self.domains, self.domain_hashes
+        rule_ids = []
+        suffix = host
+        while suffix:
+            # binary search บน hash ที่เรียงไว้ในตาราง
+            domain_hash = self.hash_domain(suffix)
+            i = bisect_left(domains, domain_hash)
+            if i < len(domains) and domains[i] == domain_hash:
+                return True
+            i = bisect_left(domain_hashes, domain_hash)
+            while i < len(domain_hashes) and domain_hashes[i] == domain_hash:
+                rule_ids.append(self.domain_ids[i])
+                i += 1
+            dot = suffix.find('.')
+            suffix = suffix[dot + 1:] if dot >= 0 else ''
+        return tuple(rule_ids)
+
+    def match(self, url, host, resource_type, first_party_host, third_party):
+        """ตรวจว่าคำขอตรงกับกฎใดในชุดนี้หรือไม่"""
+        domain_rules = self.host_cache.get(host)
+        if domain_rules is None:
+            domain_rules = self.lookup_host(host)
+            if len(self.host_cache) >= self.HOST_CACHE_SIZE:
+                self.host_cache.clear()
+            self.host_cache[host] = domain_rules
+        if domain_rules is True:
+            return True
+        for rule_id in domain_rules:
+            if self._rule_applies(self.rule(rule_id), url, resource_type, first_party_host, third_party):
+                return True
+
+        for rule_id in self.candidates(url):
+            if self._rule_applies(self.rule(rule_id), url, resource_type, first_party_host, third_party):
+                return True
+        return False
+
+class FilterEngine:
+    """เอนจินกรองคำขอจากรายการตัวกรองแบบ EasyList"""
+
+    # ตัวเลือกประเภททรัพยากรที่รองรับ
+    RESOURCE_TYPES = {'document', 'subdocument', 'stylesheet', 'script', 'image', 'font',
+                      'object', 'media', 'xmlhttprequest', 'ping', 'websocket', 'other'}
+
+    # รูปแบบไฟล์แคช: ส่วนหัว ตามด้วยสารบัญของตาราง และข้อมูลตารางที่จัดแนว 8 ไบต์
+    CACHE_MAGIC = b'UBFL'
+    CACHE_VERSION = 1
+    CACHE_HEADER = struct.Struct('=4sIB3x32sII')
+    CACHE_SECTION = struct.Struct('=24sQQ')
+
+    def __init__(self):
+        self.block = FilterRuleSet()
+        self.allow = FilterRuleSet()
+        self.rule_count = 0
+        # mmap ของไฟล์แคช (ถ้าโหลดจากแคช) ต้องเก็บไว้ตลอดที่ยังใช้ตาราง
+        self.mapping = None
+        self.signature = None
+
+    def rule_sets(self):
+        """ชุดกฎทั้งหมดพร้อมชื่อที่ใช้ในไฟล์แคช"""
+        return (('block', self.block), ('allow', self.allow))
+
+    def save(self, path, signature):
+        """บันทึกตารางที่คอมไพล์แล้วลงไฟล์แคชแบบไบนารี"""
+        sections = []
+        for prefix, rule_set in self.rule_sets():
+            for name, _ in FilterRuleSet.TABLES:
+                sections.append((f"{prefix}.{name}", memoryview(rule_set.tables[name]).tobytes()))
+
+        offset = self.CACHE_HEADER.size + self.CACHE_SECTION.size * len(sections)
+        directory = []
+        for name, data in sections:
+            offset = (offset + 7) & ~7
+            directory.append(self.CACHE_SECTION.pack(name.encode('ascii'), offset, len(data)))
+            offset += len(data)
+
+        with open(path, 'wb') as f:
+            f.write(self.CACHE_HEADER.pack(self.CACHE_MAGIC, self.CACHE_VERSION, sys.byteorder == 'little',
+                                           signature, self.rule_count, len(sections)))
+            f.write(b''.join(directory))
+            for name, data in sections:
+                f.write(b'\0' * (-f.tell() % 8))
+                f.write(data)
+
+    @classmethod
+    def load(cls, path, signature=None):
+        """เปิดไฟล์แคชแบบ memory-mapped (อ่านอย่างเดียว) คืนค่า None ถ้าไม่มีหรือใช้ไม่ได้"""
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            magic, version, little, stored_signature, rule_count, count = cls.CACHE_HEADER.unpack_from(mapping, 0)
+            if (magic != cls.CACHE_MAGIC or version != cls.CACHE_VERSION
+                    or bool(little) != (sys.byteorder == 'little')
+                    or (signature is not None and stored_signature != signature)):
+                mapping.close()
+                return None
+
+            view = memoryview(mapping)
+            sections = {}
+            for i in range(count):
+                name, offset, length = cls.CACHE_SECTION.unpack_from(
+                    mapping, cls.CACHE_HEADER.size + i * cls.CACHE_SECTION.size)
+                sections[name.rstrip(b'\0').decode('ascii')] = view[offset:offset + length]
+
+            # ตารางชี้ไปยังหน้าหน่วยความจำของไฟล์โดยตรง ไม่มีการคัดลอก
+            engine = cls()
+            for prefix, rule_set in engine.rule_sets():
+                rule_set.load_tables({name: sections[f"{prefix}.{name}"].cast(code)
+                                      for name, code in FilterRuleSet.TABLES})
+            engine.rule_count = rule_count
+            engine.mapping = mapping
+            return engine
+        except (struct.error, KeyError, ValueError, TypeError) as e:
+            print(f"Error loading filter cache: {e}")
+            return None
+
+    @staticmethod
+    def host_matches(host, domains):
+        """ตรวจ host กับเงื่อนไข domain= (include, exclude)"""
+        include, exclude = domains
+        suffix = host
+        while suffix:
+            if suffix in exclude:
+                return False
+            if suffix in include:
+                return True
+            dot = suffix.find('.')
+            suffix = suffix[dot + 1:] if dot >= 0 else ''
+        return not include
+
+    @staticmethod
+    def base_domain(host):
+        """โดเมนหลักโดยประมาณ (สองระดับสุดท้าย หรือสามระดับสำหรับ co.uk เป็นต้น)"""
+        labels = host.split('.')
+        if len(labels) > 2 and len(labels[-1]) == 2 and len(labels[-2]) <= 3:
+            return '.'.join(labels[-3:])
+        return '.'.join(labels[-2:])
+
+    def parse_options(self, text):
+        """แปลง $options เป็น dict คืนค่า None ถ้ามีตัวเลือกที่ไม่รองรับ"""
+        options = {}
+        types, excluded_types = set(), set()
+        for option in text.split(','):
+            option = option.strip().lower()
+            negated = option.startswith('~')
+            name = option.lstrip('~')
+            if name == 'third-party':
+                options['third_party'] = not negated
+            elif name in self.RESOURCE_TYPES:
+                (excluded_types if negated else types).add(name)
+            elif name.startswith('domain='):
+                include = {d for d in name[7:].split('|') if d and not d.startswith('~')}
+                exclude = {d[1:] for d in name[7:].split('|') if d.startswith('~')}
+                options['domains'] = (include, exclude)
+            elif name in ('match-case', 'important'):
+                continue
+            else:
+                return None
+
+        if types or excluded_types:
+            options['types'] = (types or self.RESOURCE_TYPES - {'document'}) - excluded_types
+        return options
+
+    def add_line(self, line):
+        """เพิ่มกฎจากหนึ่งบรรทัดของรายการตัวกรอง คืนค่า True ถ้าใช้งานได้"""
+        line = line.strip()
+        # ข้ามความคิดเห็น ส่วนหัว และกฎซ่อนองค์ประกอบ (cosmetic)
+        if not line or line.startswith(('!', '[')) or '##' in line or '#@#' in line or '#?#' in line:
+            return False
+
+        target = self.block
+        if line.startswith('@@'):
+            target = self.allow
+            line = line[2:]
+
+        # ข้ามกฎแบบ regular expression เพราะตรวจช้า
+        if line.startswith('/') and line.endswith('/'):
+            return False
+
+        pattern, _, option_text = line.partition('$')
+        options = self.parse_options(option_text) if option_text else {}
+        if options is None or not pattern.strip('*'):
+            return False
+
+        target.add_rule(pattern.lower(), options)
+        self.rule_count += 1
+        return True
+
+    def load_lines(self, lines):
+        """โหลดกฎจากหลายบรรทัดแล้วสร้าง automaton"""
+        for line in lines:
+            self.add_line(line)
+        self.block.build()
+        self.allow.build()
+
+    def should_block(self, url, resource_type='other', first_party_url=''):
+        """ตรวจว่าคำขอควรถูกบล็อกหรือไม่"""
+        url = url.lower()
+        host = urlsplit(url).hostname or ''
+        first_party_host = ''
+        if first_party_url:
+            first_party_host = urlsplit(first_party_url.lower()).hostname or ''
+        third_party = bool(first_party_host) and self.base_domain(host) != self.base_domain(first_party_host)
+
+        if not self.block.match(url, host, resource_type, first_party_host, third_party):
+            return False
+        return not self.allow.match(url, host, resource_type, first_party_host, third_party)
+
+# ตัวดักคำขอสำหรับบล็อกโฆษณาและตัวติดตาม
+class RequestBlocker(QWebEngineUrlRequestInterceptor):
+    """ติดตั้งบนทุก profile เพื่อบล็อกคำขอตามรายการตัวกรอง และนับจำนวนที่บล็อกต่อหน้า"""
+
+    _shared = None
+
+    # จำนวนหน้าที่เก็บยอดคำขอที่ถูกบล็อกไว้
+    MAX_COUNTED_PAGES = 256
+
+    # แปลงประเภททรัพยากรของ Qt เป็นชื่อตัวเลือกของ EasyList
+    TYPE_NAMES = {
+        'ResourceTypeMainFrame': 'document',
+        'ResourceTypeSubFrame': 'subdocument',
+        'ResourceTypeStylesheet': 'stylesheet',
+        'ResourceTypeScript': 'script',
+        'ResourceTypeImage': 'image',
+        'ResourceTypeFavicon': 'image',
+        'ResourceTypeFontResource': 'font',
+        'ResourceTypeObject': 'object',
+        'ResourceTypePluginResource': 'object',
+        'ResourceTypeMedia': 'media',
+        'ResourceTypeXhr': 'xmlhttprequest',
+        'ResourceTypePing': 'ping',
+        'ResourceTypeCspReport': 'ping'
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.engine = FilterEngine()
+        self.enabled = True
+        self.loaded = False
+        # ตัวดักของ profile ส่วนตัว (สร้างเมื่อมีแท็บส่วนตัวครั้งแรก)
+        self.private_interceptor = None
+        # บันทึกคำขอทุกรายการ (ตัวดักคำขอมีได้ตัวเดียวต่อ profile จึงบันทึกจากที่นี่)
+        self.network_log = NetworkLog.shared()
+        # ปลั๊กอินที่มี on_request ก็ถูกเรียกจากที่นี่เช่นกัน
+        self.plugins = PluginManager.shared()
+        self.compile_thread = None
+        self.recompile_requested = False
+
+        # ตรวจจับการเปลี่ยนแปลงของไฟล์รายการตัวกรองเพื่อคอมไพล์ใหม่
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(lambda _: self.reload_timer.start())
+        self.watcher.fileChanged.connect(lambda _: self.reload_timer.start())
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(2000)
+        self.reload_timer.timeout.connect(self.load_filters)
+        # URL ของหน้า (first-party) -> จำนวนคำขอที่ถูกบล็อก (เก็บเฉพาะหน้าล่าสุด MAX_COUNTED_PAGES หน้า)
+        self.counts = {}
+        self.types = {}
+        for name, value in self.TYPE_NAMES.items():
+            if hasattr(QWebEngineUrlRequestInfo, name):
+                self.types[int(getattr(QWebEngineUrlRequestInfo, name))] = value
+        self.main_frame = int(getattr(QWebEngineUrlRequestInfo, 'ResourceTypeMainFrame', 0))
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวดักคำขอเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def filters_dir():
+        """โฟลเดอร์ที่เก็บไฟล์รายการตัวกรอง (*.txt)"""
+        return os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "filters"
+        )
+
+    @staticmethod
+    def cache_path():
+        """ไฟล์แคชของรายการตัวกรองที่คอมไพล์แล้ว"""
+        return os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "filters.cache"
+        )
+
+    def source_files(self):
+        """ไฟล์รายการตัวกรอง (*.txt) ทั้งหมด"""
+        directory = self.filters_dir()
+        os.makedirs(directory, exist_ok=True)
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith('.txt')]
+
+    def source_signature(self):
+        """ลายเซ็นของไฟล์รายการตัวกรอง (ชื่อ ขนาด และเวลาแก้ไข) ใช้ตรวจว่าแคชยังใช้ได้"""
+        digest = hashlib.sha256(str(FilterEngine.CACHE_VERSION).encode('ascii'))
+        for path in self.source_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.digest()
+
+    def read_sources(self):
+        """อ่านทุกบรรทัดจากไฟล์รายการตัวกรอง"""
+        lines = []
+        for path in self.source_files():
+            try:
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    lines.extend(f.read().splitlines())
+            except OSError as e:
+                print(f"Error reading filter list {path}: {e}")
+        return lines
+
+    def load_filters(self):
+        """โหลดตัวกรองจากแคช และคอมไพล์ใหม่ในเบื้องหลังเมื่อไฟล์รายการเปลี่ยน"""
+        self.loaded = True
+        self.watch_sources()
+
+        signature = self.source_signature()
+        if self.engine.mapping is not None and self.engine.signature == signature:
+            return
+
+        engine = FilterEngine.load(self.cache_path(), signature)
+        if engine:
+            engine.signature = signature
+            self.engine = engine
+            print(f"Loaded {engine.rule_count} filter rules from cache")
+            return
+
+        # ใช้แคชเก่า (ถ้ามี) ไปก่อนระหว่างคอมไพล์ใหม่
+        if not self.engine.rule_count:
+            stale = FilterEngine.load(self.cache_path())
+            if stale:
+                stale.signature = None
+                self.engine = stale
+        self.compile_in_background()
+
+    def watch_sources(self):
+        """เฝ้าดูโฟลเดอร์และไฟล์รายการตัวกรอง"""
+        paths = [self.filters_dir()] + self.source_files()
+        missing = [path for path in paths if path not in self.watcher.files() + self.watcher.directories()]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def is_compiling(self):
+        """ตรวจสอบว่ากำลังคอมไพล์รายการตัวกรองอยู่หรือไม่"""
+        return self.compile_thread is not None and self.compile_thread.is_alive()
+
+    def compile_in_background(self):
+        """คอมไพล์รายการตัวกรองใน thread แยก เพื่อไม่ให้การเปิดโปรแกรมช้าลง"""
+        if self.is_compiling():
+            self.recompile_requested = True
+            return
+        self.recompile_requested = False
+        self.compile_thread = threading.Thread(target=self.compile_filters, daemon=True)
+        self.compile_thread.start()
+
+    def compile_filters(self):
+        """คอมไพล์ บันทึกแคช แล้วสลับไปใช้ตารางจากไฟล์แคช"""
+        try:
+            signature = self.source_signature()
+            engine = FilterEngine()
+            engine.load_lines(self.read_sources())
+
+            path = self.cache_path()
+            temp_path = path + '.tmp'
+            engine.save(temp_path, signature)
+            os.replace(temp_path, path)
+
+            mapped = FilterEngine.load(path, signature)
+            if mapped:
+                engine = mapped
+            engine.signature = signature
+            self.engine = engine
+            print(f"Compiled {engine.rule_count} filter rules")
+        except Exception as e:
+            print(f"Error compiling filter lists: {e}")
+
+        if self.recompile_requested:
+            self.recompile_requested = False
+            self.compile_filters()
+
+    def install(self, profile, private=False):
+        """ติดตั้งตัวดักคำขอบน profile (ครั้งเดียวต่อ profile) profile ส่วนตัวใช้ตัวดักที่ไม่บันทึกคำขอ"""
+        # เก็บสถานะไว้ใน profile เอง เพราะ id ของ profile ที่ถูกลบแล้วอาจถูกใช้ซ้ำ
+        if profile.property('request_interceptor_installed'):
+            return
+        profile.setProperty('request_interceptor_installed', True)
+        interceptor = self
+        if private:
+            if self.private_interceptor is None:
+                self.private_interceptor = PrivateRequestInterceptor(self)
+            interceptor = self.private_interceptor
+        if hasattr(profile, 'setUrlRequestInterceptor'):
+            profile.setUrlRequestInterceptor(interceptor)
+        else:
+            profile.setRequestInterceptor(interceptor)
+
+    def interceptRequest(self, info):
+        """เรียกจาก IO thread ของ WebEngine สำหรับทุกคำขอ"""
+        self.handle(info, self.network_log.enabled)
+
+    def handle(self, info, log):
+        """บล็อกคำขอตามตัวกรอง เรียกปลั๊กอินกับคำขอที่ไม่ถูกบล็อก และบันทึกลง NetworkLog เมื่อ log เป็นจริง"""
+        if not self.enabled and not log and not self.plugins.has_hook('request'):
+            return
+        try:
+            resource_type = int(info.resourceType())
+            type_name = self.types.get(resource_type, 'other')
+            first_party = info.firstPartyUrl().toString(QUrl.RemoveFragment)
+            blocked = False
+            if self.enabled:
+                if resource_type == self.main_frame:
+                    # หน้าใหม่ เริ่มนับจำนวนที่บล็อกใหม่
+                    self.counts.pop(info.requestUrl().toString(QUrl.RemoveFragment), None)
+                elif self.engine.should_block(info.requestUrl().toString(), type_name, first_party):
+                    info.block(True)
+                    blocked = True
+                    if first_party not in self.counts and len(self.counts) >= self.MAX_COUNTED_PAGES:
+                        # ลบหน้าที่เก่าที่สุด (dict เรียงตามลำดับที่เพิ่ม)
+                        self.counts.pop(next(iter(self.counts)), None)
+                    self.counts[first_party] = self.counts.get(first_party, 0) + 1
+
+            # on_request เห็นเฉพาะคำขอที่ตัวกรองปล่อยผ่าน (ปลั๊กอินบล็อกเพิ่มเองได้ด้วย info.block)
+            if not blocked and self.plugins.has_hook('request'):
+                self.plugins.dispatch('request', info)
+
+            if log:
+                # ใช้ URL แบบเข้ารหัสเต็มเพื่อให้ตรงกับชื่อรายการใน Resource Timing
+                encoded = QUrl.FullyEncoded | QUrl.RemoveFragment
+                self.network_log.record(info.requestUrl().toString(encoded), type_name,
+                                        info.firstPartyUrl().toString(encoded),
+                                        bytes(info.requestMethod()).decode('ascii', 'replace'), blocked)
+        except Exception as e:
+            print(f"Error in RequestBlocker.handle: {e}")
+
+    def blocked_count(self, url):
+        """จำนวนคำขอที่ถูกบล็อกของหน้าที่ระบุ"""
+        return self.counts.get(url.toString(QUrl.RemoveFragment), 0)
+
+class PrivateRequestInterceptor(QWebEngineUrlRequestInterceptor):
+    """ตัวดักคำขอของ profile ส่วนตัว: ใช้ตัวกรองและปลั๊กอินร่วมกับ RequestBlocker แต่ไม่บันทึกคำขอลง NetworkLog
+    (บันทึกนั้นส่งออกเป็นไฟล์ HAR ได้)"""
+
+    def __init__(self, blocker):
+        super().__init__(blocker)
+        self.blocker = blocker
+
+    def interceptRequest(self, info):
+        self.blocker.handle(info, False)
+
+# บันทึกคำขอเครือข่ายสำหรับวิเคราะห์ความเร็วในการโหลดหน้า
+class NetworkLog:
+    """เก็บคำขอทุกรายการจากตัวดักคำขอใน ring buffer ขนาดจำกัด เติมเวลาจาก Resource Timing และส่งออกเป็น HAR"""
+
+    _shared = None
+
+    # สคริปต์อ่าน Resource Timing (รันใน world แยก จึงไม่กระทบสคริปต์ของหน้าเว็บ)
+    # อ่านเฉพาะรายการใหม่นับจากครั้งก่อน เพื่อไม่ให้จับคู่รายการเดิมซ้ำ
+    TIMING_SCRIPT = """
+        (function () {
+            var navigation = performance.getEntriesByType('navigation');
+            var resources = performance.getEntriesByType('resource');
+            var start = window.__uniqueTimingIndex || 0;
+            window.__uniqueTimingIndex = resources.length;
+            var entries = resources.slice(start);
+            if (!start) entries = navigation.concat(entries);
+            return JSON.stringify({
+                origin: performance.timeOrigin,
+                document: navigation.length ? navigation[0].name : document.URL,
+                entries: entries.map(function (entry) { return entry.toJSON(); })
+            });
+        })();
+    """
+
+    def __init__(self, capacity=5000):
+        self.enabled = True
+        self.records = deque(maxlen=capacity)
+        # record() ถูกเรียกจาก IO thread ส่วนการเติมเวลาและส่งออกทำใน GUI thread
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าบันทึกเครือข่ายเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def set_capacity(self, capacity):
+        """เปลี่ยนขนาด ring buffer (เก็บรายการล่าสุดไว้)"""
+        with self.lock:
+            if capacity != self.records.maxlen:
+                self.records = deque(self.records, maxlen=capacity)
+
+    def record(self, url, resource_type, first_party, method='GET', blocked=False):
+        """บันทึกคำขอหนึ่งรายการ พร้อมเวลาที่ตัวดักคำขอเห็น"""
+        with self.lock:
+            self.records.append({
+                'url': url,
+                'type': resource_type,
+                'first_party': first_party,
+                'method': method,
+                'blocked': blocked,
+                'time': time.time(),
+                'tab': None,
+                'timing': None
+            })
+
+    def clear(self):
+        """ล้างบันทึกทั้งหมด"""
+        with self.lock:
+            self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+    def add_timing(self, tab, data):
+        """จับคู่ Resource Timing ที่อ่านจากแท็บกับคำขอที่บันทึกไว้ (ตาม URL ตามลำดับเวลา)"""
+        origin = data.get('origin', 0)
+        document = data.get('document', '').split('#')[0]
+        with self.lock:
+            # คำขอของหน้านี้ที่ยังไม่มีข้อมูลเวลา (รายการเก่าสุดอยู่ท้าย list)
+            pending = {}
+            for record in reversed(self.records):
+                if record['first_party'] != document and record['url'] != document:
+                    continue
+                record['tab'] = record['tab'] or tab
+                if record['timing'] is None and not record['blocked']:
+                    pending.setdefault(record['url'], []).append(record)
+
+            for entry in data.get('entries', []):
+                records = pending.get(entry.get('name', '').split('#')[0])
+                if records:
+                    record = records.pop()
+                    entry['origin'] = origin
+                    record['timing'] = entry
+
+    @staticmethod
+    def format_time(timestamp):
+        """แปลงเวลา (วินาที) เป็นรูปแบบ ISO 8601 ที่ HAR ใช้"""
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(timestamp)) + f".{int(timestamp * 1000) % 1000:03d}Z"
+
+    @staticmethod
+    def har_timings(timing):
+        """แปลง Resource Timing เป็นช่วงเวลาของ HAR (มิลลิวินาที, -1 คือไม่มีข้อมูล)"""
+        def span(start, end):
+            start, end = timing.get(start, 0), timing.get(end, 0)
+            return round(end - start, 3) if start > 0 and end >= start else -1
+
+        timings = {
+            'blocked': -1,
+            'dns': span('domainLookupStart', 'domainLookupEnd'),
+            'connect': span('connectStart', 'connectEnd'),
+            'ssl': span('secureConnectionStart', 'connectEnd'),
+            'send': 0,
+            'wait': max(span('requestStart', 'responseStart'), 0),
+            'receive': max(span('responseStart', 'responseEnd'), 0)
+        }
+        # เวลาที่รอก่อนเริ่มเชื่อมต่อ (เช่น รอคิวหรือแคช)
+        first = next((timing[key] for key in ('domainLookupStart', 'connectStart', 'requestStart')
+                      if timing.get(key, 0) > 0), 0)
+        if first:
+            timings['blocked'] = round(max(first - timing.get('startTime', 0), 0), 3)
+        if timings['wait'] == 0 and timings['receive'] == 0:
+            # ข้ามโดเมนโดยไม่มี Timing-Allow-Origin จะมีเพียงระยะเวลารวม
+            timings['receive'] = round(timing.get('duration', 0), 3)
+        return timings
+
+    def to_har(self, creator='Unique Browser', version=''):
+        """สร้างข้อมูล HAR 1.2 จากบันทึกปัจจุบัน"""
+        with self.lock:
+            records = list(self.records)
+
+        pages = {}
+        entries = []
+        for record in records:
+            page_url = record['first_party'] or record['url']
+            timing = record['timing']
+            started = record['time']
+            if timing and timing.get('origin'):
+                started = (timing['origin'] + timing.get('startTime', 0)) / 1000
+
+            page = pages.get(page_url)
+            if page is None:
+                page = pages[page_url] = {
+                    'startedDateTime': started,
+                    'id': f"page_{len(pages) + 1}",
+                    'title': record['tab'] or page_url,
+                    'pageTimings': {'onContentLoad': -1, 'onLoad': -1}
+                }
+            page['startedDateTime'] = min(page['startedDateTime'], started)
+            if record['tab']:
+                page['title'] = record['tab']
+            if timing and timing.get('entryType') == 'navigation':
+                page['pageTimings'] = {
+                    'onContentLoad': round(timing.get('domContentLoadedEventEnd', 0), 3) or -1,
+                    'onLoad': round(timing.get('loadEventEnd', 0), 3) or -1
+                }
+
+            timings = self.har_timings(timing) if timing else {
+                'blocked': -1, 'dns': -1, 'connect': -1, 'ssl': -1, 'send': 0, 'wait': 0, 'receive': 0}
+            query = urlsplit(record['url']).query
+            entries.append({
+                'pageref': page['id'],
+                'startedDateTime': self.format_time(started),
+                'time': round(sum(value for key, value in timings.items() if key != 'ssl' and value > 0), 3),
+                'request': {
+                    'method': record['method'],
+                    'url': record['url'],
+                    'httpVersion': (timing or {}).get('nextHopProtocol', ''),
+                    'cookies': [],
+                    'headers': [],
+                    'queryString': [{'name': name, 'value': value} for name, _, value in
+                                    (part.partition('=') for part in query.split('&') if part)],
+                    'headersSize': -1,
+                    'bodySize': -1
+                },
+                'response': {
+                    'status': (timing or {}).get('responseStatus', 0),
+                    'statusText': 'Blocked' if record['blocked'] else '',
+                    'httpVersion': (timing or {}).get('nextHopProtocol', ''),
+                    'cookies': [],
+                    'headers': [],
+                    'content': {'size': (timing or {}).get('decodedBodySize', 0), 'mimeType': ''},
+                    'redirectURL': '',
+                    'headersSize': -1,
+                    'bodySize': (timing or {}).get('encodedBodySize', -1)
+                },
+                'cache': {},
+                'timings': timings,
+                '_resourceType': record['type'],
+                '_interceptedDateTime': self.format_time(record['time']),
+                '_transferSize': (timing or {}).get('transferSize', -1),
+                '_blocked': record['blocked'],
+                '_tab': record['tab']
+            })
+
+        for page in pages.values():
+            page['startedDateTime'] = self.format_time(page['startedDateTime'])
+        return {'log': {
+            'version': '1.2',
+            'creator': {'name': creator, 'version': version},
+            'pages': list(pages.values()),
+            'entries': entries
+        }}
+
+    def cache_stats(self):
+        """ประมาณการใช้แคชจาก Resource Timing (transferSize เป็น 0 เมื่ออ่านจากแคช)"""
+        stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'saved_bytes': 0}
+        with self.lock:
+            for record in self.records:
+                timing = record['timing']
+                if not timing or not timing.get('decodedBodySize'):
+                    # ข้ามโดเมนโดยไม่มี Timing-Allow-Origin จะไม่มีข้อมูลขนาด
+                    continue
+                transfer, body = timing.get('transferSize', 0), timing.get('encodedBodySize', 0)
+                if transfer == 0:
+                    stats['hits'] += 1
+                    stats['saved_bytes'] += body
+                elif transfer < body:
+                    # ได้ 304 Not Modified ส่งเฉพาะส่วนหัว
+                    stats['revalidated'] += 1
+                    stats['saved_bytes'] += body
+                else:
+                    stats['misses'] += 1
+        return stats
+
+    def export_har(self, path, creator='Unique Browser', version=''):
+        """บันทึกเป็นไฟล์ HAR คืนค่าจำนวนรายการ"""
+        har = self.to_har(creator, version)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(har, f, ensure_ascii=False, indent=2)
+        return len(har['log']['entries'])
+
+# ตัวคาดเดาการนำทางจากประวัติ เพื่อเชื่อมต่อและโหลดหน้าล่วงหน้าระหว่างพิมพ์ URL
+class NavigationPredictor:
+    """เก็บสถิติการเปลี่ยนจาก origin หนึ่งไปอีก origin หนึ่ง แล้วใช้ preconnect หรือ prerender ในหน้าสำรองที่ซ่อนอยู่"""
+
+    DEFAULTS = {
+        'enabled': True,
+        'preconnect_confidence': 0.3,
+        'prerender_confidence': 0.8,
+        'max_preconnects_per_minute': 20,
+        'max_prerenders_per_hour': 30,
+        'prerender_ttl_seconds': 30,
+        'min_free_memory_mb': 1024,
+        'session_gap_minutes': 30
+    }
+
+    # น้ำหนักของการเปลี่ยนจากหน้าปัจจุบันเทียบกับความถี่ในการเข้าชมโดยรวม
+    TRANSITION_WEIGHT = 4
+    # จำนวนการเข้าชมสมมติที่ไม่ตรงกับตัวเลือกใด เพื่อไม่ให้มั่นใจเกินไปเมื่อมีข้อมูลน้อย
+    PRIOR = 2
+    # preconnect ที่นานกว่านี้ถือว่าหมดอายุ (การเชื่อมต่อที่ไม่ได้ใช้จะถูกปิด)
+    PRECONNECT_SECONDS = 60
+
+    def __init__(self, window):
+        self.window = window
+        # origin -> จำนวนครั้งที่เข้าชม
+        self.visits = {}
+        # origin ต้นทาง -> {origin ปลายทาง: จำนวนครั้ง}
+        self.transitions = {}
+        # origin -> {URL: จำนวนครั้ง}
+        self.urls = {}
+
+        # หน้าสำรองที่ซ่อนอยู่ (มีได้หน้าเดียว) ใช้ทั้ง preconnect และ prerender
+        self.spare = None
+        self.spare_url = None
+        self.preconnected = {}
+        # เวลาที่คาดเดาแต่ละครั้ง ใช้จำกัดจำนวนต่อช่วงเวลา
+        self.budget = {'preconnect': deque(), 'prerender': deque()}
+        self.metrics = {'preconnects': 0, 'preconnect_hits': 0, 'preconnect_misses': 0,
+                        'prerenders': 0, 'prerender_swaps': 0, 'prerender_warm_hits': 0, 'prerender_misses': 0,
+                        'skipped_by_cap': 0}
+
+        self.typing_timer = QTimer()
+        self.typing_timer.setSingleShot(True)
+        self.typing_timer.setInterval(150)
+        self.typing_timer.timeout.connect(self.speculate)
+        self.expire_timer = QTimer()
+        self.expire_timer.setSingleShot(True)
+        self.expire_timer.timeout.connect(self.expire_spare)
+
+    def config(self, key):
+        """อ่านค่าตั้งค่าจาก settings['speculation'] หรือค่าเริ่มต้น"""
+        return self.window.settings.get('speculation', {}).get(key, self.DEFAULTS[key])
+
+    @staticmethod
+    def origin(url):
+        """origin ของ URL (เฉพาะ http และ https)"""
+        try:
+            parts = urlsplit(url.strip())
+        except ValueError:
+            return ''
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https') or not parts.netloc:
+            return ''
+        return f"{scheme}://{parts.netloc.lower()}"
+
+    @staticmethod
+    def bare(url):
+        """URL ที่ตัด scheme และ www. ออก (รูปแบบที่ผู้ใช้มักพิมพ์)"""
+        url = url.split('://', 1)[-1].lower()
+        return url[4:] if url.startswith('www.') else url
+
+    def load_history(self, history):
+        """สร้างสถิติจากประวัติ (รายการที่ห่างกันเกินกำหนดถือเป็นคนละช่วงการใช้งาน)"""
+        self.visits, self.transitions, self.urls = {}, {}, {}
+        gap = self.config('session_gap_minutes') * 60
+        previous = None
+        for item in history:
+            timestamp = item.get('timestamp', 0)
+            if previous is not None and timestamp - previous.get('timestamp', 0) > gap:
+                previous = None
+            self.learn(previous['url'] if previous else '', item.get('url', ''))
+            previous = item
+
+    def learn(self, from_url, to_url):
+        """บันทึกการนำทางหนึ่งครั้ง"""
+        target = self.origin(to_url)
+        if not target:
+            return
+        self.visits[target] = self.visits.get(target, 0) + 1
+        urls = self.urls.setdefault(target, {})
+        url = TabSearchIndex.normalize_url(to_url)
+        urls[url] = urls.get(url, 0) + 1
+        source = self.origin(from_url)
+        if source and source != target:
+            counts = self.transitions.setdefault(source, {})
+            counts[target] = counts.get(target, 0) + 1
+
+    def predict(self, current_url, text, limit=3):
+        """คาดเดาปลายทางจากข้อความที่พิมพ์ คืนค่า list ของ dict (origin, url, confidence)"""
+        text = text.strip().lower()
+        if not text or ' ' in text:
+            return []
+        typed = self.bare(text)
+
+        source = self.transitions.get(self.origin(current_url), {})
+        scores = {}
+        for origin, visits in self.visits.items():
+            host = self.bare(origin)
+            if host.startswith(typed) or typed.startswith(host + '/'):
+                scores[origin] = visits + self.TRANSITION_WEIGHT * source.get(origin, 0)
+        if not scores:
+            return []
+
+        total = sum(scores.values()) + self.PRIOR
+        predictions = []
+        for origin, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            # URL ที่เข้าชมบ่อยที่สุดของ origin นี้ ที่ตรงกับสิ่งที่พิมพ์
+            urls = self.urls.get(origin, {})
+            matching = {url: count for url, count in urls.items() if self.bare(url).startswith(typed)}
+            url, count = max(matching.items(), key=lambda item: item[1]) if matching else (origin, 0)
+            predictions.append({
+                'origin': origin,
+                'url': url,
+                'confidence': score / total,
+                'url_confidence': score / total * count / max(sum(urls.values()), 1)
+            })
+        return predictions
+
+    def text_edited(self, text):
+        """เรียกเมื่อผู้ใช้พิมพ์ใน url_bar (รอให้หยุดพิมพ์ครู่หนึ่งก่อนคาดเดา)"""
+        if self.config('enabled') and text.strip():
+            self.typing_timer.start()
+
+    def _allowed(self, kind, limit, period):
+        """ตรวจโควตาต่อช่วงเวลา (จำกัดแบนด์วิดท์ที่ใช้ไปกับการคาดเดา)"""
+        now = time.time()
+        budget = self.budget[kind]
+        while budget and now - budget[0] > period:
+            budget.popleft()
+        if len(budget) >= limit:
+            self.metrics['skipped_by_cap'] += 1
+            return False
+        budget.append(now)
+        return True
+
+    @staticmethod
+    def available_memory_mb():
+        """หน่วยความจำที่ใช้ได้ของระบบ (เฉพาะ Linux คืนค่า None ถ้าอ่านไม่ได้)"""
+        try:
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) // 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        return None
+
+    def speculate(self):
+        """คาดเดาจากข้อความใน url_bar แล้ว preconnect หรือ prerender ตามความมั่นใจ"""
+        window = self.window
+        browser = window.current_browser()
+        # ไม่คาดเดาในแท็บส่วนตัว (profile ส่วนตัวมีชื่อ จึงไม่ใช่ off-the-record)
+        if browser is None or window.is_private_browser(browser):
+            return
+        predictions = self.predict(browser.url().toString(), window.url_bar.text())
+        if not predictions:
+            return
+        best = predictions[0]
+        profile = browser.page().profile()
+        if best['url_confidence'] >= self.config('prerender_confidence') and best['url'].startswith('https://'):
+            self.prerender(best['url'], profile)
+        elif best['confidence'] >= self.config('preconnect_confidence'):
+            self.preconnect(best['origin'], profile)
+
+    def _spare_page(self, profile):
+        """คืนค่าหน้าสำรอง (สร้างใหม่ถ้ายังไม่มีหรือเป็นคนละ profile)"""
+        if self.spare is not None and self.spare.profile() is not profile:
+            self.discard_spare()
+        if self.spare is None:
+            self.spare = CustomWebEnginePage(profile)
+            self.spare.speculative = True
+            self.spare.setAudioMuted(True)
+            if hasattr(self.spare, 'setVisible'):
+                self.spare.setVisible(False)
+        self.expire_timer.start(int(self.config('prerender_ttl_seconds') * 1000))
+        return self.spare
+
+    def preconnect(self, origin, profile):
+        """เปิดการเชื่อมต่อ (DNS, TCP, TLS) ไปยัง origin ล่วงหน้า"""
+        now = time.time()
+        if now - self.preconnected.get(origin, 0) < self.PRECONNECT_SECONDS or self.spare_url:
+            return
+        if not self._allowed('preconnect', self.config('max_preconnects_per_minute'), 60):
+            return
+        self.preconnected[origin] = now
+        self.metrics['preconnects'] += 1
+
+        # ใช้ resource hint ในหน้าสำรองเปล่า เพื่อให้ Chromium เปิดการเชื่อมต่อใน network context ของ profile
+        links = ''.join(f'<link rel="preconnect" href="{o}"><link rel="dns-prefetch" href="{o}">'
+                        for o, at in self.preconnected.items() if now - at < self.PRECONNECT_SECONDS)
+        self._spare_page(profile).setHtml(f"<html><head>{links}</head></html>", QUrl("about:blank"))
+
+    def prerender(self, url, profile):
+        """โหลดหน้าทั้งหน้าล่วงหน้าในหน้าสำรองที่ซ่อนอยู่"""
+        if url == self.spare_url:
+            self.expire_timer.start()
+            return
+        memory = self.available_memory_mb()
+        if memory is not None and memory < self.config('min_free_memory_mb'):
+            self.metrics['skipped_by_cap'] += 1
+            return
+        if not self._allowed('prerender', self.config('max_prerenders_per_hour'), 3600):
+            return
+        if self.spare_url:
+            # การคาดเดาเปลี่ยนไป หน้าที่โหลดไว้ก่อนหน้าถือว่าไม่ได้ใช้
+            self.metrics['prerender_misses'] += 1
+        self.metrics['prerenders'] += 1
+        self.spare_url = url
+        self._spare_page(profile).load(QUrl(url))
+
+    def take_prerendered(self, url, profile):
+        """คืนค่าหน้าที่โหลดล่วงหน้าไว้ถ้าตรงกับ URL ที่นำทางและอยู่ใน profile เดียวกับแท็บ (ผู้เรียกเป็นเจ้าของหน้านั้นต่อ)"""
+        if not self.spare_url or TabSearchIndex.normalize_url(url) != TabSearchIndex.normalize_url(self.spare_url):
+            return None
+        if self.spare.profile() is not profile:
+            return None
+        page = self.spare
+        self.spare, self.spare_url = None, None
+        self.expire_timer.stop()
+        self.metrics['prerender_swaps'] += 1
+        return page
+
+    def navigated(self, from_url, to_url, remember=True):
+        """เรียกเมื่อผู้ใช้นำทางจาก url_bar: สรุป hit/miss ของการคาดเดา และเรียนรู้ (ยกเว้นโหมดส่วนตัว)"""
+        self.typing_timer.stop()
+        target = self.origin(to_url)
+        for origin in self.preconnected:
+            self.metrics['preconnect_hits' if origin == target else 'preconnect_misses'] += 1
+        self.preconnected.clear()
+
+        if self.spare_url:
+            if TabSearchIndex.normalize_url(to_url) == TabSearchIndex.normalize_url(self.spare_url):
+                # ไม่ได้สลับหน้า แต่ทรัพยากรอยู่ในแคชแล้ว
+                self.metrics['prerender_warm_hits'] += 1
+            else:
+                self.metrics['prerender_misses'] += 1
+            self.discard_spare()
+        if remember:
+            self.learn(from_url, to_url)
+
+    def expire_spare(self):
+        """ทิ้งหน้าสำรองที่ไม่ได้ใช้ภายในเวลาที่กำหนด"""
+        if self.spare_url:
+            self.metrics['prerender_misses'] += 1
+        self.discard_spare()
+
+    def discard_spare(self):
+        """ปิดหน้าสำรองเพื่อคืนหน่วยความจำ"""
+        self.expire_timer.stop()
+        if self.spare is not None:
+            self.spare.deleteLater()
+        self.spare, self.spare_url = None, None
+
+    def stats(self):
+        """สถิติการคาดเดา"""
+        stats = dict(self.metrics)
+        stats['prerender_hits'] = stats['prerender_swaps'] + stats['prerender_warm_hits']
+        return stats
+
+# นโยบายแคช HTTP ของแต่ละ profile
+class HttpCachePolicy:
+    """กำหนดชนิด ตำแหน่ง และขนาดสูงสุดของแคช HTTP ให้ทุก profile และอ่านสถิติของแคชบนดิสก์"""
+
+    _shared = None
+
+    DEFAULTS = {
+        'disk_cache_mb': 256,
+        'private_cache_mb': 32,
+        'path': ''
+    }
+
+    # ไฟล์ข้อมูลของแต่ละรายการใน Chromium simple cache (ชื่อเป็น hash 16 หลักตามด้วย _0)
+    ENTRY_FILE = re.compile(r'^[0-9a-f]{16}_0$')
+
+    def __init__(self):
+        self.settings = {}
+
+    @classmethod
+    def shared(cls):
+        """คืนค่านโยบายแคชเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def configure(self, settings):
+        """ใช้ค่าจาก settings['http_cache']"""
+        self.settings = settings
+
+    def config(self, key):
+        """อ่านค่าตั้งค่าหรือค่าเริ่มต้น"""
+        return self.settings.get(key, self.DEFAULTS[key])
+
+    def cache_path(self, profile):
+        """โฟลเดอร์แคชบนดิสก์ของ profile"""
+        base = self.config('path') or os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.CacheLocation),
+            "UniqueBrowser",
+            "http-cache"
+        )
+        return os.path.join(base, profile.storageName() or "Default")
+
+    def apply(self, profile, private=False):
+        """กำหนดนโยบายแคชให้ profile (ต้องเรียกก่อนโหลดหน้าแรก)"""
+        # เก็บสถานะไว้ใน profile เอง เพราะ id ของ profile ที่ถูกลบแล้วอาจถูกใช้ซ้ำ
+        if profile.property('cache_policy_applied'):
+            return
+        profile.setProperty('cache_policy_applied', True)
+
+        if private or profile.isOffTheRecord():
+            # แท็บส่วนตัวเก็บแคชในหน่วยความจำเท่านั้น และจำกัดขนาด
+            profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
+            profile.setHttpCacheMaximumSize(self.config('private_cache_mb') * 1024 * 1024)
+        else:
+            path = self.cache_path(profile)
+            os.makedirs(path, exist_ok=True)
+            profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+            profile.setCachePath(path)
+            profile.setHttpCacheMaximumSize(self.config('disk_cache_mb') * 1024 * 1024)
+
+    def disk_usage(self, profile):
+        """ขนาดบนดิสก์ (ไบต์) และจำนวนรายการในแคชของ profile"""
+        total, entries = 0, 0
+        pending = [profile.cachePath()]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                            if self.ENTRY_FILE.match(entry.name):
+                                entries += 1
+            except OSError:
+                continue
+        return total, entries
+
+class CacheStatsDialog(QDialog):
+    """แผงแสดงสถิติแคช HTTP: ขนาดบนดิสก์ จำนวนรายการ และอัตราการใช้แคชโดยประมาณ"""
+
+    def __init__(self, policy, profile, network_log, parent=None):
+        super().__init__(parent)
+        self.policy = policy
+        self.profile = profile
+        self.network_log = network_log
+
+        self.setWindowTitle("แคช HTTP")
+        self.resize(460, 260)
+
+        layout = QVBoxLayout(self)
+        self.info_label = QLabel()
+        self.info_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.info_label)
+
+        buttons = QHBoxLayout()
+        refresh_button = QPushButton("รีเฟรช")
+        refresh_button.clicked.connect(self.refresh)
+        buttons.addWidget(refresh_button)
+        clear_button = QPushButton("ล้างแคช")
+        clear_button.clicked.connect(self.clear_cache)
+        buttons.addWidget(clear_button)
+        close_button = QPushButton("ปิด")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        """อ่านสถิติใหม่"""
+        profile = self.profile
+        if profile.httpCacheType() == QWebEngineProfile.MemoryHttpCache:
+            location = "หน่วยความจำ (ไม่บันทึกลงดิสก์)"
+            size, entries = 0, 0
+        else:
+            location = profile.cachePath()
+            size, entries = self.policy.disk_usage(profile)
+
+        stats = self.network_log.cache_stats()
+        checked = stats['hits'] + stats['revalidated'] + stats['misses']
+        if checked:
+            hit_rate = f"{(stats['hits'] + stats['revalidated']) * 100 / checked:.0f}% " \
+                       f"(จากแคช {stats['hits']}, ตรวจสอบซ้ำ {stats['revalidated']}, จากเครือข่าย {stats['misses']})"
+        else:
+            hit_rate = "ยังไม่มีข้อมูล"
+
+        self.info_label.setText(
+            f"ตำแหน่ง: {location}\n"
+            f"ขนาดสูงสุด: {profile.httpCacheMaximumSize() / (1024 * 1024):.0f} MB\n"
+            f"ขนาดบนดิสก์: {size / (1024 * 1024):.1f} MB\n"
+            f"จำนวนรายการ: {entries}\n\n"
+            f"อัตราการใช้แคชโดยประมาณ: {hit_rate}\n"
+            f"ข้อมูลที่ไม่ต้องดาวน์โหลดซ้ำ: {stats['saved_bytes'] / (1024 * 1024):.1f} MB"
+        )
+
+    def clear_cache(self):
+        """ล้างแคช HTTP ของ profile นี้"""
+        self.profile.clearHttpCache()
+        # การล้างแคชทำงานแบบ asynchronous จึงรีเฟรชหลังจากผ่านไปครู่หนึ่ง
+        QTimer.singleShot(1000, self.refresh)
+
+# หน้าภายในของเบราว์เซอร์ (unique://history, unique://downloads, ...)
+class InternalSchemeHandler(QWebEngineUrlSchemeHandler):
+    """ให้บริการหน้าภายในจากเทมเพลตในหน่วยความจำ และ JSON แบบแบ่งหน้าจากข้อมูลของหน้าต่าง"""
+
+    _shared = None
+
+    SCHEME = b'unique'
+
+    # หน้าที่มี: ชื่อ host -> ชื่อหน้า
+    PAGES = {
+        'history': 'ประวัติการเข้าชม',
+        'downloads': 'ดาวน์โหลด',
+        'settings': 'ตั้งค่า',
+        'shortcuts': 'ปุ่มลัด',
+        'archive': 'หน้าที่บันทึกไว้อ่านออฟไลน์',
+        'about': 'เกี่ยวกับ Unique Browser'
+    }
+
+    SHORTCUTS = [
+        ('ปุ่มลัดหลัก', [
+            ('Ctrl+T', 'แท็บใหม่'),
+            ('Ctrl+W', 'ปิดแท็บปัจจุบัน'),
+            ('Ctrl+Shift+T', 'เปิดแท็บที่ปิดล่าสุด'),
+            ('Ctrl+Tab', 'แท็บถัดไป'),
+            ('Ctrl+Shift+Tab', 'แท็บก่อนหน้า'),
+            ('Ctrl+Shift+A', 'ค้นหาแท็บจากทุกหน้าต่าง'),
+            ('Ctrl+1-8', 'ไปแท็บที่ 1-8'),
+            ('Ctrl+9', 'ไปแท็บสุดท้าย'),
+            ('Alt+Left', 'ย้อนกลับ'),
+            ('Alt+Right', 'ไปข้างหน้า'),
+            ('F5', 'รีเฟรช'),
+            ('Ctrl+F', 'ค้นหาในหน้า'),
+            ('F11', 'โหมดเต็มหน้าจอ'),
+            ('Ctrl+Shift+D', 'โหมดกลางคืน'),
+            ('Ctrl+Shift+P', 'โหมดส่วนตัว'),
+            ('F12', 'เครื่องมือนักพัฒนา')
+        ]),
+        ('การนำทาง', [
+            ('Alt+Home', 'หน้าแรก'),
+            ('Ctrl+L', 'โฟกัสที่แถบที่อยู่'),
+            ('Ctrl+Enter', 'เพิ่ม www. และ .com')
+        ]),
+        ('อื่นๆ', [
+            ('Ctrl+Shift+Del', 'เคลียร์ข้อมูลการท่องเว็บ'),
+            ('Ctrl+,', 'ตั้งค่า'),
+            ('F1', 'วิธีใช้')
+        ])
+    ]
+
+    FEATURES = ['ระบบแท็บขั้นสูง', 'โหมดส่วนตัว', 'โหมดกลางคืน', 'การจัดการบุ๊กมาร์ก',
+                'ประวัติการเข้าชม', 'ระบบดาวน์โหลด', 'เครื่องมือนักพัฒนา']
+
+    # จำนวนรายการสูงสุดต่อการร้องขอหนึ่งครั้ง
+    MAX_LIMIT = 500
+
+    # เทมเพลตเดียวใช้กับทุกหน้า รายการถูกโหลดทีละหน้าเมื่อเลื่อนถึงท้ายรายการ
+    TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{{title}}</title>
+<style>
+body { font-family: sans-serif; margin: 0 auto; max-width: 960px; padding: 16px 24px; color: #222; background: #fff; }
+h1 { font-size: 22px; font-weight: normal; }
+#search { width: 100%; box-sizing: border-box; padding: 8px; font-size: 14px; margin-bottom: 12px; }
+#count { color: #888; font-size: 13px; margin-bottom: 8px; }
+.row { padding: 8px 4px; border-bottom: 1px solid #eee; display: flex; gap: 12px; }
+.main { flex: 1; min-width: 0; }
+.title { display: block; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; color: #1a5fb4; text-decoration: none; }
+.subtitle { color: #666; font-size: 12px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+.meta { color: #888; font-size: 12px; white-space: nowrap; }
+.group { font-weight: bold; padding-top: 16px; }
+@media (prefers-color-scheme: dark) {
+  body { color: #ddd; background: #1e1e1e; }
+  .row { border-color: #333; }
+  .title { color: #8ab4f8; }
+}
+</style>
+</head>
+<body>
+<h1>{{title}}</h1>
+<input id="search" type="search" placeholder="ค้นหา..." autofocus>
+<div id="count"></div>
+<div id="list"></div>
+<div id="more"></div>
+<script>
+(function () {
+  var list = document.getElementById('list');
+  var more = document.getElementById('more');
+  var count = document.getElementById('count');
+  var search = document.getElementById('search');
+  var offset = 0, next = 0, loading = false, generation = 0, query = '';
+  var safeLink = /^(https?|ftp|unique):/i;
+
+  function row(item) {
+    var div = document.createElement('div');
+    div.className = item.group ? 'row group' : 'row';
+    var main = document.createElement('div');
+    main.className = 'main';
+    var title = document.createElement(item.url && safeLink.test(item.url) ? 'a' : 'span');
+    title.className = 'title';
+    title.textContent = item.title;
+    if (title.tagName === 'A') title.href = item.url;
+    main.appendChild(title);
+    if (item.subtitle) {
+      var subtitle = document.createElement('div');
+      subtitle.className = 'subtitle';
+      subtitle.textContent = item.subtitle;
+      main.appendChild(subtitle);
+    }
+    div.appendChild(main);
+    if (item.meta) {
+      var meta = document.createElement('div');
+      meta.className = 'meta';
+      meta.textContent = item.meta;
+      div.appendChild(meta);
+    }
+    return div;
+  }
+
+  function load() {
+    if (loading || next === null) return;
+    loading = true;
+    var current = generation;
+    fetch('/api?offset=' + next + '&limit=100&q=' + encodeURIComponent(query))
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        if (current !== generation) return;
+        var fragment = document.createDocumentFragment();
+        data.items.forEach(function (item) { fragment.appendChild(row(item)); });
+        list.appendChild(fragment);
+        next = data.next;
+        count.textContent = data.total + ' รายการ';
+      })
+      .finally(function () {
+        loading = false;
+        if (current !== generation) load();
+        else if (next !== null && more.getBoundingClientRect().top < window.innerHeight * 2) load();
+      });
+  }
+
+  new IntersectionObserver(function (entries) {
+    if (entries[0].isIntersecting) load();
+  }, {rootMargin: '800px'}).observe(more);
+
+  var timer = null;
+  search.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+      query = search.value;
+      generation += 1;
+      next = 0;
+      list.textContent = '';
+      load();
+    }, 150);
+  });
+  if (!{{searchable}}) search.style.display = 'none';
+  load();
+})();
+</script>
+</body>
+</html>
+"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # หน้าต่างที่ลงทะเบียนไว้ (ใช้ข้อมูลของหน้าต่างที่กำลังใช้งาน)
+        self.windows = []
+        # เทมเพลตที่แปลงเป็น bytes แล้ว (สร้างครั้งเดียวต่อหน้า)
+        self.rendered = {}
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการ scheme เดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def register_scheme(cls):
+        """ลงทะเบียน scheme unique:// (ต้องเรียกก่อนสร้าง QApplication และต้องใช้ Qt 5.12 ขึ้นไป)"""
+        if QWebEngineUrlScheme is None:
+            return
+        scheme = QWebEngineUrlScheme(cls.SCHEME)
+        scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+        # LocalScheme: หน้าเว็บทั่วไปโหลดหรือฝังหน้าภายในไม่ได้
+        flags = QWebEngineUrlScheme.SecureScheme | QWebEngineUrlScheme.LocalScheme
+        if hasattr(QWebEngineUrlScheme, 'CorsEnabled'):
+            flags |= QWebEngineUrlScheme.CorsEnabled
+        scheme.setFlags(flags)
+        QWebEngineUrlScheme.registerScheme(scheme)
+
+    def install(self, profile):
+        """ติดตั้งตัวจัดการบน profile (ครั้งเดียวต่อ profile)"""
+        if profile.urlSchemeHandler(self.SCHEME) is None:
+            profile.installUrlSchemeHandler(self.SCHEME, self)
+
+    def add_window(self, window):
+        """ลงทะเบียนหน้าต่างที่เป็นแหล่งข้อมูล"""
+        if window not in self.windows:
+            self.windows.append(window)
+
+    def remove_window(self, window):
+        """ยกเลิกการลงทะเบียนหน้าต่าง"""
+        if window in self.windows:
+            self.windows.remove(window)
+
+    def current_window(self):
+        """หน้าต่างที่กำลังใช้งาน (หรือหน้าต่างล่าสุด)"""
+        active = QApplication.activeWindow()
+        if active in self.windows:
+            return active
+        return self.windows[-1] if self.windows else None
+
+    def render(self, name):
+        """HTML ของหน้า (แปลงจากเทมเพลตครั้งเดียวแล้วเก็บไว้)"""
+        page = self.rendered.get(name)
+        if page is None:
+            title = self.PAGES[name].replace('&', '&amp;').replace('<', '&lt;')
+            page = (self.TEMPLATE.replace('{{title}}', title)
+                    .replace('{{searchable}}', 'false' if name == 'about' else 'true')
+                    .encode('utf-8'))
+            self.rendered[name] = page
+        return page
+
+    @staticmethod
+    def format_time(timestamp):
+        """แปลงเวลาเป็นข้อความ"""
+        return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp else ''
+
+    @staticmethod
+    def item_text(item):
+        """ข้อความสำหรับค้นของ item ที่สร้างไว้แล้ว (หน้า shortcuts และ about)"""
+        return f"{item['title']}\n{item.get('meta', '')}"
+
+    def source(self, name, window):
+        """รายการของหน้า (ใหม่สุดก่อน) ฟังก์ชันแปลงเป็น item และฟังก์ชันคืนข้อความสำหรับค้นจากข้อมูลดิบ"""
+        if name == 'history':
+            history = window.settings.get('history', [])
+            return reversed(history), len(history), lambda entry: {
+                'title': entry.get('title') or entry.get('url', ''),
+                'subtitle': entry.get('url', ''),
+                'url': entry.get('url', ''),
+                'meta': self.format_time(entry.get('timestamp'))
+            }, lambda entry: f"{entry.get('title') or ''}\n{entry.get('url', '')}"
+        if name == 'downloads':
+            manager = window.download_manager
+            downloads = manager.items
+            return reversed(downloads), len(downloads), lambda item: {
+                'title': os.path.basename(item.path),
+                'subtitle': item.path,
+                'url': item.url,
+                'meta': f"{self.format_time(item.start_time)} • {manager.describe(item)}"
+            }, lambda item: f"{item.path}\n{item.url}"
+        if name == 'settings':
+            # ประวัติและบุ๊กมาร์กมีหน้าของตัวเอง
+            items = [(key, value) for key, value in sorted(window.settings.items())
+                     if key not in ('history', 'bookmarks')]
+            return iter(items), len(items), lambda entry: {
+                'title': entry[0],
+                'subtitle': json.dumps(entry[1], ensure_ascii=False)[:300]
+            }, lambda entry: f"{entry[0]}\n{json.dumps(entry[1], ensure_ascii=False)}"
+        if name == 'shortcuts':
+            items = []
+            for group, shortcuts in self.SHORTCUTS:
+                items.append({'title': group, 'group': True})
+                items.extend({'title': description, 'meta': key} for key, description in shortcuts)
+            return iter(items), len(items), dict, self.item_text
+        if name == 'archive':
+            entries = window.offline_archive.list_entries()
+            return iter(entries), len(entries), lambda entry: {
+                'title': entry['title'],
+                'subtitle': entry['url'],
+                'url': f"unique://archive/open?id={entry['id']}",
+                'meta': f"{self.format_time(entry['saved'])} · {entry['size'] / (1024 * 1024):.1f} MB"
+            }, lambda entry: f"{entry['title']}\n{entry['url']}"
+        items = [
+            {'title': window.app_name, 'meta': f"เวอร์ชัน {window.version}"},
+            {'title': 'Python', 'meta': platform.python_version()},
+            {'title': 'Qt / PyQt', 'meta': f"{QT_VERSION_STR} / {PYQT_VERSION_STR}"},
+            {'title': 'ระบบปฏิบัติการ', 'meta': platform.platform()},
+            {'title': 'คุณสมบัติ', 'group': True}
+        ] + [{'title': feature} for feature in self.FEATURES]
+        return iter(items), len(items), dict, self.item_text
+
+    def query(self, name, window, offset=0, limit=100, text=''):
+        """รายการหนึ่งหน้าที่ตรงกับคำค้น คืนค่า dict (items, total, next)"""
+        limit = max(1, min(limit, self.MAX_LIMIT))
+        entries, total, make_item, search_text = self.source(name, window)
+        if text:
+            # กรองจากข้อมูลดิบแล้วนับจำนวนทั้งหมด แต่แปลงเป็น item (จัดรูปแบบเวลา ฯลฯ) เฉพาะรายการในหน้าที่ขอ
+            text = text.lower()
+            total, items = 0, []
+            for entry in entries:
+                if text in search_text(entry).lower():
+                    if offset <= total < offset + limit:
+                        items.append(make_item(entry))
+                    total += 1
+        else:
+            items = [make_item(entry) for entry in itertools.islice(entries, offset, offset + limit)]
+        return {'items': items, 'total': total, 'next': offset + limit if offset + limit < total else None}
+
+    def requestStarted(self, job):
+        """เรียกเมื่อมีการร้องขอ unique://<หน้า>/ หรือ unique://<หน้า>/api"""
+        try:
+            url = job.requestUrl()
+            name = url.host()
+            window = self.current_window()
+            if name not in self.PAGES or window is None:
+                job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+                return
+
+            if url.path() == '/api':
+                params = QUrlQuery(url)
+                result = self.query(name, window,
+                                    offset=max(0, int(params.queryItemValue('offset') or 0)),
+                                    limit=int(params.queryItemValue('limit') or 100),
+                                    text=params.queryItemValue('q', QUrl.FullyDecoded))
+                self.reply(job, b'application/json', json.dumps(result, ensure_ascii=False).encode('utf-8'))
+            elif url.path() in ('', '/'):
+                self.reply(job, b'text/html', self.render(name))
+            else:
+                job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+        except ValueError:
+            job.fail(QWebEngineUrlRequestJob.UrlInvalid)
+        except Exception as e:
+            print(f"Error in InternalSchemeHandler.requestStarted: {e}")
+            job.fail(QWebEngineUrlRequestJob.RequestFailed)
+
+    @staticmethod
+    def reply(job, content_type, data):
+        """ส่งข้อมูลกลับให้ job (buffer ถูกลบพร้อม job)"""
+        buffer = QBuffer(job)
+        buffer.setData(data)
+        buffer.open(QIODevice.ReadOnly)
+        job.reply(content_type, buffer)
+
+# คลังหน้าเว็บสำหรับอ่านออฟไลน์
+class OfflineArchive(QObject):
+    """บันทึกหน้าเป็น MHTML แยกเป็นทรัพยากร และเก็บแต่ละทรัพยากรครั้งเดียวตาม hash ของเนื้อหา"""
+
+    # (จำนวนไบต์ใหม่, จำนวนไบต์ทั้งหมด, ชื่อหน้า) หรือ (ข้อความผิดพลาด, ชื่อหน้า)
+    saved = pyqtSignal(int, int, str)
+    failed = pyqtSignal(str, str)
+
+    _shared = None
+
+    # เวลาสูงสุดที่รอให้ WebEngine บันทึกหน้าเสร็จ ก่อนปล่อยช่องให้หน้าถัดไป
+    SAVE_TIMEOUT = 120
+
+    # ส่วนหัวที่ Chromium สร้างใหม่ทุกครั้งที่บันทึก ไม่นับรวมใน manifest (เก็บไว้ในรายการของดัชนีแทน)
+    VOLATILE_HEADERS = {'date'}
+    VOLATILE_PART_HEADERS = {'content-id'}
+
+    def __init__(self, root=None, concurrency=3):
+        super().__init__()
+        self.root = root or os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "archive"
+        )
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        self.executor = None
+        # หน้าที่รอบันทึก และหน้าที่ WebEngine กำลังบันทึก (path ชั่วคราว -> ข้อมูล)
+        self.queue = deque()
+        self.active = {}
+        self.entries = self.load_index()
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าคลังเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def path(self, *parts):
+        """path ภายในโฟลเดอร์คลัง"""
+        return os.path.join(self.root, *parts)
+
+    def load_index(self):
+        """อ่านดัชนีของหน้าที่บันทึกไว้ (id -> ข้อมูล)"""
+        try:
+            with open(self.path('index.json'), 'r', encoding='utf-8') as f:
+                return {entry['id']: entry for entry in json.load(f)}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def write_index(self):
+        """บันทึกดัชนี (เรียกขณะถือ lock)"""
+        temp_path = self.path('index.json.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(list(self.entries.values()), f, ensure_ascii=False)
+        os.replace(temp_path, self.path('index.json'))
+
+    def list_entries(self):
+        """หน้าที่บันทึกไว้ ใหม่สุดก่อน"""
+        with self.lock:
+            return sorted(self.entries.values(), key=lambda entry: entry['saved'], reverse=True)
+
+    # ---- การบันทึก ----
+
+    def request_save(self, page):
+        """เพิ่มหน้าในคิวบันทึก (บันทึกพร้อมกันได้ไม่เกิน concurrency หน้า)"""
+        self.queue.append(page)
+        self.pump()
+
+    def pump(self):
+        """เริ่มบันทึกหน้าถัดไปในคิวเมื่อมีช่องว่าง"""
+        now = time.time()
+        for temp_path, job in list(self.active.items()):
+            if now - job['started'] > self.SAVE_TIMEOUT:
+                del self.active[temp_path]
+                self.failed.emit("หมดเวลาบันทึก", job['title'])
+
+        while self.queue and len(self.active) < self.concurrency:
+            page = self.queue.popleft()
+            try:
+                os.makedirs(self.path('tmp'), exist_ok=True)
+                temp_path = self.path('tmp', f"{os.getpid()}-{id(page)}-{int(now * 1000)}.mhtml")
+                self.active[temp_path] = {'url': page.url().toString(), 'title': page.title(),
+                                          'started': now, 'download': None}
+                page.save(temp_path, QWebEngineDownloadItem.MimeHtmlSaveFormat)
+            except RuntimeError:
+                # แท็บถูกปิดก่อนถึงคิว
+                continue
+
+    def handles(self, download):
+        """ตรวจว่าการดาวน์โหลดนี้คือการบันทึกหน้าลงคลังหรือไม่"""
+        return download.path() in self.active
+
+    def attach(self, download):
+        """รับการบันทึกหน้าจาก downloadRequested (เรียกจากทุกหน้าต่างได้ รับครั้งเดียว)"""
+        job = self.active.get(download.path())
+        if job is None or job['download'] is not None:
+            return
+        job['download'] = download
+        download.accept()
+        download.finished.connect(lambda: self.save_finished(download))
+
+    def save_finished(self, download):
+        """WebEngine บันทึก MHTML เสร็จ: ส่งต่อให้ thread แยกทรัพยากรและเก็บลงคลัง"""
+        job = self.active.pop(download.path(), None)
+        if job is not None:
+            if download.state() == QWebEngineDownloadItem.DownloadCompleted:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=2)
+                self.executor.submit(self.ingest_job, download.path(), job['url'], job['title'])
+            else:
+                self.failed.emit("บันทึกหน้าไม่สำเร็จ", job['title'])
+        self.pump()
+
+    def ingest_job(self, mhtml_path, url, title):
+        """งานใน thread: เก็บไฟล์ MHTML ลงคลัง แล้วลบไฟล์ชั่วคราว"""
+        try:
+            with open(mhtml_path, 'rb') as f:
+                data = f.read()
+            entry, new_bytes = self.ingest(data, url, title)
+            self.saved.emit(new_bytes, entry['size'], title)
+        except Exception as e:
+            self.failed.emit(str(e), title)
+        finally:
+            try:
+                os.remove(mhtml_path)
+            except OSError:
+                pass
+
+    def store_object(self, data):
+        """เก็บข้อมูลตาม hash (ถ้ามีอยู่แล้วไม่เขียนซ้ำ) คืนค่า (hash, จำนวนไบต์ที่เขียนใหม่)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path('objects', digest[:2], digest[2:])
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return digest, len(data)
+
+    def read_object(self, digest):
+        """อ่านข้อมูลจาก hash"""
+        with open(self.path('objects', digest[:2], digest[2:]), 'rb') as f:
+            return f.read()
+
+    def ingest(self, data, url, title):
+        """แยก MHTML เป็นทรัพยากร เก็บแต่ละส่วนตาม hash และเพิ่มหน้าในดัชนี"""
+        message = BytesParser(policy=email.policy.compat32).parsebytes(data)
+        if not message.is_multipart():
+            raise ValueError("ไฟล์ไม่ใช่ MHTML")
+
+        new_bytes, total = 0, 0
+        parts, part_volatile = [], []
+        for part in message.get_payload():
+            payload = part.get_payload(decode=True) or b''
+            digest, written = self.store_object(payload)
+            new_bytes += written
+            total += len(payload)
+            # เก็บส่วนหัวเดิมไว้ ยกเว้นการเข้ารหัส (ประกอบกลับด้วย base64 เสมอ)
+            headers = [[name, value] for name, value in part.items()
+                       if name.lower() not in self.VOLATILE_PART_HEADERS
+                       and name.lower() != 'content-transfer-encoding']
+            part_volatile.append([[name, value] for name, value in part.items()
+                                  if name.lower() in self.VOLATILE_PART_HEADERS])
+            parts.append({'headers': headers, 'object': digest, 'size': len(payload)})
+
+        headers = [[name, value] for name, value in message.items()
+                   if name.lower() not in self.VOLATILE_HEADERS and name.lower() != 'content-type']
+        volatile = [[name, value] for name, value in message.items() if name.lower() in self.VOLATILE_HEADERS]
+        manifest = json.dumps({'url': url, 'headers': headers,
+                               'type': message.get_param('type', 'text/html'), 'parts': parts},
+                              ensure_ascii=False, sort_keys=True).encode('utf-8')
+        manifest_id, written = self.store_object(manifest)
+        new_bytes += written
+
+        # หน้าเดิมที่เนื้อหาไม่เปลี่ยนได้ manifest เดิม จึงอัพเดทรายการเดิมแทนการเพิ่มใหม่
+        entry = {'id': manifest_id[:16], 'manifest': manifest_id, 'url': url, 'title': title or url,
+                 'saved': int(time.time()), 'size': total, 'parts': len(parts),
+                 'headers': volatile, 'part_headers': part_volatile}
+        with self.lock:
+            self.entries[entry['id']] = entry
+            self.write_index()
+        return entry, new_bytes
+
+    # ---- การเปิดหน้า ----
+
+    def assemble(self, entry_id):
+        """ประกอบ MHTML กลับจากทรัพยากรในคลังลงไฟล์ชั่วคราว คืนค่า path"""
+        with self.lock:
+            entry = self.entries[entry_id]
+        manifest = json.loads(self.read_object(entry['manifest']).decode('utf-8'))
+        boundary = f"----UniqueBrowserArchive-{entry['manifest'][:24]}----"
+
+        directory = os.path.join(QStandardPaths.writableLocation(QStandardPaths.TempLocation),
+                                 "unique-browser-archive")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{entry_id}.mhtml")
+        with open(path, 'wb') as f:
+            def write_headers(headers):
+                for name, value in headers:
+                    f.write(f"{name}: {value}\r\n".encode('utf-8'))
+
+            write_headers(manifest['headers'] + entry.get('headers', []))
+            f.write(f'Content-Type: multipart/related;\r\n\ttype="{manifest["type"]}";\r\n'
+                    f'\tboundary="{boundary}"\r\n\r\n'.encode('ascii'))
+            # ส่วนหัวที่เปลี่ยนทุกครั้งที่บันทึก (เช่น Content-ID ที่ iframe อ้างถึง) มาจากการบันทึกครั้งล่าสุด
+            part_headers = entry.get('part_headers') or [[] for _ in manifest['parts']]
+            for part, volatile in zip(manifest['parts'], part_headers):
+                f.write(f"--{boundary}\r\n".encode('ascii'))
+                write_headers(part['headers'] + volatile)
+                f.write(b"Content-Transfer-Encoding: base64\r\n\r\n")
+                f.write(base64.encodebytes(self.read_object(part['object'])).replace(b'\n', b'\r\n'))
+                f.write(b"\r\n")
+            f.write(f"--{boundary}--\r\n".encode('ascii'))
+        return path
+
+# ตัวช่วยฝั่ง Python ของสคริปต์ PAC (DNS และ IP ของเครื่อง) ที่เปิดให้สคริปต์เรียกได้เพียงสองฟังก์ชัน
+class PacHostBridge(QObject):
+    """ให้บริการ dnsResolve และ myIpAddress แก่สคริปต์ PAC"""
+
+    @pyqtSlot(str, result=str)
+    def resolve(self, host):
+        """แปลงชื่อโฮสต์เป็น IPv4 (คืนค่าว่างถ้าแปลงไม่ได้)"""
+        try:
+            return socket.getaddrinfo(host, None, socket.AF_INET)[0][4][0]
+        except (OSError, IndexError, UnicodeError):
+            return ""
+
+    @pyqtSlot(result=str)
+    def local_address(self):
+        """IPv4 ของเครื่องบนเส้นทางออกหลัก (ไม่มีการส่งแพ็กเก็ตจริง)"""
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.connect(("192.0.2.1", 9))
+                return sock.getsockname()[0]
+        except OSError:
+            return "127.0.0.1"
+
+# ส่งคำถามหา proxy ของ Qt Network ไปยัง ProxyManager (Qt เป็นเจ้าของออบเจ็กต์นี้หลังติดตั้ง)
+class PacProxyFactory(QNetworkProxyFactory):
+    def __init__(self, manager):
+        super().__init__()
+        self.manager = manager
+
+    def queryProxy(self, query):
+        try:
+            return self.manager.resolve(query.url())
+        except Exception as e:
+            print(f"Error resolving proxy: {e}")
+            return [QNetworkProxy(QNetworkProxy.NoProxy)]
+
+class ProxyManager:
+    """ตั้งค่า proxy แบบระบบ กำหนดเอง หรือสคริปต์ PAC และจำผลของ PAC ต่อโฮสต์ตามเวลาที่กำหนด"""
+
+    _shared = None
+
+    DEFAULTS = {
+        'mode': 'system',
+        'type': 'http',
+        'host': '',
+        'port': 8080,
+        'pac_url': '',
+        'pac_cache_ttl': 300
+    }
+
+    # จำนวนโฮสต์สูงสุดในแคชผลของ PAC และเวลาสูงสุดที่สคริปต์ทำงานได้ต่อครั้ง
+    CACHE_SIZE = 512
+    EVAL_TIMEOUT = 0.5
+
+    TYPES = {
+        'http': QNetworkProxy.HttpProxy,
+        'socks5': QNetworkProxy.Socks5Proxy
+    }
+
+    # ฟังก์ชันมาตรฐานของ PAC ที่สคริปต์เรียกใช้ได้ (DNS ผ่าน PacHostBridge เท่านั้น)
+    PAC_UTILS = r"""
+var dnsResolve, myIpAddress;
+(function (bridge) {
+    dnsResolve = function (host) { return bridge.resolve(String(host)) || null; };
+    myIpAddress = function () { return bridge.local_address(); };
+})(__pac_bridge);
+delete this.__pac_bridge;
+
+function isPlainHostName(host) { return String(host).indexOf(".") < 0; }
+function dnsDomainIs(host, domain) {
+    host = String(host).toLowerCase(); domain = String(domain).toLowerCase();
+    return host.length >= domain.length && host.substring(host.length - domain.length) === domain;
+}
+function localHostOrDomainIs(host, hostdom) {
+    host = String(host).toLowerCase(); hostdom = String(hostdom).toLowerCase();
+    return host === hostdom || hostdom.lastIndexOf(host + ".", 0) === 0;
+}
+function isResolvable(host) { return dnsResolve(host) !== null; }
+function dnsDomainLevels(host) { return String(host).split(".").length - 1; }
+function convert_addr(ip) {
+    var p = String(ip).split(".");
+    return ((p[0] << 24) | (p[1] << 16) | (p[2] << 8) | p[3]) >>> 0;
+}
+function isInNet(host, pattern, mask) {
+    var ip = /^\d+\.\d+\.\d+\.\d+$/.test(host) ? host : dnsResolve(host);
+    if (!ip) return false;
+    return ((convert_addr(ip) & convert_addr(mask)) >>> 0) === ((convert_addr(pattern) & convert_addr(mask)) >>> 0);
+}
+function shExpMatch(str, shexp) {
+    var re = String(shexp).replace(/[.+^${}()|[\]\\]/g, "\\$&").replace(/\*/g, ".*").replace(/\?/g, ".");
+    return new RegExp("^" + re + "$").test(str);
+}
+function __pac_args(args) {
+    var a = Array.prototype.slice.call(args), gmt = a.length > 0 && a[a.length - 1] === "GMT";
+    if (gmt) a.pop();
+    return { args: a, now: new Date(), gmt: gmt };
+}
+function __pac_between(value, start, end) {
+    return start <= end ? value >= start && value <= end : value >= start || value <= end;
+}
+function weekdayRange() {
+    var c = __pac_args(arguments), days = "SUNMONTUEWEDTHUFRISAT";
+    var today = c.gmt ? c.now.getUTCDay() : c.now.getDay();
+    var start = days.indexOf(String(c.args[0]).toUpperCase()) / 3;
+    var end = c.args.length > 1 ? days.indexOf(String(c.args[1]).toUpperCase()) / 3 : start;
+    return __pac_between(today, start, end);
+}
+function dateRange() {
+    var c = __pac_args(arguments), months = "JANFEBMARAPRMAYJUNJULAUGSEPOCTNOVDEC";
+    var now = [c.gmt ? c.now.getUTCFullYear() : c.now.getFullYear(),
+               c.gmt ? c.now.getUTCMonth() : c.now.getMonth(),
+               c.gmt ? c.now.getUTCDate() : c.now.getDate()];
+    function key(parts) {
+        var k = [null, null, null];
+        parts.forEach(function (v) {
+            if (typeof v === "string") k[1] = months.indexOf(v.toUpperCase()) / 3;
+            else if (v > 31) k[0] = v;
+            else k[2] = v;
+        });
+        return k;
+    }
+    function number(k, source) {
+        var n = 0;
+        for (var i = 0; i < 3; i++) if (k[i] !== null) n = n * 10000 + source[i];
+        return n;
+    }
+    var half = c.args.length > 1 ? c.args.length / 2 : 1;
+    var start = key(c.args.slice(0, half)), end = c.args.length > 1 ? key(c.args.slice(half)) : start;
+    return __pac_between(number(start, now), number(start, start), number(start, end));
+}
+function timeRange() {
+    var c = __pac_args(arguments), a = c.args;
+    var now = [c.gmt ? c.now.getUTCHours() : c.now.getHours(),
+               c.gmt ? c.now.getUTCMinutes() : c.now.getMinutes(),
+               c.gmt ? c.now.getUTCSeconds() : c.now.getSeconds()];
+    var half = a.length > 1 ? a.length / 2 : 1;
+    function number(parts) {
+        var n = 0;
+        for (var i = 0; i < half; i++) n = n * 60 + parts[i];
+        return n;
+    }
+    var start = a.slice(0, half), end = a.length > 1 ? a.slice(half) : start;
+    return __pac_between(number(now), number(start), number(end));
+}
+"""
+
+    def __init__(self):
+        self.settings = {}
+        self.pac_script = ''
+        # ที่อยู่ของสคริปต์ PAC ที่ใช้อยู่ และ thread ที่กำลังดาวน์โหลด
+        self.pac_location = ''
+        self.fetch_thread = None
+        # เพิ่มทุกครั้งที่สคริปต์เปลี่ยน เพื่อให้แต่ละเธรดสร้าง engine ใหม่
+        self.pac_version = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        # (scheme, host) -> (เวลาหมดอายุ, รายการ proxy)
+        self.cache = {}
+        self.stats = {'hits': 0, 'misses': 0, 'errors': 0, 'eval_time': 0.0}
+        self.chromium_flags_set = False
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการ proxy เดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def configure(self, settings, wait=False):
+        """ใช้ค่าจาก settings['proxy'] สคริปต์ PAC จาก URL ดาวน์โหลดในเบื้องหลัง โดยระหว่างรอใช้สำเนาล่าสุด
+        หรือเชื่อมต่อโดยตรง (wait=True ดาวน์โหลดทันที ใช้ในหน้าต่างทดสอบ)"""
+        self.settings = settings
+        location = ''
+        if self.config('mode') == 'pac' and QJSEngine is not None:
+            location = self.config('pac_url')
+        self.pac_location = location
+        script = ''
+        if location:
+            if wait or QUrl.fromUserInput(location).isLocalFile():
+                script = self.load_pac(location)
+            else:
+                script = self.cached_pac(location)
+                self.fetch_thread = threading.Thread(target=self.fetch_pac, args=(location,), daemon=True)
+                self.fetch_thread.start()
+        self.set_pac_script(script)
+
+    def set_pac_script(self, script):
+        """เริ่มใช้สคริปต์ PAC ใหม่ (engine ของแต่ละเธรดถูกสร้างใหม่เมื่อเรียกครั้งถัดไป)"""
+        with self.lock:
+            if script != self.pac_script:
+                self.pac_script = script
+                self.pac_version += 1
+            self.cache.clear()
+
+    def fetch_pac(self, location):
+        """ดาวน์โหลดสคริปต์ PAC ใน thread แยก แล้วเริ่มใช้และเก็บสำเนาไว้สำหรับการเริ่มโปรแกรมครั้งถัดไป"""
+        script = self.load_pac(location)
+        if not script or location != self.pac_location:
+            return
+        self.set_pac_script(script)
+        self.save_cached_pac(location, script)
+
+    @staticmethod
+    def pac_cache_path():
+        """ไฟล์สำเนาสคริปต์ PAC ล่าสุด (Chromium รับสคริปต์ได้เฉพาะตอนเริ่มโปรแกรม จึงต้องมีสำเนาไว้ก่อน)"""
+        return os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "proxy_pac.json"
+        )
+
+    def cached_pac(self, location):
+        """สำเนาสคริปต์ PAC ของ location ที่ดาวน์โหลดไว้ครั้งก่อน"""
+        try:
+            with open(self.pac_cache_path(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['script'] if data.get('url') == location else ''
+        except (OSError, ValueError, KeyError, TypeError):
+            return ''
+
+    def save_cached_pac(self, location, script):
+        path = self.pac_cache_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'url': location, 'script': script}, f)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            print(f"Error saving PAC script: {e}")
+
+    def config(self, key):
+        """อ่านค่าตั้งค่าหรือค่าเริ่มต้น"""
+        return self.settings.get(key, self.DEFAULTS[key])
+
+    def load_pac(self, location):
+        """อ่านสคริปต์ PAC จาก URL หรือไฟล์ (ดาวน์โหลดโดยตรงไม่ผ่าน proxy)"""
+        if not location:
+            return ''
+        try:
+            url = QUrl.fromUserInput(location)
+            if url.isLocalFile():
+                with open(url.toLocalFile(), 'r', encoding='utf-8') as f:
+                    return f.read()
+            opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+            with opener.open(url.toString(), timeout=5) as response:
+                return response.read().decode('utf-8', 'replace')
+        except Exception as e:
+            print(f"Error loading PAC script: {e}")
+            return ''
+
+    def manual_proxy(self):
+        """proxy ที่ผู้ใช้กำหนดเอง"""
+        return QNetworkProxy(self.TYPES.get(self.config('type'), QNetworkProxy.HttpProxy),
+                             self.config('host'), int(self.config('port')))
+
+    def apply(self):
+        """ติดตั้งการตั้งค่า proxy ให้ Qt Network และ WebEngine"""
+        mode = self.config('mode')
+        if mode == 'manual' and self.config('host'):
+            # WebEngine อ่าน application proxy ใหม่ทุกครั้งที่สร้างการเชื่อมต่อ จึงมีผลทันที
+            QNetworkProxyFactory.setUseSystemConfiguration(False)
+            QNetworkProxy.setApplicationProxy(self.manual_proxy())
+        elif mode == 'pac' and self.pac_location:
+            # WebEngine ไม่ใช้ factory ของ Qt จึงส่งสคริปต์เดียวกันให้ Chromium ตอนเริ่มต้นด้วย (ถ้ามีสคริปต์แล้ว)
+            QNetworkProxyFactory.setUseSystemConfiguration(False)
+            QNetworkProxyFactory.setApplicationProxyFactory(PacProxyFactory(self))
+            if self.pac_script:
+                self.set_chromium_flags()
+        else:
+            QNetworkProxy.setApplicationProxy(QNetworkProxy(QNetworkProxy.DefaultProxy))
+            QNetworkProxyFactory.setUseSystemConfiguration(True)
+
+    def set_chromium_flags(self):
+        """ส่งสคริปต์ PAC ให้ Chromium (มีผลเฉพาะก่อนสร้าง profile แรก)"""
+        if self.chromium_flags_set:
+            return
+        self.chromium_flags_set = True
+        encoded = base64.b64encode(self.pac_script.encode('utf-8')).decode('ascii')
+        flags = os.environ.get('QTWEBENGINE_CHROMIUM_FLAGS', '')
+        os.environ['QTWEBENGINE_CHROMIUM_FLAGS'] = \
+            f"{flags} --proxy-pac-url=data:application/x-ns-proxy-autoconfig;base64,{encoded}".strip()
+
+    def engine(self):
+        """engine ของเธรดปัจจุบัน ที่มีเพียงฟังก์ชัน PAC (ไม่มี console, XHR หรือการเข้าถึงไฟล์)"""
+        local = self.local
+        if getattr(local, 'version', None) != self.pac_version:
+            engine = QJSEngine()
+            bridge = PacHostBridge()
+            engine.globalObject().setProperty('__pac_bridge', engine.newQObject(bridge))
+            engine.evaluate(self.PAC_UTILS)
+            result = engine.evaluate(self.pac_script, 'proxy.pac')
+            if result.isError():
+                print(f"Error in PAC script: {result.toString()}")
+            local.engine, local.bridge, local.version = engine, bridge, self.pac_version
+        return local.engine
+
+    def evaluate(self, url, host):
+        """เรียก FindProxyForURL โดยจำกัดเวลา คืนค่าข้อความผลลัพธ์หรือ None ถ้าผิดพลาด"""
+        engine = self.engine()
+        scope = engine.globalObject()
+        if not scope.property('FindProxyForURL').isCallable():
+            return None
+        # ส่งอาร์กิวเมนต์ผ่านตัวแปร global แล้วเรียกด้วย evaluate ซึ่งปล่อย GIL ระหว่างทำงาน
+        # (QJSValue.call ไม่ปล่อย จึงทำให้ตัวจับเวลาตัดสคริปต์ที่วนไม่รู้จบไม่ได้)
+        scope.setProperty('__pac_url', QJSValue(url))
+        scope.setProperty('__pac_host', QJSValue(host))
+        watchdog = threading.Timer(self.EVAL_TIMEOUT, engine.setInterrupted, (True,))
+        watchdog.start()
+        try:
+            result = engine.evaluate('FindProxyForURL(__pac_url, __pac_host)')
+        finally:
+            watchdog.cancel()
+            engine.setInterrupted(False)
+        if result.isError():
+            print(f"Error in FindProxyForURL: {result.toString()}")
+            return None
+        return result.toString()
+
+    @staticmethod
+    def parse_pac_result(text):
+        """แปลง "PROXY a:1; SOCKS b:2; DIRECT" เป็นรายการ (ชนิด, โฮสต์, พอร์ต)"""
+        proxies = []
+        for entry in (text or 'DIRECT').split(';'):
+            parts = entry.split()
+            if not parts:
+                continue
+            kind = parts[0].upper()
+            if kind == 'DIRECT':
+                proxies.append((QNetworkProxy.NoProxy, '', 0))
+            elif len(parts) > 1 and kind in ('PROXY', 'HTTP', 'SOCKS', 'SOCKS5'):
+                host, _, port = parts[1].rpartition(':')
+                if not host or not port.isdigit():
+                    continue
+                proxy_type = QNetworkProxy.HttpProxy if kind in ('PROXY', 'HTTP') else QNetworkProxy.Socks5Proxy
+                proxies.append((proxy_type, host.strip('[]'), int(port)))
+        return proxies or [(QNetworkProxy.NoProxy, '', 0)]
+
+    def resolve(self, url):
+        """รายการ QNetworkProxy สำหรับ URL (ผลของ PAC ถูกจำไว้ต่อโฮสต์ตาม pac_cache_ttl)"""
+        if not self.pac_script:
+            # สคริปต์ยังดาวน์โหลดไม่เสร็จ (หรือโหลดไม่ได้) เชื่อมต่อโดยตรงไปก่อน
+            return [QNetworkProxy(QNetworkProxy.NoProxy)]
+        scheme, host = url.scheme(), url.host()
+        key = (scheme, host)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] > now:
+                self.stats['hits'] += 1
+                return [QNetworkProxy(*proxy) for proxy in cached[1]]
+            self.stats['misses'] += 1
+
+        # เรียกสคริปต์นอก lock เพราะอาจต้องรอ DNS; ส่ง URL แค่ระดับโฮสต์ตามแบบ Chromium
+        started = time.perf_counter()
+        text = self.evaluate(f"{scheme}://{host}/", host)
+        elapsed = time.perf_counter() - started
+        proxies = self.parse_pac_result(text)
+
+        with self.lock:
+            self.stats['eval_time'] += elapsed
+            if text is None:
+                self.stats['errors'] += 1
+            if len(self.cache) >= self.CACHE_SIZE:
+                # ทิ้งรายการที่หมดอายุ ถ้ายังเต็มอยู่ทิ้งรายการที่เก่าที่สุด
+                for stale in [k for k, (expires, _) in self.cache.items() if expires <= now]:
+                    del self.cache[stale]
+                while len(self.cache) >= self.CACHE_SIZE:
+                    del self.cache[next(iter(self.cache))]
+            self.cache.pop(key, None)
+            self.cache[key] = (now + self.config('pac_cache_ttl'), proxies)
+        return [QNetworkProxy(*proxy) for proxy in proxies]
+
+    def describe(self, url):
+        """ข้อความอธิบายว่า URL จะใช้ proxy ใด (สำหรับหน้าต่างตั้งค่า)"""
+        mode = self.config('mode')
+        if mode == 'manual' and self.config('host'):
+            proxies = [self.manual_proxy()]
+        elif mode == 'pac' and self.pac_script:
+            proxies = self.resolve(url)
+        else:
+            proxies = QNetworkProxyFactory.systemProxyForQuery(QNetworkProxyQuery(url))
+        names = {QNetworkProxy.HttpProxy: 'HTTP', QNetworkProxy.Socks5Proxy: 'SOCKS5'}
+        parts = []
+        for proxy in proxies:
+            if proxy.type() in names:
+                parts.append(f"{names[proxy.type()]} {proxy.hostName()}:{proxy.port()}")
+            else:
+                parts.append("เชื่อมต่อโดยตรง")
+        return ", ".join(parts)
+
+class ProxySettingsDialog(QDialog):
+    """หน้าต่างตั้งค่า proxy: ตามระบบ กำหนดเอง หรือสคริปต์ PAC พร้อมทดสอบ URL"""
+
+    def __init__(self, manager, settings, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.settings = dict(settings)
+
+        self.setWindowTitle("ตั้งค่า Proxy")
+        self.resize(480, 360)
+
+        layout = QVBoxLayout(self)
+        self.system_radio = QRadioButton("ใช้การตั้งค่าของระบบ")
+        self.manual_radio = QRadioButton("กำหนดเอง")
+        self.pac_radio = QRadioButton("สคริปต์ตั้งค่าอัตโนมัติ (PAC)")
+        for radio in (self.system_radio, self.manual_radio, self.pac_radio):
+            layout.addWidget(radio)
+            radio.toggled.connect(self.update_fields)
+
+        manual_group = QGroupBox("Proxy ที่กำหนดเอง")
+        form = QFormLayout(manual_group)
+        self.type_combo = QComboBox()
+        self.type_combo.addItem("HTTP", 'http')
+        self.type_combo.addItem("SOCKS5", 'socks5')
+        self.type_combo.setCurrentIndex(max(0, self.type_combo.findData(self.value('type'))))
+        form.addRow("ชนิด:", self.type_combo)
+        self.host_edit = QLineEdit(self.value('host'))
+        form.addRow("โฮสต์:", self.host_edit)
+        self.port_spin = QSpinBox()
+        self.port_spin.setRange(1, 65535)
+        self.port_spin.setValue(int(self.value('port')))
+        form.addRow("พอร์ต:", self.port_spin)
+        layout.addWidget(manual_group)
+        self.manual_group = manual_group
+
+        pac_group = QGroupBox("สคริปต์ PAC")
+        form = QFormLayout(pac_group)
+        self.pac_edit = QLineEdit(self.value('pac_url'))
+        self.pac_edit.setPlaceholderText("http://wpad/wpad.dat หรือ /path/to/proxy.pac")
+        form.addRow("ที่อยู่:", self.pac_edit)
+        layout.addWidget(pac_group)
+        self.pac_group = pac_group
+        if QJSEngine is None:
+            self.pac_radio.setEnabled(False)
+            self.pac_radio.setToolTip("ต้องติดตั้งโมดูล PyQt5.QtQml")
+
+        test_row = QHBoxLayout()
+        self.test_edit = QLineEdit("https://www.google.com/")
+        test_row.addWidget(self.test_edit)
+        test_button = QPushButton("ทดสอบ")
+        test_button.clicked.connect(self.test_url)
+        test_row.addWidget(test_button)
+        layout.addLayout(test_row)
+        self.result_label = QLabel()
+        self.result_label.setWordWrap(True)
+        self.result_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.result_label)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        ok_button = QPushButton("ตกลง")
+        ok_button.clicked.connect(self.accept)
+        buttons.addWidget(ok_button)
+        cancel_button = QPushButton("ยกเลิก")
+        cancel_button.clicked.connect(self.reject)
+        buttons.addWidget(cancel_button)
+        layout.addLayout(buttons)
+
+        mode = self.value('mode')
+        radio = {'manual': self.manual_radio, 'pac': self.pac_radio}.get(mode, self.system_radio)
+        if not radio.isEnabled():
+            radio = self.system_radio
+        radio.setChecked(True)
+        self.update_fields()
+
+    def value(self, key):
+        """ค่าตั้งค่าเดิมหรือค่าเริ่มต้น"""
+        return self.settings.get(key, ProxyManager.DEFAULTS[key])
+
+    def update_fields(self):
+        """เปิดใช้เฉพาะช่องของโหมดที่เลือก"""
+        self.manual_group.setEnabled(self.manual_radio.isChecked())
+        self.pac_group.setEnabled(self.pac_radio.isChecked())
+
+    def proxy_settings(self):
+        """ค่าตั้งค่าใหม่จากหน้าต่าง"""
+        settings = dict(self.settings)
+        settings['mode'] = 'manual' if self.manual_radio.isChecked() else \
+            'pac' if self.pac_radio.isChecked() else 'system'
+        settings['type'] = self.type_combo.currentData()
+        settings['host'] = self.host_edit.text().strip()
+        settings['port'] = self.port_spin.value()
+        settings['pac_url'] = self.pac_edit.text().strip()
+        return settings
+
+    def test_url(self):
+        """แสดงว่า URL ทดสอบจะใช้ proxy ใดตามค่าที่กรอกอยู่ (ไม่ติดตั้งจริง)"""
+        tester = ProxyManager()
+        tester.configure(self.proxy_settings(), wait=True)
+        if tester.config('mode') == 'pac' and not tester.pac_script:
+            self.result_label.setText("ไม่สามารถโหลดสคริปต์ PAC ได้")
+            return
+        started = time.perf_counter()
+        description = tester.describe(QUrl.fromUserInput(self.test_edit.text()))
+        elapsed = (time.perf_counter() - started) * 1000
+        self.result_label.setText(f"{description}\n(ใช้เวลา {elapsed:.1f} ms)")
+
+class CookieManager(QObject):
+    """ดัชนีคุกกี้ในหน่วยความจำแยกตามไซต์ อัพเดทจากสัญญาณของ cookie store จึงไม่ต้องอ่าน store ใหม่ทุกครั้งที่ค้นหา"""
+
+    # แจ้งหน้าต่างจัดการคุกกี้ให้รีเฟรช (รวมการเปลี่ยนแปลงที่เกิดติดกันเป็นครั้งเดียว)
+    changed = pyqtSignal()
+
+    _shared = None
+
+    # จำนวนคุกกี้ที่ส่งคำสั่งลบต่อรอบของ event loop
+    DELETE_BATCH = 1000
+    # เวลาสูงสุด (ms) ที่รอคุกกี้ชุดแรกจาก loadAllCookies ก่อนถือว่า store ว่าง
+    LOAD_TIMEOUT = 2000
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "cookie_ages.json"
+        )
+        self.store = None
+        # key -> QNetworkCookie และ ไซต์ -> set ของ key
+        self.cookies = {}
+        self.sites = {}
+        # QNetworkCookie ไม่มีเวลาสร้าง จึงจำเวลาที่พบคุกกี้ครั้งแรกไว้เอง (key -> timestamp)
+        self.first_seen = self.load_ages()
+        # คุกกี้ที่เพิ่งถูกลบ เผื่อเป็นการเขียนทับ (Chromium ส่ง removed แล้วตามด้วย added)
+        self.replaced = {}
+        self.pending = deque()
+        self.site_cache = {}
+        # ระหว่างอ่านคุกกี้ที่มีอยู่เดิมจาก store ไม่ทราบว่าคุกกี้ที่ไม่มีบันทึกถูกสร้างเมื่อใด
+        self.loading = False
+        self.load_timer = QTimer(self)
+        self.load_timer.setSingleShot(True)
+        self.load_timer.timeout.connect(self.finish_loading)
+
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(5000)
+        self.save_timer.timeout.connect(self.save_ages)
+        self.changed_timer = QTimer(self)
+        self.changed_timer.setSingleShot(True)
+        self.changed_timer.setInterval(300)
+        self.changed_timer.timeout.connect(self.changed.emit)
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการคุกกี้เดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def attach(self, store):
+        """ติดตาม cookie store และอ่านคุกกี้ที่มีอยู่ครั้งเดียว"""
+        if self.store is store:
+            return
+        self.store = store
+        store.cookieAdded.connect(self.cookie_added)
+        store.cookieRemoved.connect(self.cookie_removed)
+        self.loading = True
+        self.load_timer.start(self.LOAD_TIMEOUT)
+        store.loadAllCookies()
+
+    def finish_loading(self):
+        """จบช่วงอ่านคุกกี้เดิม คุกกี้ที่พบหลังจากนี้ใช้เวลาปัจจุบันเป็นเวลาที่พบครั้งแรก"""
+        self.loading = False
+
+    @staticmethod
+    def key(cookie, domain=None):
+        """คีย์ของคุกกี้ (Chromium ถือว่า domain, path และชื่อเดียวกันคือคุกกี้เดียวกัน)"""
+        if domain is None:
+            domain = cookie.domain()
+        return f"{domain}\t{cookie.path()}\t{bytes(cookie.name()).decode('latin-1')}"
+
+    def site(self, domain):
+        """ไซต์ของโดเมนคุกกี้ (IP address ใช้ตามเดิม)"""
+        site = self.site_cache.get(domain)
+        if site is None:
+            host = domain.lstrip('.').lower()
+            if not host or ':' in host or host.replace('.', '').isdigit():
+                site = host
+            else:
+                site = FilterEngine.base_domain(host)
+            self.site_cache[domain] = site
+        return site
+
+    def touch(self, save=False):
+        """นัดแจ้งการเปลี่ยนแปลงและบันทึก (ไม่เริ่มตัวจับเวลาใหม่ทุกครั้งระหว่างโหลดคุกกี้จำนวนมาก)"""
+        if not self.changed_timer.isActive():
+            self.changed_timer.start()
+        if save and not self.save_timer.isActive():
+            self.save_timer.start()
+
+    def cookie_added(self, cookie):
+        """เพิ่มหรือแทนที่คุกกี้ในดัชนี"""
+        domain = cookie.domain()
+        key = self.key(cookie, domain)
+        if key not in self.cookies:
+            self.sites.setdefault(self.site(domain), set()).add(key)
+        self.cookies[key] = QNetworkCookie(cookie)
+        if self.loading and self.load_timer.interval():
+            # WebEngine ส่งคุกกี้จาก loadAllCookies ทั้งหมดในรอบเดียวของ event loop
+            self.load_timer.start(0)
+        if key not in self.first_seen:
+            seen = self.replaced.pop(key, None)
+            if seen is None:
+                # 0 คือไม่ทราบอายุ (มีอยู่ก่อนเริ่มบันทึก) จึงไม่เข้าเงื่อนไขการลบตามช่วงเวลา
+                seen = 0 if self.loading else time.time()
+            self.first_seen[key] = seen
+            self.touch(save=True)
+        else:
+            self.touch()
+
+    def cookie_removed(self, cookie):
+        """ลบคุกกี้ออกจากดัชนี"""
+        key = self.key(cookie)
+        if key not in self.cookies:
+            return
+        self.replaced[key] = self.first_seen.get(key)
+        self.remove_key(key)
+
+    def remove_key(self, key):
+        """ลบคีย์ออกจากดัชนีทั้งหมด"""
+        cookie = self.cookies.pop(key)
+        site = self.site(cookie.domain())
+        keys = self.sites.get(site)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.sites[site]
+        self.first_seen.pop(key, None)
+        self.touch(save=True)
+        return cookie
+
+    def __len__(self):
+        return len(self.cookies)
+
+    def site_counts(self, text=''):
+        """รายการ (ไซต์, จำนวนคุกกี้) เรียงตามชื่อ กรองด้วยข้อความถ้าระบุ"""
+        text = text.strip().lower()
+        return sorted((site, len(keys)) for site, keys in self.sites.items() if text in site)
+
+    def cookies_for(self, site):
+        """คุกกี้ของไซต์ เรียงตามโดเมนและชื่อ: รายการ (key, cookie, เวลาที่พบครั้งแรก)"""
+        return [(key, self.cookies[key], self.first_seen.get(key))
+                for key in sorted(self.sites.get(site, ()))]
+
+    def cookie_header(self, url):
+        """ค่า header Cookie ที่เบราว์เซอร์จะส่งไปกับ url (ใช้กับคำขอที่ไม่ได้ผ่าน WebEngine)"""
+        host = url.host().lower()
+        path = url.path() or '/'
+        secure = url.scheme() == 'https'
+        now = QDateTime.currentDateTimeUtc()
+        pairs = []
+        for key in self.sites.get(self.site(host), ()):
+            cookie = self.cookies[key]
+            domain = cookie.domain().lower()
+            if domain.startswith('.'):
+                if host != domain[1:] and not host.endswith(domain):
+                    continue
+            elif host != domain:
+                continue
+            if not path.startswith(cookie.path() or '/') or (cookie.isSecure() and not secure):
+                continue
+            if not cookie.isSessionCookie() and cookie.expirationDate() <= now:
+                continue
+            pairs.append(f"{bytes(cookie.name()).decode('latin-1')}={bytes(cookie.value()).decode('latin-1')}")
+        return '; '.join(pairs)
+
+    def keys_matching(self, pattern):
+        """คีย์ของคุกกี้ที่ไซต์หรือโดเมนตรงกับรูปแบบแบบ shell เช่น *.example.com"""
+        regex = re.compile(fnmatch.translate(pattern.strip().lower().lstrip('.')))
+        keys = []
+        for site, site_keys in self.sites.items():
+            if regex.match(site):
+                keys.extend(site_keys)
+            else:
+                keys.extend(key for key in site_keys
+                            if regex.match(key.split('\t', 1)[0].lstrip('.').lower()))
+        return keys
+
+    def keys_older_than(self, seconds):
+        """คีย์ของคุกกี้ที่พบครั้งแรกก่อน seconds วินาทีที่แล้ว (ไม่รวมคุกกี้ที่ไม่ทราบอายุ)"""
+        cutoff = time.time() - seconds
+        return [key for key in self.cookies if 0 < self.first_seen.get(key, 0) < cutoff]
+
+    def keys_seen_since(self, timestamp):
+        """คีย์ของคุกกี้ที่พบครั้งแรกตั้งแต่ timestamp (คุกกี้ที่ไม่ทราบอายุอยู่ในช่วงเมื่อ timestamp เป็น 0 เท่านั้น)"""
+        return [key for key in self.cookies if self.first_seen.get(key, 0) >= timestamp]
+
+    def delete(self, keys):
+        """ลบคุกกี้ตามคีย์ (ส่งคำสั่งลบเป็นชุดเพื่อไม่ให้ UI ค้างเมื่อมีจำนวนมาก)"""
+        keys = [key for key in keys if key in self.cookies]
+        if not keys:
+            return 0
+        if len(keys) == len(self.cookies) and self.store is not None:
+            self.store.deleteAllCookies()
+            for key in keys:
+                self.remove_key(key)
+            return len(keys)
+        was_idle = not self.pending
+        for key in keys:
+            self.pending.append(self.remove_key(key))
+        if was_idle:
+            QTimer.singleShot(0, self.delete_batch)
+        return len(keys)
+
+    def delete_batch(self):
+        """ส่งคำสั่งลบคุกกี้หนึ่งชุด"""
+        for _ in range(min(self.DELETE_BATCH, len(self.pending))):
+            cookie = self.pending.popleft()
+            if self.store is not None:
+                self.store.deleteCookie(cookie)
+        if self.pending:
+            QTimer.singleShot(0, self.delete_batch)
+
+    def load_ages(self):
+        """โหลดเวลาที่พบคุกกี้ครั้งแรก"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_ages(self, prune=False):
+        """บันทึกเวลาที่พบคุกกี้ครั้งแรก (prune ทิ้งคุกกี้ที่หมดอายุไปตอนปิดโปรแกรม ใช้เมื่อโหลด store ครบแล้ว)"""
+        self.replaced.clear()
+        if prune:
+            self.first_seen = {key: seen for key, seen in self.first_seen.items() if key in self.cookies}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.first_seen, f, separators=(',', ':'))
+        except Exception as e:
+            print(f"Error saving cookie ages: {e}")
+
+class CookieManagerDialog(QDialog):
+    """หน้าต่างจัดการคุกกี้: ดูและลบรายไซต์ หรือลบทีละมากตามรูปแบบโดเมนหรืออายุ"""
+
+    # จำนวนไซต์สูงสุดที่แสดงในรายการ (ใช้ช่องค้นหาเพื่อดูไซต์อื่น)
+    MAX_SITES = 2000
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+
+        self.setWindowTitle("คุกกี้และข้อมูลไซต์")
+        self.resize(760, 480)
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("ค้นหาไซต์...")
+        self.filter_edit.textChanged.connect(self.refresh_sites)
+        layout.addWidget(self.filter_edit)
+
+        lists = QHBoxLayout()
+        self.site_list = QListWidget()
+        self.site_list.currentItemChanged.connect(self.refresh_cookies)
+        lists.addWidget(self.site_list, 1)
+        self.cookie_list = QListWidget()
+        self.cookie_list.setSelectionMode(QListWidget.ExtendedSelection)
+        lists.addWidget(self.cookie_list, 2)
+        layout.addLayout(lists)
+
+        buttons = QHBoxLayout()
+        for text, slot in (("ลบคุกกี้ที่เลือก", self.delete_selected),
+                           ("ลบทั้งไซต์", self.delete_site),
+                           ("ลบตามรูปแบบโดเมน...", self.delete_by_pattern),
+                           ("ลบคุกกี้ที่เก่ากว่า...", self.delete_by_age)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        buttons.addStretch()
+        close_button = QPushButton("ปิด")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        manager.changed.connect(self.refresh_sites)
+        self.refresh_sites()
+
+    def done(self, result):
+        self.manager.changed.disconnect(self.refresh_sites)
+        super().done(result)
+
+    def current_site(self):
+        """ไซต์ที่เลือกอยู่"""
+        item = self.site_list.currentItem()
+        return item.data(Qt.UserRole) if item else None
+
+    def refresh_sites(self):
+        """สร้างรายการไซต์ใหม่จากดัชนี"""
+        selected = self.current_site()
+        counts = self.manager.site_counts(self.filter_edit.text())
+        self.summary_label.setText(f"คุกกี้ทั้งหมด {len(self.manager)} รายการจาก {len(self.manager.sites)} ไซต์")
+        self.site_list.blockSignals(True)
+        self.site_list.clear()
+        for site, count in counts[:self.MAX_SITES]:
+            item = QListWidgetItem(f"{site} ({count})")
+            item.setData(Qt.UserRole, site)
+            self.site_list.addItem(item)
+            if site == selected:
+                self.site_list.setCurrentItem(item)
+        self.site_list.blockSignals(False)
+        self.refresh_cookies()
+
+    def refresh_cookies(self, *args):
+        """แสดงคุกกี้ของไซต์ที่เลือก"""
+        self.cookie_list.clear()
+        for key, cookie, seen in self.manager.cookies_for(self.current_site()):
+            name = bytes(cookie.name()).decode('utf-8', 'replace')
+            expires = "เซสชัน" if cookie.isSessionCookie() else \
+                cookie.expirationDate().toString('yyyy-MM-dd hh:mm')
+            seen_text = time.strftime('%Y-%m-%d', time.localtime(seen)) if seen else "-"
+            item = QListWidgetItem(f"{name}  —  {cookie.domain()}{cookie.path()}  "
+                                   f"(หมดอายุ: {expires}, พบครั้งแรก: {seen_text})")
+            item.setData(Qt.UserRole, key)
+            self.cookie_list.addItem(item)
+
+    def delete_selected(self):
+        """ลบคุกกี้ที่เลือก"""
+        self.manager.delete([item.data(Qt.UserRole) for item in self.cookie_list.selectedItems()])
+
+    def delete_site(self):
+        """ลบคุกกี้ทั้งหมดของไซต์ที่เลือก"""
+        site = self.current_site()
+        if site:
+            self.manager.delete(list(self.manager.sites.get(site, ())))
+
+    def delete_by_pattern(self):
+        """ลบคุกกี้ของโดเมนที่ตรงกับรูปแบบ"""
+        pattern, ok = QInputDialog.getText(self, "ลบตามรูปแบบโดเมน",
+                                           "รูปแบบโดเมน (เช่น *.doubleclick.net หรือ ads.*):")
+        if ok and pattern.strip():
+            self.confirm_delete(self.manager.keys_matching(pattern))
+
+    def delete_by_age(self):
+        """ลบคุกกี้ที่พบครั้งแรกนานกว่าจำนวนวันที่กำหนด"""
+        days, ok = QInputDialog.getInt(self, "ลบคุกกี้เก่า", "ลบคุกกี้ที่เก่ากว่า (วัน):", 30, 1, 3650)
+        if ok:
+            self.confirm_delete(self.manager.keys_older_than(days * 86400))
+
+    def confirm_delete(self, keys):
+        """ยืนยันก่อนลบคุกกี้หลายรายการ"""
+        if not keys:
+            QMessageBox.information(self, "คุกกี้", "ไม่มีคุกกี้ที่ตรงกับเงื่อนไข")
+            return
+        reply = QMessageBox.question(self, "คุกกี้", f"ลบคุกกี้ {len(keys)} รายการ?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            self.manager.delete(keys)
+
+class BrowsingDataCleaner(QObject):
+    """ล้างข้อมูลการท่องเว็บตามช่วงเวลาและชนิดข้อมูล โดยแบ่งแต่ละงานเป็นชุดเล็กใน event loop พร้อมรายงานความคืบหน้า"""
+
+    # (ข้อความสถานะ, ความคืบหน้ารวม 0-100) และข้อความสรุปเมื่อเสร็จ
+    progress = pyqtSignal(str, int)
+    finished = pyqtSignal(str)
+
+    TYPES = [
+        ('history', 'ประวัติการเข้าชม'),
+        ('cookies', 'คุกกี้'),
+        ('cache', 'แคช HTTP'),
+        ('visited_links', 'ลิงก์ที่เคยเข้าชม'),
+        ('downloads', 'รายการดาวน์โหลด'),
+        ('storage', 'ข้อมูลที่ไซต์จัดเก็บ')
+    ]
+
+    RANGES = [
+        ('ชั่วโมงที่แล้ว', 3600),
+        ('24 ชั่วโมงที่แล้ว', 86400),
+        ('7 วันที่แล้ว', 7 * 86400),
+        ('4 สัปดาห์ที่แล้ว', 28 * 86400),
+        ('ทั้งหมด', None)
+    ]
+
+    # ลำดับการทำงาน: งานที่ต้องใช้ URL จากประวัติทำก่อนลบประวัติ
+    ORDER = ['visited_links', 'storage', 'history', 'cookies', 'cache', 'downloads']
+
+    # จำนวนรายการที่ประมวลผลต่อรอบของ event loop และเวลาสูงสุดที่รอแต่ละไซต์ล้างข้อมูล (ms)
+    BATCH_SIZE = 2000
+    STORAGE_TIMEOUT = 3000
+
+    # โหลดด้วย setHtml โดยใช้ origin ของไซต์เป็น base URL เพื่อให้ล้างข้อมูลของ origin นั้นได้โดยไม่ต้องโหลดหน้าจริง
+    STORAGE_PAGE = """<!DOCTYPE html><title>clearing</title><script>
+(async function () {
+    try { localStorage.clear(); } catch (e) {}
+    try { sessionStorage.clear(); } catch (e) {}
+    try {
+        for (const db of await indexedDB.databases()) indexedDB.deleteDatabase(db.name);
+    } catch (e) {}
+    try {
+        for (const key of await caches.keys()) await caches.delete(key);
+    } catch (e) {}
+    try {
+        for (const registration of await navigator.serviceWorker.getRegistrations()) await registration.unregister();
+    } catch (e) {}
+    document.title = "cleared";
+})();
+</script>"""
+
+    # โฟลเดอร์ IndexedDB ของแต่ละ origin เช่น https_example.com_0.indexeddb.leveldb
+    INDEXEDDB_DIR = re.compile(r'^(https?)_(.+)_(\d+)\.indexeddb\.')
+
+    def __init__(self, window, profile=None):
+        super().__init__()
+        self.window = window
+        self.profile = profile or QWebEngineProfile.defaultProfile()
+        self.jobs = deque()
+        self.current = None
+        self.total_jobs = 0
+        self.done_jobs = 0
+        self.results = {}
+        self.since = 0
+        self.started = 0
+        self.urls = None
+        self.origins = []
+        self.storage_page = None
+        self.storage_timer = None
+
+    def running(self):
+        """มีงานล้างข้อมูลค้างอยู่หรือไม่"""
+        return self.current is not None or bool(self.jobs)
+
+    def start(self, types, seconds=None):
+        """เริ่มล้างข้อมูลชนิดที่เลือกในช่วง seconds วินาทีที่ผ่านมา (None = ทั้งหมด)"""
+        if self.running():
+            return False
+        self.started = time.time()
+        self.since = 0 if seconds is None else self.started - seconds
+        self.results = {}
+        self.urls = None
+        self.jobs = deque(name for name in self.ORDER if name in types)
+        self.total_jobs = len(self.jobs)
+        self.done_jobs = 0
+        QTimer.singleShot(0, self.step)
+        return True
+
+    def step(self):
+        """ทำงานถัดไปหนึ่งชุด (งานเป็น generator ที่ yield ความคืบหน้า หรือ None เมื่อรอ callback)"""
+        names = dict(self.TYPES)
+        while True:
+            if self.current is None:
+                if not self.jobs:
+                    self.finished.emit(self.summary())
+                    return
+                name = self.jobs.popleft()
+                self.current = (name, getattr(self, f"clear_{name}")())
+            name, job = self.current
+            try:
+                value = next(job)
+            except StopIteration:
+                value = 100
+                self.current = None
+                self.done_jobs += 1
+            except Exception as e:
+                print(f"Error clearing {name}: {e}")
+                self.results[name] = "ผิดพลาด"
+                self.current = None
+                self.done_jobs += 1
+                continue
+            if value is None:
+                return
+            if self.total_jobs:
+                overall = (100 * self.done_jobs + (value if self.current else 0)) // self.total_jobs
+                self.progress.emit(f"กำลังล้าง{names[name]}...", overall)
+            QTimer.singleShot(0, self.step)
+            return
+
+    def resume(self):
+        """ทำงานต่อหลังจากรอ callback"""
+        QTimer.singleShot(0, self.step)
+
+    def summary(self):
+        """ข้อความสรุปผล"""
+        names = dict(self.TYPES)
+        return "\n".join(f"{names[name]}: {self.results.get(name, 'เรียบร้อย')}"
+                         for name in self.ORDER if name in self.results)
+
+    def in_range(self, timestamp):
+        """เวลาอยู่ในช่วงที่เลือกหรือไม่"""
+        return timestamp >= self.since
+
+    def range_urls(self):
+        """URL ในประวัติที่อยู่ในช่วงเวลา (อ่านทีละชุด เก็บผลไว้ใช้กับงานถัดไป)"""
+        if self.urls is None:
+            history = self.window.settings.get('history', [])
+            urls = set()
+            for start in range(0, len(history), self.BATCH_SIZE):
+                urls.update(item.get('url', '') for item in history[start:start + self.BATCH_SIZE]
+                            if self.in_range(item.get('timestamp', 0)))
+                yield min(start + self.BATCH_SIZE, len(history)) * 50 // len(history)
+            self.urls = urls
+
+    def clear_history(self):
+        """ลบประวัติในช่วงเวลา ทีละชุด"""
+        history = self.window.settings.get('history', [])
+        # add_to_history ต่อท้าย list เดิมระหว่างที่ล้าง จึงตรวจเฉพาะรายการที่มีอยู่ตอนเริ่ม
+        count = len(history)
+        kept = []
+        for start in range(0, count, self.BATCH_SIZE):
+            end = min(start + self.BATCH_SIZE, count)
+            kept.extend(item for item in history[start:end] if not self.in_range(item.get('timestamp', 0)))
+            yield end * 100 // count
+        self.results['history'] = f"ลบ {count - len(kept)} รายการ"
+        # เก็บรายการที่เพิ่มเข้ามาระหว่างล้างข้อมูลไว้
+        current = self.window.settings.get('history', [])
+        if current is history:
+            kept.extend(current[count:])
+        else:
+            # ประวัติถูกตัดเหลือ 500 รายการ (list ใหม่) - timestamp ของประวัติเป็นวินาทีเต็ม
+            kept.extend(item for item in current if item.get('timestamp', 0) >= int(self.started))
+        self.window.settings['history'] = kept
+        self.window.save_settings()
+        self.window.predictor.load_history(kept)
+
+    def clear_cookies(self):
+        """ลบคุกกี้ที่พบครั้งแรกในช่วงเวลา (ตัวจัดการคุกกี้ส่งคำสั่งลบเป็นชุด)"""
+        manager = self.window.cookie_manager
+        keys = manager.keys_seen_since(self.since)
+        total = manager.delete(keys)
+        self.results['cookies'] = f"ลบ {total} รายการ"
+        while manager.pending:
+            yield 100 - len(manager.pending) * 100 // max(total, 1)
+
+    def clear_cache(self):
+        """ล้างแคช HTTP (WebEngine ล้างได้ทั้งหมดเท่านั้น เพราะรายการในแคชไม่มีเวลาให้เลือก)"""
+        self.profile.clearHttpCache()
+        self.results['cache'] = "ล้างทั้งหมด" if self.since else "เรียบร้อย"
+        yield 100
+
+    def clear_visited_links(self):
+        """ลบลิงก์ที่เคยเข้าชม (สีของลิงก์) ตาม URL ในประวัติช่วงเวลานั้น"""
+        if not self.since:
+            self.profile.clearAllVisitedLinks()
+            self.results['visited_links'] = "ล้างทั้งหมด"
+            return
+        yield from self.range_urls()
+        urls = [QUrl(url) for url in self.urls if url]
+        for start in range(0, len(urls), self.BATCH_SIZE):
+            self.profile.clearVisitedLinks(urls[start:start + self.BATCH_SIZE])
+            yield 50 + min(start + self.BATCH_SIZE, len(urls)) * 50 // len(urls)
+        self.results['visited_links'] = f"ลบ {len(urls)} รายการ"
+
+    def clear_downloads(self):
+        """ลบรายการดาวน์โหลดที่จบแล้วในช่วงเวลา (ไม่ลบไฟล์)"""
+        removed = self.window.download_manager.remove_finished(self.since)
+        self.results['downloads'] = f"ลบ {removed} รายการ"
+        yield 100
+
+    def storage_origins(self):
+        """origin ที่ต้องล้างข้อมูล: จากประวัติในช่วงเวลา และเมื่อล้างทั้งหมดรวมแท็บที่เปิดอยู่และโฟลเดอร์ IndexedDB"""
+        yield from self.range_urls()
+        origins = {NavigationPredictor.origin(url) for url in self.urls}
+        if not self.since:
+            tabs = self.window.tabs
+            for i in range(tabs.count()):
+                origins.add(NavigationPredictor.origin(tabs.widget(i).url().toString()))
+            try:
+                path = os.path.join(self.profile.persistentStoragePath(), "IndexedDB")
+                for name in os.listdir(path):
+                    match = self.INDEXEDDB_DIR.match(name)
+                    if match:
+                        scheme, host, port = match.groups()
+                        origins.add(f"{scheme}://{host}" + (f":{port}" if port != '0' else ''))
+            except OSError:
+                pass
+        self.origins = sorted(origin for origin in origins if origin.startswith(('http://', 'https://')))
+
+    def clear_storage(self):
+        """ล้าง localStorage, IndexedDB, Cache Storage และ service worker ของแต่ละ origin ทีละไซต์"""
+        yield from self.storage_origins()
+        origins = self.origins
+        if origins:
+            self.storage_page = QWebEnginePage(self.profile, self)
+            self.storage_page.titleChanged.connect(self.storage_cleared)
+            self.storage_timer = QTimer(self)
+            self.storage_timer.setSingleShot(True)
+            self.storage_timer.setInterval(self.STORAGE_TIMEOUT)
+            self.storage_timer.timeout.connect(self.resume)
+        try:
+            for i, origin in enumerate(origins):
+                self.storage_page.setHtml(self.STORAGE_PAGE, QUrl(origin + "/"))
+                self.storage_timer.start()
+                yield None
+                yield 50 + (i + 1) * 50 // len(origins)
+        finally:
+            if self.storage_page is not None:
+                self.storage_timer.stop()
+                self.storage_page.deleteLater()
+                self.storage_page = None
+        self.results['storage'] = f"{len(origins)} ไซต์"
+
+    def storage_cleared(self, title):
+        """หน้าล้างข้อมูลของ origin ปัจจุบันทำงานเสร็จ"""
+        if title == "cleared" and self.storage_timer.isActive():
+            self.storage_timer.stop()
+            self.resume()
+
+class ClearBrowsingDataDialog(QDialog):
+    """หน้าต่างล้างข้อมูลการท่องเว็บ (ไม่บล็อกหน้าต่างหลักระหว่างล้าง)"""
+
+    def __init__(self, cleaner, selected, parent=None):
+        super().__init__(parent)
+        self.cleaner = cleaner
+
+        self.setWindowTitle("เคลียร์ข้อมูลการท่องเว็บ")
+        self.resize(420, 360)
+
+        layout = QVBoxLayout(self)
+        row = QHBoxLayout()
+        row.addWidget(QLabel("ช่วงเวลา:"))
+        self.range_combo = QComboBox()
+        for label, seconds in cleaner.RANGES:
+            self.range_combo.addItem(label, seconds)
+        row.addWidget(self.range_combo, 1)
+        layout.addLayout(row)
+
+        self.checks = {}
+        for name, label in cleaner.TYPES:
+            check = QCheckBox(label)
+            check.setChecked(name in selected)
+            layout.addWidget(check)
+            self.checks[name] = check
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        self.cookies_button = QPushButton("จัดการคุกกี้...")
+        buttons.addWidget(self.cookies_button)
+        buttons.addStretch()
+        self.clear_button = QPushButton("ล้างข้อมูล")
+        self.clear_button.clicked.connect(self.start)
+        buttons.addWidget(self.clear_button)
+        close_button = QPushButton("ปิด")
+        close_button.clicked.connect(self.close)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        cleaner.progress.connect(self.update_progress)
+        cleaner.finished.connect(self.cleared)
+
+    def selected_types(self):
+        """ชนิดข้อมูลที่เลือก"""
+        return [name for name, check in self.checks.items() if check.isChecked()]
+
+    def start(self):
+        """เริ่มล้างข้อมูล"""
+        types = self.selected_types()
+        if not types or not self.cleaner.start(types, self.range_combo.currentData()):
+            return
+        self.clear_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("กำลังเริ่ม...")
+
+    def update_progress(self, text, value):
+        self.status_label.setText(text)
+        self.progress_bar.setValue(value)
+
+    def cleared(self, summary):
+        self.clear_button.setEnabled(True)
+        self.progress_bar.setValue(100)
+        self.status_label.setText(summary or "เรียบร้อย")
+
+class DownloadItem:
+    """การดาวน์โหลดหนึ่งรายการ: สถานะ ความคืบหน้า และความเร็วเฉลี่ย (job คือ QWebEngineDownloadItem หรือตัวดาวน์โหลดอื่นที่มี pause/resume/cancel)"""
+
+    _ids = itertools.count(1)
+
+    # ช่วงเวลาขั้นต่ำระหว่างตัวอย่างความเร็ว (วินาที) และน้ำหนักของตัวอย่างใหม่ในค่าเฉลี่ย
+    SPEED_INTERVAL = 0.5
+    SPEED_SMOOTHING = 0.3
+
+    def __init__(self, url, path, job=None):
+        self.id = next(self._ids)
+        self.url = url
+        self.host = urlsplit(url).hostname or ''
+        self.path = path
+        self.job = job
+        self.state = 'queued'
+        self.error = ''
+        self.received = 0
+        self.total = -1
+        self.start_time = time.time()
+        self.end_time = None
+        self.speed = 0.0
+        self.sample = (time.monotonic(), 0)
+        # ผลตรวจหลังดาวน์โหลดเสร็จ (ดู DownloadVerifier)
+        self.sha256 = ''
+        self.expected_hash = ''
+        self.check = ''
+        self.duplicate_of = ''
+
+    def update(self, received, total):
+        """บันทึกความคืบหน้าและปรับความเร็วเฉลี่ย"""
+        self.received, self.total = received, total
+        now = time.monotonic()
+        then, before = self.sample
+        if now - then >= self.SPEED_INTERVAL:
+            rate = max(0, received - before) / (now - then)
+            self.speed = rate if not self.speed else self.speed + self.SPEED_SMOOTHING * (rate - self.speed)
+            self.sample = (now, received)
+
+    def reset_speed(self):
+        """เริ่มวัดความเร็วใหม่ (หลังหยุดชั่วคราวหรือรอคิว)"""
+        self.speed = 0.0
+        self.sample = (time.monotonic(), self.received)
+
+    def eta(self):
+        """เวลาที่เหลือโดยประมาณ (วินาที) หรือ None ถ้ายังประมาณไม่ได้"""
+        if self.total <= 0 or self.speed <= 0:
+            return None
+        return max(0, self.total - self.received) / self.speed
+
+    def finished(self):
+        """จบแล้วหรือไม่ (ไม่ว่าสำเร็จหรือไม่)"""
+        return self.state in ('completed', 'failed', 'cancelled')
+
+class SegmentedDownload(QObject):
+    """ดาวน์โหลดไฟล์ใหญ่ด้วย QNetworkAccessManager แบ่งเป็นช่วง HTTP Range หลายการเชื่อมต่อพร้อมกัน
+    เขียนแต่ละช่วงลงตำแหน่งของตัวเองในไฟล์ที่จองขนาดไว้ และบันทึกสถานะไว้ข้างไฟล์เพื่อดาวน์โหลดต่อหลังเปิดโปรแกรมใหม่
+    (มี pause/resume/cancel/state แบบเดียวกับ QWebEngineDownloadItem จึงใช้กับ DownloadManager ได้ทันที)"""
+
+    downloadProgress = pyqtSignal('qint64', 'qint64')
+    finished = pyqtSignal()
+
+    PART_SUFFIX = '.part'
+    STATE_SUFFIX = '.part.json'
+
+    # ขนาดช่วงเล็กสุดที่ยังคุ้มจะแบ่งเพิ่ม, ระยะห่างขั้นต่ำระหว่างการบันทึกสถานะ (วินาที) และจำนวนครั้งที่ลองใหม่ต่อช่วง
+    MIN_SEGMENT = 1024 * 1024
+    SAVE_INTERVAL = 1.0
+    MAX_RETRIES = 3
+    # จำนวนครั้งที่ตาม redirect ได้ต่อคำขอ (ตามเองเพื่อสร้าง header Cookie ใหม่ให้โฮสต์ปลายทาง)
+    MAX_REDIRECTS = 10
+
+    # ตอบกลับ 206 เช่น "bytes 0-1023/4096"
+    CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+    _network = None
+
+    def __init__(self, url, path, segments=4, headers=None):
+        super().__init__()
+        self.url = url
+        self.path = path
+        self.max_segments = max(1, segments)
+        self.headers = headers or {}
+        # ฟังก์ชัน QUrl -> ค่า header Cookie ของ URL นั้น (None = ไม่ส่งคุกกี้)
+        self.cookie_header = None
+        self.total = -1
+        self.ranged = True
+        self.etag = ''
+        self.last_modified = ''
+        # แต่ละช่วงคือ [เริ่ม, สิ้นสุด (รวม), ตำแหน่งถัดไปที่จะเขียน]
+        self.segments = []
+        # reply -> ช่วงที่ reply นั้นดาวน์โหลดอยู่
+        self.replies = {}
+        self.retries = {}
+        self.fd = None
+        self.paused = True
+        self.result = None
+        self.error = ''
+        self.last_save = 0.0
+        # การบันทึกสถานะตามรอบทำใน thread แยก (fdatasync อาจช้ามาก) ลำดับที่สั่งกับลำดับที่เขียนแล้วกันสถานะเก่าทับสถานะใหม่
+        self.save_lock = threading.Lock()
+        self.save_serial = 0
+        self.saved_serial = 0
+        # SHA-256 ของข้อมูลที่ต่อเนื่องจากไบต์แรก คำนวณขณะข้อมูลเข้า (ส่วนที่เหลือ DownloadVerifier คำนวณต่อ)
+        self.digest = hashlib.sha256()
+        self.hashed_bytes = 0
+        self.advertised_hash = ''
+
+    @classmethod
+    def network(cls):
+        """QNetworkAccessManager ที่ทุกการดาวน์โหลดใช้ร่วมกัน (ใช้ proxy ของแอปพลิเคชันตามปกติ)"""
+        if cls._network is None:
+            cls._network = QNetworkAccessManager()
+        return cls._network
+
+    @classmethod
+    def restore(cls, state_path, headers=None):
+        """สร้างการดาวน์โหลดจากไฟล์สถานะที่บันทึกไว้ คืนค่า None ถ้าอ่านไม่ได้"""
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            job = cls(state['url'], state['path'], state.get('max_segments', 4), headers)
+            job.total = state['total']
+            job.ranged = state.get('ranged', True)
+            job.etag = state.get('etag', '')
+            job.last_modified = state.get('last_modified', '')
+            job.segments = [list(segment) for segment in state['segments']]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error restoring download state: {e}")
+            return None
+        if not job.ranged or not os.path.exists(job.part_path()):
+            # เซิร์ฟเวอร์ไม่รองรับ Range หรือไฟล์ชั่วคราวหายไป: เริ่มใหม่ทั้งหมด
+            job.reset()
+        return job
+
+    def part_path(self):
+        return self.path + self.PART_SUFFIX
+
+    def state_path(self):
+        return self.path + self.STATE_SUFFIX
+
+    # ส่วนที่เข้ากันกับ QWebEngineDownloadItem
+
+    def isPaused(self):
+        return self.paused
+
+    def receivedBytes(self):
+        return sum(pos - start for start, _, pos in self.segments)
+
+    def totalBytes(self):
+        return self.total
+
+    def state(self):
+        if self.result is not None:
+            return self.result
+        return QWebEngineDownloadItem.DownloadInProgress
+
+    def interruptReasonString(self):
+        return self.error
+
+    def checksum_state(self):
+        """(สำเนา hash ที่คำนวณแล้ว, จำนวนไบต์ที่ hash แล้ว) สำหรับคำนวณส่วนที่เหลือต่อจากไฟล์"""
+        return self.digest.copy(), self.hashed_bytes
+
+    def resume(self):
+        """เริ่มหรือดาวน์โหลดต่อ"""
+        if not self.paused or self.result is not None:
+            return
+        self.paused = False
+        try:
+            self.open_file()
+        except OSError as e:
+            self.fail(str(e))
+            return
+        self.fill()
+
+    def pause(self):
+        """หยุดชั่วคราวและบันทึกสถานะ"""
+        if self.paused or self.result is not None:
+            return
+        self.paused = True
+        self.abort_all()
+        self.save_state(force=True)
+        self.close_file()
+
+    def cancel(self):
+        """ยกเลิกและลบไฟล์ชั่วคราว"""
+        if self.result is not None:
+            return
+        self.paused = True
+        self.abort_all()
+        self.close_file()
+        self.remove_files()
+        self.finish(QWebEngineDownloadItem.DownloadCancelled)
+
+    def remove_files(self):
+        """ลบไฟล์ชั่วคราวและไฟล์สถานะ"""
+        self.remove_state()
+        try:
+            os.remove(self.part_path())
+        except OSError:
+            pass
+
+    def remove_state(self):
+        """ลบไฟล์สถานะ และยกเลิกการบันทึกที่ยังค้างใน thread ไม่ให้สร้างไฟล์ขึ้นมาใหม่"""
+        with self.save_lock:
+            self.saved_serial = self.save_serial
+            try:
+                os.remove(self.state_path())
+            except OSError:
+                pass
+
+    # การจัดการช่วง
+
+    def reset(self):
+        """ลืมความคืบหน้าทั้งหมด"""
+        self.total = -1
+        self.ranged = True
+        self.etag = self.last_modified = ''
+        self.segments = []
+        self.digest = hashlib.sha256()
+        self.hashed_bytes = 0
+
+    def open_file(self):
+        """เปิดไฟล์ชั่วคราว (จองขนาดเมื่อรู้ขนาดไฟล์)"""
+        if self.fd is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.fd = os.open(self.part_path(), os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+
+    def allocate(self):
+        """จองพื้นที่ทั้งไฟล์ครั้งเดียว เพื่อให้แต่ละช่วงเขียนลงตำแหน่งของตัวเองได้"""
+        if self.total <= 0:
+            return
+        try:
+            os.posix_fallocate(self.fd, 0, self.total)
+        except (AttributeError, OSError):
+            os.ftruncate(self.fd, self.total)
+
+    def close_file(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def write_at(self, data, offset):
+        """เขียนข้อมูลลงตำแหน่งที่กำหนดโดยไม่ย้ายตำแหน่งไฟล์ร่วม"""
+        if hasattr(os, 'pwrite'):
+            os.pwrite(self.fd, data, offset)
+        else:
+            os.lseek(self.fd, offset, os.SEEK_SET)
+            os.write(self.fd, data)
+
+    def start_segment(self, segment, url=None, redirects=0):
+        """ส่งคำขอ Range ของช่วงที่เหลือ (url คือปลายทางของ redirect ถ้ามี)"""
+        url = QUrl(url or self.url)
+        request = QNetworkRequest(url)
+        # Qt คัดลอก header ทั้งหมดของคำขอเดิมไปยังปลายทางของ redirect จึงตาม redirect เองใน segment_finished
+        request.setAttribute(QNetworkRequest.RedirectPolicyAttribute, QNetworkRequest.ManualRedirectPolicy)
+        headers = dict(self.headers)
+        if self.cookie_header is not None:
+            headers['Cookie'] = self.cookie_header(url)
+        for name, value in headers.items():
+            if value:
+                request.setRawHeader(name.encode('latin-1'), value.encode('latin-1', 'replace'))
+        end = '' if segment[1] < 0 else str(segment[1])
+        request.setRawHeader(b'Range', f"bytes={segment[2]}-{end}".encode('ascii'))
+        # ถ้าไฟล์บนเซิร์ฟเวอร์เปลี่ยน เซิร์ฟเวอร์จะส่งทั้งไฟล์ (200) แทนช่วงที่ขอ
+        validator = self.etag or self.last_modified
+        if validator:
+            request.setRawHeader(b'If-Range', validator.encode('latin-1'))
+        reply = self.network().get(request)
+        reply.setProperty('redirects', redirects)
+        self.replies[reply] = segment
+        reply.metaDataChanged.connect(lambda reply=reply: self.headers_received(reply))
+        reply.readyRead.connect(lambda reply=reply: self.data_received(reply))
+        reply.finished.connect(lambda reply=reply: self.segment_finished(reply))
+
+    def headers_received(self, reply):
+        """ตรวจคำตอบ: 206 คือได้ช่วงที่ขอ, 200 คือเซิร์ฟเวอร์ส่งทั้งไฟล์"""
+        segment = self.replies.get(reply)
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if segment is None or status is None or 300 <= status < 400:
+            return
+        first = not self.segments
+        if status == 206:
+            if first:
+                match = self.CONTENT_RANGE.match(bytes(reply.rawHeader(b'Content-Range')).decode('latin-1'))
+                self.total = int(match.group(3)) if match and match.group(3) != '*' else -1
+                self.etag = bytes(reply.rawHeader(b'ETag')).decode('latin-1')
+                self.last_modified = bytes(reply.rawHeader(b'Last-Modified')).decode('latin-1')
+                self.advertised_hash = self.header_hash(reply)
+                self.ranged = self.total > 0
+                segment[1] = self.total - 1 if self.total > 0 else (1 << 62)
+                self.segments.append(segment)
+                self.allocate()
+                self.save_state(force=True)
+                self.fill()
+        elif status == 200:
+            if not first:
+                # ไฟล์เปลี่ยนไปจากเดิม: ทิ้งความคืบหน้าแล้วใช้คำตอบนี้เป็นการดาวน์โหลดครั้งใหม่แบบช่วงเดียว
+                for other in list(self.replies):
+                    if other is not reply:
+                        self.replies.pop(other)
+                        other.abort()
+                os.ftruncate(self.fd, 0)
+            length = reply.header(QNetworkRequest.ContentLengthHeader)
+            self.total = int(length) if length is not None else -1
+            self.ranged = False
+            segment[:] = [0, self.total - 1 if self.total > 0 else (1 << 62), 0]
+            self.segments = [segment]
+            self.etag = self.last_modified = ''
+            self.digest = hashlib.sha256()
+            self.hashed_bytes = 0
+            self.advertised_hash = self.header_hash(reply)
+            self.allocate()
+
+    @staticmethod
+    def header_hash(reply):
+        """SHA-256 ของทั้งไฟล์ที่เซิร์ฟเวอร์ประกาศใน Repr-Digest หรือ Digest (ถ้ามี)"""
+        for name in (b'Repr-Digest', b'Digest'):
+            value = DownloadVerifier.normalize(bytes(reply.rawHeader(name)).decode('latin-1'))
+            if value:
+                return value
+        return ''
+
+    def data_received(self, reply):
+        """เขียนข้อมูลที่ได้รับลงตำแหน่งของช่วง"""
+        segment = self.replies.get(reply)
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if segment is None or segment not in self.segments or status not in (200, 206):
+            return
+        data = bytes(reply.readAll())
+        # ช่วงนี้อาจถูกแบ่งให้การเชื่อมต่ออื่นไปแล้ว จึงเขียนไม่เกินจุดสิ้นสุดใหม่
+        data = data[:segment[1] - segment[2] + 1]
+        if data:
+            try:
+                self.write_at(data, segment[2])
+            except OSError as e:
+                self.fail(str(e))
+                return
+            if segment[2] == self.hashed_bytes:
+                self.digest.update(data)
+                self.hashed_bytes += len(data)
+            segment[2] += len(data)
+            self.downloadProgress.emit(self.receivedBytes(), self.total)
+            self.save_state()
+        if segment[2] > segment[1]:
+            reply.abort()
+
+    def segment_finished(self, reply):
+        """การเชื่อมต่อของช่วงจบ: ลองใหม่ถ้าผิดพลาด หรือเริ่มช่วงอื่น"""
+        segment = self.replies.pop(reply, None)
+        reply.deleteLater()
+        if segment is None or self.paused or self.result is not None:
+            return
+        error = reply.error()
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        target = reply.attribute(QNetworkRequest.RedirectionTargetAttribute)
+        if target is not None and status is not None and 300 <= status < 400:
+            self.follow_redirect(reply, segment, reply.url().resolved(target))
+            return
+        if not self.ranged and error == QNetworkReply.NoError:
+            # ไม่รองรับ Range: การเชื่อมต่อเดียวจบคือได้ทั้งไฟล์
+            self.total = segment[2]
+            segment[1] = segment[2] - 1
+        failed = (error not in (QNetworkReply.NoError, QNetworkReply.OperationCanceledError)
+                  or (status is not None and status >= 400))
+        if failed and (segment[1] < 0 or segment[2] <= segment[1]):
+            attempts = self.retries.get(segment[0], 0) + 1
+            self.retries[segment[0]] = attempts
+            permanent = status is not None and 400 <= status < 500
+            if attempts > self.MAX_RETRIES or permanent:
+                self.fail(reply.errorString(), permanent)
+                return
+            QTimer.singleShot(1000 * attempts, self.fill)
+            return
+        self.fill()
+
+    def follow_redirect(self, reply, segment, target):
+        """ส่งคำขอของช่วงไปยังปลายทางของ redirect พร้อมคุกกี้ของโฮสต์ใหม่ (ไม่ยอมลดจาก https เป็น http)"""
+        redirects = (reply.property('redirects') or 0) + 1
+        if redirects > self.MAX_REDIRECTS:
+            self.fail("redirect มากเกินไป")
+        elif target.scheme() not in ('http', 'https') or (reply.url().scheme() == 'https' and target.scheme() != 'https'):
+            self.fail(f"redirect ไปยัง URL ที่ไม่ปลอดภัย: {target.toString()}", permanent=True)
+        else:
+            self.start_segment(segment, target.toString(), redirects)
+
+    def fill(self):
+        """เปิดการเชื่อมต่อให้ครบตามจำนวน: ช่วงที่ยังไม่มีใครโหลดก่อน แล้วแบ่งช่วงที่เหลือมากที่สุด"""
+        if self.paused or self.result is not None:
+            return
+        if not self.segments:
+            # ขอทั้งไฟล์ตั้งแต่ไบต์แรก คำตอบ 206 บอกขนาดและยืนยันว่ารองรับ Range แล้วใช้เป็นช่วงแรกได้เลย
+            if not self.replies:
+                self.start_segment([0, -1, 0])
+            return
+        busy = [id(segment) for segment in self.replies.values()]
+        for segment in self.segments:
+            if len(self.replies) >= self.max_segments:
+                break
+            if segment[2] <= segment[1] and id(segment) not in busy:
+                self.start_segment(segment)
+        while self.ranged and len(self.replies) < self.max_segments:
+            largest = max(self.replies.values(), key=lambda s: s[1] - s[2], default=None)
+            if largest is None or largest[1] - largest[2] + 1 < 2 * self.MIN_SEGMENT:
+                break
+            middle = largest[2] + (largest[1] - largest[2] + 1) // 2
+            segment = [middle, largest[1], middle]
+            largest[1] = middle - 1
+            self.segments.append(segment)
+            self.start_segment(segment)
+        if not self.replies and all(segment[2] > segment[1] for segment in self.segments):
+            self.complete()
+
+    def abort_all(self):
+        replies, self.replies = list(self.replies), {}
+        for reply in replies:
+            reply.abort()
+
+    def save_state(self, force=False):
+        """บันทึกตำแหน่งของทุกช่วง (force บันทึกทันทีใน thread นี้ เช่นตอนหยุดชั่วคราว
+        ส่วนการบันทึกตามรอบระหว่างดาวน์โหลดทำใน thread แยกเพื่อไม่ให้ UI ค้าง)"""
+        now = time.monotonic()
+        if not self.ranged or (not force and now - self.last_save < self.SAVE_INTERVAL):
+            return
+        self.last_save = now
+        state = {
+            'url': self.url,
+            'path': self.path,
+            'total': self.total,
+            'ranged': self.ranged,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'max_segments': self.max_segments,
+            'segments': sorted(self.segments)
+        }
+        try:
+            # ใช้ fd สำเนา เพราะ thread อาจยัง sync อยู่ตอนที่ไฟล์หลักถูกปิดไปแล้ว
+            fd = os.dup(self.fd) if self.fd is not None else None
+        except OSError as e:
+            print(f"Error saving download state: {e}")
+            return
+        self.save_serial += 1
+        if force:
+            self.write_state(state, fd, self.save_serial)
+        else:
+            threading.Thread(target=self.write_state, args=(state, fd, self.save_serial), daemon=True).start()
+
+    def write_state(self, state, fd, serial):
+        """sync ข้อมูลลงดิสก์ก่อนเขียนสถานะ เพื่อไม่ให้สถานะอ้างถึงข้อมูลที่ยังไม่ถูกเขียน (ข้ามถ้ามีสถานะที่ใหม่กว่าเขียนไปแล้ว)"""
+        try:
+            with self.save_lock:
+                if serial <= self.saved_serial:
+                    return
+                if fd is not None:
+                    getattr(os, 'fdatasync', os.fsync)(fd)
+                temp_path = self.state_path() + '.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(temp_path, self.state_path())
+                self.saved_serial = serial
+        except OSError as e:
+            print(f"Error saving download state: {e}")
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def complete(self):
+        """ทุกช่วงครบ: ย้ายไฟล์ชั่วคราวไปเป็นไฟล์จริง"""
+        try:
+            os.fsync(self.fd)
+            self.close_file()
+            os.replace(self.part_path(), self.path)
+            self.remove_state()
+        except OSError as e:
+            self.fail(str(e))
+            return
+        self.downloadProgress.emit(self.total, self.total)
+        self.finish(QWebEngineDownloadItem.DownloadCompleted)
+
+    def fail(self, message, permanent=False):
+        """หยุดด้วยข้อผิดพลาด (ถ้าได้ข้อมูลมาแล้วจะเก็บไฟล์ชั่วคราวและสถานะไว้ให้ดาวน์โหลดต่อครั้งหน้า
+        ยกเว้นข้อผิดพลาดถาวรอย่าง 4xx ซึ่งลองใหม่ก็ไม่สำเร็จ จึงลบทิ้งไม่ให้ resume_pending เริ่มซ้ำทุกครั้งที่เปิดโปรแกรม)"""
+        self.paused = True
+        self.abort_all()
+        if self.receivedBytes() and not permanent:
+            self.save_state(force=True)
+            self.close_file()
+        else:
+            self.close_file()
+            self.remove_files()
+        self.error = message
+        self.finish(QWebEngineDownloadItem.DownloadInterrupted)
+
+    def finish(self, result):
+        self.result = result
+        self.finished.emit()
+
+
+class DownloadManager(QObject):
+    """คิวดาวน์โหลดของทุกหน้าต่าง: บันทึกอัตโนมัติโดยไม่ตั้งชื่อซ้ำ จำกัดจำนวนพร้อมกันทั้งหมดและต่อโฮสต์"""
+
+    # รายการใหม่ และรายการที่เปลี่ยนสถานะ
+    added = pyqtSignal(object)
+    changed = pyqtSignal(object)
+
+    _shared = None
+
+    DEFAULTS = {
+        'max_concurrent': 4,
+        'per_host': 2,
+        # ไฟล์ที่ใหญ่กว่า segmented_min_mb ดาวน์โหลดเองแบบแบ่งช่วงหลายการเชื่อมต่อ (ปิดไว้เป็นค่าเริ่มต้น)
+        'segmented': False,
+        'segmented_min_mb': 32,
+        'segments': 4,
+        # ไฟล์ที่เนื้อหาซ้ำกับไฟล์เดิมในโฟลเดอร์ดาวน์โหลดใช้ hardlink แทนการเก็บสำเนาที่สอง
+        'dedup': True
+    }
+
+    # จำนวนรายการที่จบแล้วที่เก็บไว้แสดง
+    MAX_FINISHED = 500
+
+    # checksum ที่หน้าเว็บประกาศคู่กับลิงก์: แอตทริบิวต์ integrity/data-sha256 ของลิงก์
+    # หรือ hex 64 ตัวที่มีค่าเดียวในข้อความรอบลิงก์ (เช่นแถวเดียวกันในตาราง)
+    ADVERTISED_HASH_SCRIPT = """
+    (function(url) {
+        var links = document.querySelectorAll('a[href]');
+        for (var i = 0; i < links.length; i++) {
+            var link = links[i];
+            if (link.href !== url) continue;
+            var value = link.getAttribute('integrity') || link.getAttribute('data-sha256') ||
+                        link.getAttribute('data-checksum');
+            if (value) return value;
+            var node = link.parentElement;
+            for (var depth = 0; node && depth < 3; depth++, node = node.parentElement) {
+                var found = (node.textContent || '').match(/\\b[0-9a-fA-F]{64}\\b/g);
+                if (!found) continue;
+                var first = found[0].toLowerCase();
+                var same = found.every(function(hash) { return hash.toLowerCase() === first; });
+                return same ? first : '';
+            }
+        }
+        return '';
+    })(%s)
+    """
+
+    STATE_NAMES = {
+        'queued': 'รอคิว',
+        'downloading': 'กำลังดาวน์โหลด',
+        'paused': 'หยุดชั่วคราว',
+        'completed': 'เสร็จสิ้น',
+        'failed': 'ล้มเหลว',
+        'cancelled': 'ยกเลิกแล้ว'
+    }
+
+    CHECK_NAMES = {
+        'hashing': 'กำลังตรวจ SHA-256',
+        'ok': 'SHA-256 ตรงกัน',
+        'mismatch': 'SHA-256 ไม่ตรง!',
+        'error': 'ตรวจ SHA-256 ไม่สำเร็จ'
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.settings = {}
+        self.location = QStandardPaths.writableLocation(QStandardPaths.DownloadLocation)
+        self.items = []
+        self.queue = deque()
+        # โฮสต์ -> จำนวนรายการที่กำลังดาวน์โหลด
+        self.active = {}
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการดาวน์โหลดเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def configure(self, settings, location=None):
+        """ใช้ค่าจาก settings['downloads'] และโฟลเดอร์ดาวน์โหลด"""
+        self.settings = settings
+        if location:
+            self.location = location
+        self.schedule()
+
+    def config(self, key):
+        """อ่านค่าตั้งค่าหรือค่าเริ่มต้น"""
+        return self.settings.get(key, self.DEFAULTS[key])
+
+    def attach(self, profile):
+        """รับการดาวน์โหลดของ profile (เชื่อมต่อครั้งเดียวต่อ profile)"""
+        if profile.property('downloads_attached'):
+            return
+        profile.setProperty('downloads_attached', True)
+        profile.downloadRequested.connect(self.download_requested)
+
+    def download_requested(self, download):
+        """บันทึกไฟล์ลงโฟลเดอร์ดาวน์โหลดทันทีโดยไม่ถาม แล้วเข้าคิว"""
+        # การบันทึกหน้าลงคลังออฟไลน์ไม่ใช่การดาวน์โหลดของผู้ใช้
+        archive = OfflineArchive.shared()
+        if archive.handles(download):
+            archive.attach(download)
+            return
+
+        if hasattr(download, 'downloadFileName'):
+            name = download.downloadFileName()
+        else:
+            name = os.path.basename(download.path())
+        path = self.unique_path(name or download.url().fileName())
+        url = download.url()
+        if self.segmented_for(download):
+            # ไม่ accept: WebEngine ทิ้งคำขอนี้ แล้วดาวน์โหลดเองแบบแบ่งช่วง
+            download.cancel()
+            job = SegmentedDownload(url.toString(), path, self.config('segments'), self.request_headers())
+            job.cookie_header = CookieManager.shared().cookie_header
+            item = self.add_job(job, url.toString(), path)
+            self.find_advertised_hash(download, item)
+            return
+        download.setPath(path)
+        # WebEngine ยกเลิกการดาวน์โหลดที่ไม่ accept ภายใน signal นี้ จึง accept ทันทีแล้วหยุดไว้ถ้ายังไม่ถึงคิว
+        download.accept()
+        item = self.add_job(download, url.toString(), path)
+        self.find_advertised_hash(download, item)
+
+    def add_job(self, job, url, path):
+        """สร้างรายการของ job แล้วเข้าคิว"""
+        item = DownloadItem(url, path, job)
+        job.downloadProgress.connect(lambda received, total, item=item: item.update(received, total))
+        job.finished.connect(lambda item=item: self.job_finished(item))
+        self.add(item)
+        return item
+
+    def find_advertised_hash(self, download, item):
+        """ถามหน้าที่มีลิงก์ว่าประกาศ SHA-256 ของไฟล์ไว้หรือไม่ (ผลส่งให้ DownloadVerifier)"""
+        page = download.page() if hasattr(download, 'page') else None
+        if page is None:
+            return
+        script = self.ADVERTISED_HASH_SCRIPT % json.dumps(download.url().toString())
+        page.runJavaScript(script, QWebEngineScript.ApplicationWorld,
+                           lambda value, item=item: DownloadVerifier.shared().set_expected(item, value, replace=False))
+
+    def segmented_for(self, download):
+        """ควรดาวน์โหลดเองแบบแบ่งช่วงหรือไม่: เปิดใช้, เป็น http(s) และใหญ่พอ"""
+        return (self.config('segmented')
+                and download.url().scheme() in ('http', 'https')
+                and download.totalBytes() >= self.config('segmented_min_mb') * 1024 * 1024)
+
+    def request_headers(self):
+        """header ที่ทำให้คำขอของเราเหมือนของหน้าเว็บ (คุกกี้สร้างใหม่ต่อคำขอตามโฮสต์จาก cookie_header ของ job)"""
+        return {
+            'User-Agent': QWebEngineProfile.defaultProfile().httpUserAgent()
+        }
+
+    def resume_pending(self):
+        """ดาวน์โหลดแบบแบ่งช่วงที่ค้างจากครั้งก่อนต่อ (หาไฟล์สถานะในโฟลเดอร์ดาวน์โหลด)"""
+        known = {item.path for item in self.items}
+        try:
+            names = os.listdir(self.location)
+        except OSError:
+            return
+        for name in sorted(names):
+            if not name.endswith(SegmentedDownload.STATE_SUFFIX):
+                continue
+            path = os.path.join(self.location, name)
+            if path[:-len(SegmentedDownload.STATE_SUFFIX)] in known:
+                continue
+            job = SegmentedDownload.restore(path)
+            if job is None:
+                continue
+            job.headers = self.request_headers()
+            job.cookie_header = CookieManager.shared().cookie_header
+            item = self.add_job(job, job.url, job.path)
+            item.received, item.total = job.receivedBytes(), job.total
+            item.reset_speed()
+
+    def unique_path(self, name):
+        """path ในโฟลเดอร์ดาวน์โหลดที่ไม่ซ้ำกับไฟล์ที่มีอยู่หรือที่กำลังดาวน์โหลด เช่น file (1).zip"""
+        name = os.path.basename(name.replace('\\', '/')).strip() or 'download'
+        os.makedirs(self.location, exist_ok=True)
+        reserved = {item.path for item in self.items if not item.finished()}
+        stem, ext = os.path.splitext(name)
+        # คงนามสกุลซ้อนอย่าง .tar.gz ไว้ด้วยกัน
+        if stem.lower().endswith('.tar'):
+            stem, ext = stem[:-4], stem[-4:] + ext
+        path = os.path.join(self.location, name)
+        counter = 1
+        while path in reserved or os.path.exists(path) or os.path.exists(path + SegmentedDownload.PART_SUFFIX):
+            path = os.path.join(self.location, f"{stem} ({counter}){ext}")
+            counter += 1
+        return path
+
+    def add(self, item):
+        """เพิ่มรายการเข้าคิวและเริ่มถ้ามีช่องว่าง"""
+        self.items.append(item)
+        self.added.emit(item)
+        if self.can_start(item):
+            self.start(item)
+        else:
+            item.job.pause()
+            self.queue.append(item)
+        self.trim()
+
+    def can_start(self, item):
+        """มีช่องว่างทั้งโดยรวมและของโฮสต์นี้หรือไม่"""
+        return (sum(self.active.values()) < self.config('max_concurrent')
+                and self.active.get(item.host, 0) < self.config('per_host'))
+
+    def start(self, item):
+        """เริ่มหรือดาวน์โหลดต่อ"""
+        item.state = 'downloading'
+        item.reset_speed()
+        self.active[item.host] = self.active.get(item.host, 0) + 1
+        if item.job.isPaused():
+            item.job.resume()
+        self.changed.emit(item)
+
+    def release(self, item):
+        """คืนช่องของรายการที่หยุดหรือจบแล้ว"""
+        count = self.active.get(item.host, 0) - 1
+        if count > 0:
+            self.active[item.host] = count
+        else:
+            self.active.pop(item.host, None)
+
+    def schedule(self):
+        """เริ่มรายการในคิวตามลำดับ ข้ามรายการที่โฮสต์เต็มไปก่อน"""
+        for item in list(self.queue):
+            if sum(self.active.values()) >= self.config('max_concurrent'):
+                break
+            if self.can_start(item):
+                self.queue.remove(item)
+                self.start(item)
+
+    def pause(self, item):
+        """หยุดชั่วคราว (ปล่อยช่องให้รายการอื่น)"""
+        if item.state == 'downloading':
+            item.job.pause()
+            item.state = 'paused'
+            self.release(item)
+            self.changed.emit(item)
+            self.schedule()
+        elif item.state == 'queued':
+            self.queue.remove(item)
+            item.state = 'paused'
+            self.changed.emit(item)
+
+    def resume(self, item):
+        """ดาวน์โหลดต่อ (เข้าคิวถ้ายังไม่มีช่องว่าง)"""
+        if item.state != 'paused':
+            return
+        item.state = 'queued'
+        self.queue.append(item)
+        self.changed.emit(item)
+        self.schedule()
+
+    def cancel(self, item):
+        """ยกเลิก (job จะส่ง finished ตามมา)"""
+        if not item.finished():
+            item.job.cancel()
+
+    def job_finished(self, item):
+        """job จบแล้ว: บันทึกผล คืนช่อง และเริ่มรายการถัดไป"""
+        if item.finished():
+            return
+        if item.state == 'downloading':
+            self.release(item)
+        elif item in self.queue:
+            self.queue.remove(item)
+        job = item.job
+        state = job.state()
+        if state == QWebEngineDownloadItem.DownloadCompleted:
+            item.state = 'completed'
+            item.received = item.total = max(item.total, job.receivedBytes())
+        elif state == QWebEngineDownloadItem.DownloadCancelled:
+            item.state = 'cancelled'
+        else:
+            item.state = 'failed'
+            item.error = job.interruptReasonString()
+        item.end_time = time.time()
+        item.speed = 0.0
+        self.changed.emit(item)
+        self.schedule()
+
+    def trim(self):
+        """ทิ้งรายการเก่าที่จบแล้วเมื่อเกินจำนวนที่เก็บ"""
+        finished = [item for item in self.items if item.finished()]
+        if len(finished) > self.MAX_FINISHED:
+            dropped = set(id(item) for item in finished[:len(finished) - self.MAX_FINISHED])
+            self.items = [item for item in self.items if id(item) not in dropped]
+
+    def remove_finished(self, since=0):
+        """ลบรายการที่จบแล้วซึ่งเริ่มตั้งแต่ since ออกจากรายการ (ไม่ลบไฟล์) คืนค่าจำนวนที่ลบ"""
+        kept = [item for item in self.items if not (item.finished() and item.start_time >= since)]
+        removed = len(self.items) - len(kept)
+        self.items = kept
+        return removed
+
+    def save_state(self):
+        """บันทึกตำแหน่งล่าสุดของการดาวน์โหลดแบบแบ่งช่วง (ก่อนปิดโปรแกรม)"""
+        for item in self.active_items():
+            if isinstance(item.job, SegmentedDownload):
+                item.job.save_state(force=True)
+
+    def active_items(self):
+        """รายการที่ยังไม่จบ"""
+        return [item for item in self.items if not item.finished()]
+
+    @staticmethod
+    def format_size(size):
+        """ขนาดไฟล์แบบอ่านง่าย"""
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024 or unit == 'GB':
+                return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+            size /= 1024
+
+    @staticmethod
+    def format_duration(seconds):
+        """ระยะเวลาแบบอ่านง่าย"""
+        seconds = int(seconds)
+        if seconds < 60:
+            return f"{seconds} วินาที"
+        if seconds < 3600:
+            return f"{seconds // 60} นาที {seconds % 60} วินาที"
+        return f"{seconds // 3600} ชั่วโมง {seconds % 3600 // 60} นาที"
+
+    def summary_text(self, summary):
+        """ข้อความสรุปของการดาวน์โหลดทั้งหมด (จาก DownloadProgressAggregator)"""
+        if not summary:
+            return ""
+        parts = [f"ดาวน์โหลด {summary['count']} รายการ"]
+        if summary['percent'] >= 0:
+            parts.append(f"{summary['percent']}%")
+        if summary['speed'] > 0:
+            parts.append(f"{self.format_size(summary['speed'])}/s")
+        if summary['eta'] is not None:
+            parts.append(f"เหลือ {self.format_duration(summary['eta'])}")
+        return " • ".join(parts)
+
+    def describe(self, item):
+        """ข้อความสถานะของรายการ เช่น 12.0 MB / 40.0 MB • 2.1 MB/s • เหลือ 13 วินาที"""
+        parts = []
+        if item.state == 'downloading':
+            size = self.format_size(item.received)
+            parts.append(f"{size} / {self.format_size(item.total)}" if item.total > 0 else size)
+            if item.speed > 0:
+                parts.append(f"{self.format_size(item.speed)}/s")
+            eta = item.eta()
+            if eta is not None:
+                parts.append(f"เหลือ {self.format_duration(eta)}")
+        else:
+            parts.append(self.STATE_NAMES[item.state])
+            if item.state == 'completed' and item.total > 0:
+                parts.append(self.format_size(item.total))
+            if item.state == 'completed':
+                if item.check in self.CHECK_NAMES:
+                    parts.append(self.CHECK_NAMES[item.check])
+                if item.duplicate_of:
+                    parts.append(f"ใช้ร่วมกับ {os.path.basename(item.duplicate_of)}")
+            elif item.error:
+                parts.append(item.error)
+        return " • ".join(parts)
+
+class DownloadProgressAggregator(QObject):
+    """รวมความคืบหน้าของทุกการดาวน์โหลดเป็นสรุปเดียว และเผยแพร่ในอัตราคงที่แทนการอัพเดท UI ทุกครั้งที่มีข้อมูลเข้า"""
+
+    # สรุปล่าสุด (dict) หรือ None เมื่อไม่มีการดาวน์โหลดค้างอยู่
+    updated = pyqtSignal(object)
+
+    _shared = None
+
+    # จำนวนครั้งที่เผยแพร่ต่อวินาที
+    RATE = 4
+
+    def __init__(self, manager):
+        super().__init__()
+        self.manager = manager
+        self.last = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000 // self.RATE)
+        self.timer.timeout.connect(self.publish)
+        manager.added.connect(self.wake)
+        manager.changed.connect(self.wake)
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวรวมความคืบหน้าของตัวจัดการดาวน์โหลดหลัก"""
+        if cls._shared is None:
+            cls._shared = cls(DownloadManager.shared())
+        return cls._shared
+
+    def wake(self, item=None):
+        """เริ่มเผยแพร่เมื่อมีการเปลี่ยนแปลง (ตัวจับเวลาหยุดเองเมื่อไม่มีการดาวน์โหลด)"""
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def snapshot(self):
+        """สรุปรวมของรายการที่ยังไม่จบ"""
+        active = self.manager.active_items()
+        if not active:
+            return None
+        downloading = [item for item in active if item.state == 'downloading']
+        received = sum(item.received for item in active)
+        # รู้ขนาดรวมเมื่อทุกรายการรู้ขนาดของตัวเอง
+        total = sum(item.total for item in active) if all(item.total > 0 for item in active) else -1
+        speed = sum(item.speed for item in downloading)
+        return {
+            'count': len(active),
+            'downloading': len(downloading),
+            'received': received,
+            'total': total,
+            'percent': min(100, received * 100 // total) if total > 0 else -1,
+            'speed': speed,
+            'eta': (total - received) / speed if total > 0 and speed > 0 else None
+        }
+
+    def publish(self):
+        """ส่งสรุปถ้าเปลี่ยนไปจากครั้งก่อน"""
+        summary = self.snapshot()
+        if summary != self.last:
+            self.last = summary
+            self.updated.emit(summary)
+        if summary is None:
+            self.timer.stop()
+
+class DownloadVerifier(QObject):
+    """ขั้นตอนหลังดาวน์โหลดเสร็จ: คำนวณ SHA-256 ใน thread แยก ตรวจกับค่าที่ผู้ใช้ใส่หรือที่หน้าเว็บประกาศ
+    และถ้ามีไฟล์เนื้อหาเดียวกันในโฟลเดอร์ดาวน์โหลดอยู่แล้ว จะใช้ hardlink แทนการเก็บสำเนาที่สอง"""
+
+    # รายการที่ตรวจเสร็จหรือผลตรวจเปลี่ยน
+    checked = pyqtSignal(object)
+    # ผลจาก thread: (item, sha256, ไฟล์ขนาดเท่ากันที่ hash เพิ่ม {path: [sha256, size, mtime_ns]}, ข้อความผิดพลาด)
+    hashed = pyqtSignal(object, str, object, str)
+
+    _shared = None
+
+    CHUNK_SIZE = 1024 * 1024
+    # จำนวนไฟล์ขนาดเท่ากันที่ยังไม่อยู่ในดัชนีซึ่งยอม hash เพิ่มต่อการดาวน์โหลดหนึ่งครั้ง
+    MAX_CANDIDATES = 8
+
+    # hex 64 ตัว, SRI (sha256-<base64>) หรือ Digest/Repr-Digest (sha-256=<base64> หรือ sha-256=:<base64>:)
+    HEX_HASH = re.compile(r'(?<![0-9a-fA-F])([0-9a-fA-F]{64})(?![0-9a-fA-F])')
+    BASE64_HASH = re.compile(r'sha-?256[-=]:?([A-Za-z0-9+/]{43}=)', re.IGNORECASE)
+
+    def __init__(self, manager, index_path=None):
+        super().__init__()
+        self.manager = manager
+        self.index_path = index_path or os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "download_hashes.json"
+        )
+        # sha256 -> [path, size, mtime_ns] ของไฟล์ที่ดาวน์โหลดไว้ (โหลดเมื่อใช้ครั้งแรก)
+        self.index = None
+        self.executor = None
+        self.hashed.connect(self.hash_finished)
+        manager.changed.connect(self.item_changed)
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวตรวจของตัวจัดการดาวน์โหลดหลัก"""
+        if cls._shared is None:
+            cls._shared = cls(DownloadManager.shared())
+        return cls._shared
+
+    @classmethod
+    def normalize(cls, text):
+        """แปลงค่า hash ที่ผู้ใช้ใส่หรือที่หน้าเว็บ/เซิร์ฟเวอร์ประกาศเป็น hex ตัวเล็ก หรือ '' ถ้าไม่ใช่ SHA-256"""
+        text = (text or '').strip() if isinstance(text, str) else ''
+        match = cls.HEX_HASH.search(text)
+        if match:
+            return match.group(1).lower()
+        match = cls.BASE64_HASH.search(text)
+        if match:
+            try:
+                return base64.b64decode(match.group(1)).hex()
+            except ValueError:
+                return ''
+        return ''
+
+    def load_index(self):
+        """อ่านดัชนี hash (ทิ้งรายการที่ไฟล์หายไปแล้ว)"""
+        if self.index is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.index = {digest: entry for digest, entry in json.load(f).items()
+                                  if os.path.exists(entry[0])}
+            except (OSError, ValueError, AttributeError, TypeError, IndexError):
+                self.index = {}
+        return self.index
+
+    def save_index(self):
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"Error saving download hashes: {e}")
+
+    def set_expected(self, item, text, replace=True):
+        """กำหนด SHA-256 ที่ควรได้ (จากผู้ใช้ หรือจากหน้าเว็บเมื่อ replace=False) คืนค่า False ถ้าไม่ใช่ค่า hash"""
+        value = self.normalize(text)
+        if not value or (item.expected_hash and not replace):
+            return False
+        item.expected_hash = value
+        if item.sha256:
+            self.compare(item)
+            self.manager.changed.emit(item)
+            self.checked.emit(item)
+        return True
+
+    def item_changed(self, item):
+        """ดาวน์โหลดเสร็จ: ส่งไปคำนวณ hash ใน thread (ต่อจากส่วนที่ตัวดาวน์โหลดคำนวณไว้แล้วถ้ามี)"""
+        if item.state != 'completed' or item.check:
+            return
+        item.check = 'hashing'
+        if not item.expected_hash:
+            item.expected_hash = getattr(item.job, 'advertised_hash', '')
+        if hasattr(item.job, 'checksum_state'):
+            digest, offset = item.job.checksum_state()
+        else:
+            digest, offset = hashlib.sha256(), 0
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        self.executor.submit(self.hash_job, item, item.path, digest, offset, dict(self.load_index()))
+
+    def hash_file(self, path, digest=None, offset=0):
+        """SHA-256 ของไฟล์ อ่านทีละ CHUNK_SIZE เริ่มจาก offset"""
+        digest = digest or hashlib.sha256()
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def hash_job(self, item, path, digest, offset, index):
+        """งานใน thread: hash ไฟล์ที่ดาวน์โหลด และถ้ายังไม่รู้จักเนื้อหานี้ hash ไฟล์ขนาดเท่ากันในโฟลเดอร์เดียวกันด้วย"""
+        try:
+            sha256 = self.hash_file(path, digest, offset)
+            candidates = {}
+            if sha256 not in index:
+                size = os.path.getsize(path)
+                known = {entry[0] for entry in index.values()}
+                directory = os.path.dirname(path)
+                for entry in os.scandir(directory):
+                    if len(candidates) >= self.MAX_CANDIDATES:
+                        break
+                    if (entry.path == path or entry.path in known or entry.name.endswith(SegmentedDownload.PART_SUFFIX)
+                            or not entry.is_file(follow_symlinks=False)):
+                        continue
+                    stat = entry.stat()
+                    if stat.st_size == size:
+                        candidates[entry.path] = [self.hash_file(entry.path), stat.st_size, stat.st_mtime_ns]
+            self.hashed.emit(item, sha256, candidates, '')
+        except OSError as e:
+            self.hashed.emit(item, '', {}, str(e))
+
+    def hash_finished(self, item, sha256, candidates, error):
+        """ผลจาก thread: บันทึกดัชนี ตรวจค่าที่คาดไว้ แล้วลดไฟล์ซ้ำ"""
+        if error:
+            item.check = 'error'
+            item.error = error
+        else:
+            index = self.load_index()
+            for path, (digest, size, mtime_ns) in candidates.items():
+                index.setdefault(digest, [path, size, mtime_ns])
+            item.sha256 = sha256
+            self.compare(item)
+            if self.manager.config('dedup'):
+                self.deduplicate(item)
+            if not self.valid_entry(sha256) and os.path.exists(item.path):
+                stat = os.stat(item.path)
+                index[sha256] = [item.path, stat.st_size, stat.st_mtime_ns]
+            self.save_index()
+        self.manager.changed.emit(item)
+        self.checked.emit(item)
+
+    def compare(self, item):
+        if item.expected_hash:
+            item.check = 'ok' if item.sha256 == item.expected_hash else 'mismatch'
+        else:
+            item.check = 'hashed'
+
+    def valid_entry(self, sha256):
+        """path ในดัชนีของเนื้อหานี้ ถ้าไฟล์ยังอยู่และไม่ถูกแก้ไขตั้งแต่ hash"""
+        entry = self.load_index().get(sha256)
+        if not entry:
+            return None
+        try:
+            stat = os.stat(entry[0])
+        except OSError:
+            return None
+        if [stat.st_size, stat.st_mtime_ns] != entry[1:]:
+            return None
+        return entry[0]
+
+    def deduplicate(self, item):
+        """แทนไฟล์ที่เพิ่งดาวน์โหลดด้วย hardlink ไปยังไฟล์เดิมที่เนื้อหาเหมือนกัน"""
+        existing = self.valid_entry(item.sha256)
+        if not existing or existing == item.path:
+            return
+        try:
+            if os.path.samefile(existing, item.path):
+                return
+            temp_path = item.path + '.link'
+            os.link(existing, temp_path)
+            os.replace(temp_path, item.path)
+            item.duplicate_of = existing
+        except OSError as e:
+            # เช่นอยู่คนละ filesystem หรือระบบไฟล์ไม่รองรับ hardlink: เก็บสำเนาไว้ตามเดิม
+            print(f"Error linking duplicate download: {e}")
+
+class DownloadsPanel(QDockWidget):
+    """แผงดาวน์โหลดแบบ dock แสดงรายการ ความเร็ว และเวลาที่เหลือ"""
+
+    def __init__(self, manager, aggregator, parent=None):
+        super().__init__("ดาวน์โหลด", parent)
+        self.setObjectName("downloads_dock")
+        self.manager = manager
+        self.aggregator = aggregator
+        # id ของรายการ -> QListWidgetItem
+        self.rows = {}
+
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(4, 4, 4, 4)
+        self.list = QListWidget()
+        self.list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.list.itemDoubleClicked.connect(self.open_item)
+        self.list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.list.customContextMenuRequested.connect(self.show_menu)
+        layout.addWidget(self.list)
+
+        buttons = QHBoxLayout()
+        self.summary_label = QLabel()
+        buttons.addWidget(self.summary_label, 1)
+        clear_button = QPushButton("ล้างรายการที่เสร็จแล้ว")
+        clear_button.clicked.connect(self.clear_finished)
+        buttons.addWidget(clear_button)
+        layout.addLayout(buttons)
+        self.setWidget(widget)
+
+        manager.added.connect(self.item_added)
+        manager.changed.connect(self.update_row)
+        # รีเฟรชความเร็วและสรุปรวมตามจังหวะของตัวรวมความคืบหน้า
+        aggregator.updated.connect(self.refresh_active)
+        self.rebuild()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.rebuild()
+
+    def rebuild(self):
+        """สร้างรายการใหม่ทั้งหมด (ใหม่สุดอยู่บน)"""
+        self.list.clear()
+        self.rows = {}
+        for item in self.manager.items:
+            self.item_added(item)
+        self.update_summary(self.aggregator.last)
+
+    def item_added(self, item):
+        row = QListWidgetItem()
+        row.setData(Qt.UserRole, item)
+        self.list.insertItem(0, row)
+        self.rows[item.id] = row
+        self.update_row(item)
+
+    def update_row(self, item):
+        """อัพเดทข้อความของรายการ"""
+        row = self.rows.get(item.id)
+        if row is not None:
+            row.setText(f"{os.path.basename(item.path)}\n{self.manager.describe(item)}")
+
+    def refresh_active(self, summary=None):
+        """รีเฟรชความเร็วและเวลาที่เหลือของรายการที่กำลังดาวน์โหลด และสรุปรวมจากตัวรวมความคืบหน้า"""
+        if not self.isVisible():
+            return
+        for item in self.manager.active_items():
+            self.update_row(item)
+        self.update_summary(summary)
+
+    def update_summary(self, summary):
+        """แสดงสรุปรวมที่ตัวรวมความคืบหน้าคำนวณไว้แล้ว (คำนวณครั้งเดียวต่อรอบ)"""
+        self.summary_label.setText(self.manager.summary_text(summary))
+
+    def selected(self):
+        return [row.data(Qt.UserRole) for row in self.list.selectedItems()]
+
+    def open_item(self, row):
+        """เปิดไฟล์ที่ดาวน์โหลดเสร็จแล้ว"""
+        item = row.data(Qt.UserRole)
+        if item.state == 'completed':
+            QDesktopServices.openUrl(QUrl.fromLocalFile(item.path))
+
+    def show_menu(self, pos):
+        """เมนูคลิกขวาของรายการ"""
+        items = self.selected()
+        if not items:
+            return
+        menu = QMenu()
+        item = items[0]
+        if item.state == 'completed':
+            menu.addAction("เปิดไฟล์").triggered.connect(
+                lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(item.path)))
+            menu.addAction("เปิดโฟลเดอร์").triggered.connect(
+                lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(item.path))))
+        if any(i.state in ('downloading', 'queued') for i in items):
+            menu.addAction("หยุดชั่วคราว").triggered.connect(
+                lambda: [self.manager.pause(i) for i in items])
+        if any(i.state == 'paused' for i in items):
+            menu.addAction("ดาวน์โหลดต่อ").triggered.connect(
+                lambda: [self.manager.resume(i) for i in items])
+        if any(not i.finished() for i in items):
+            menu.addAction("ยกเลิก").triggered.connect(
+                lambda: [self.manager.cancel(i) for i in items])
+        menu.addAction("ตรวจสอบ SHA-256...").triggered.connect(lambda: self.verify_item(item))
+        menu.addSeparator()
+        menu.addAction("คัดลอกลิงก์").triggered.connect(
+            lambda: QApplication.clipboard().setText(item.url))
+        if item.sha256:
+            menu.addAction("คัดลอก SHA-256").triggered.connect(
+                lambda: QApplication.clipboard().setText(item.sha256))
+        menu.exec_(self.list.viewport().mapToGlobal(pos))
+
+    def verify_item(self, item):
+        """ถาม SHA-256 ที่ควรได้ (เช่นจากหน้าดาวน์โหลดหรือไฟล์ SHA256SUMS) แล้วตรวจ"""
+        text, ok = QInputDialog.getText(self, "ตรวจสอบ SHA-256", f"SHA-256 ที่ควรได้ของ {os.path.basename(item.path)}:",
+                                        text=item.expected_hash)
+        if ok and text.strip() and not DownloadVerifier.shared().set_expected(item, text):
+            QMessageBox.warning(self, "ตรวจสอบ SHA-256", "ค่าที่ใส่ไม่ใช่ SHA-256")
+
+    def clear_finished(self):
+        """ลบรายการที่จบแล้วออกจากแผง"""
+        self.manager.remove_finished()
+        self.rebuild()
+
+class ContentDarkMode:
+    """โหมดกลางคืนของเนื้อหาเว็บ: สคริปต์ที่ฉีดตอนสร้างเอกสารในทุก profile
+    และสลับหน้าที่เปิดอยู่ด้วยการเรียกฟังก์ชันเดียวต่อหน้าโดยไม่ต้องโหลดใหม่"""
+
+    _shared = None
+
+    SCRIPT_NAME = 'unique_dark_mode'
+
+    # กลับสีทั้งหน้าแล้วกลับสีรูปและวิดีโออีกครั้งให้เป็นสีจริง ข้ามหน้าที่มืดอยู่แล้ว
+    # ทำงานใน ApplicationWorld หน้าเว็บจึงมองไม่เห็นหรือแก้ฟังก์ชัน __uniqueDarkMode ไม่ได้
+    SCRIPT = """
+    (function(enabled) {
+        var CSS = 'html { filter: invert(0.9) hue-rotate(180deg) !important; background: #fff !important; }' +
+                  'img, video, picture, canvas, embed, object, [style*="background-image"] ' +
+                  '{ filter: invert(1) hue-rotate(180deg) !important; }';
+        var style = null;
+        var skipped = false;
+
+        function install() {
+            var root = document.documentElement;
+            if (!root) {
+                new MutationObserver(function(records, observer) {
+                    if (document.documentElement) {
+                        observer.disconnect();
+                        install();
+                    }
+                }).observe(document, {childList: true});
+                return;
+            }
+            if (!style) {
+                style = document.createElement('style');
+                style.textContent = CSS;
+            }
+            style.disabled = false;
+            if (style.parentNode !== root) root.appendChild(style);
+        }
+
+        function alreadyDark() {
+            var nodes = [document.body, document.documentElement];
+            for (var i = 0; i < nodes.length; i++) {
+                if (!nodes[i]) continue;
+                var color = getComputedStyle(nodes[i]).backgroundColor.match(/[\\d.]+/g);
+                if (!color || (color.length > 3 && +color[3] === 0)) continue;
+                return (0.2126 * color[0] + 0.7152 * color[1] + 0.0722 * color[2]) < 100;
+            }
+            return false;
+        }
+
+        window.__uniqueDarkMode = function(on) {
+            enabled = on;
+            if (on && !skipped) install();
+            else if (style) style.disabled = true;
+        };
+
+        // ตรวจสีพื้นเมื่อโหลดโครงหน้าเสร็จ (ปิดสไตล์ชั่วคราวใน task เดียว จึงไม่มีการวาดหน้าที่กะพริบ)
+        document.addEventListener('DOMContentLoaded', function() {
+            var active = style && !style.disabled;
+            if (style) style.disabled = true;
+            skipped = alreadyDark();
+            if (style) style.disabled = !active || skipped;
+        });
+
+        window.__uniqueDarkMode(enabled);
+    })(%s);
+    """
+
+    def __init__(self):
+        self.enabled = False
+        # id ของหน้า -> หน้าที่เปิดอยู่ (เอาออกเมื่อหน้าถูกทำลาย)
+        self.pages = {}
+        self.profiles = {}
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการโหมดกลางคืนของเนื้อหาเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def script(self):
+        """สคริปต์ที่ฉีดตอนสร้างเอกสาร (สถานะปัจจุบันฝังอยู่ในสคริปต์ เอกสารใหม่จึงเริ่มด้วยสีที่ถูกต้อง)"""
+        script = QWebEngineScript()
+        script.setName(self.SCRIPT_NAME)
+        script.setSourceCode(self.SCRIPT % json.dumps(self.enabled))
+        script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+        script.setWorldId(QWebEngineScript.ApplicationWorld)
+        # เฟรมย่อยถูกกลับสีไปพร้อมหน้าหลักแล้ว
+        script.setRunsOnSubFrames(False)
+        return script
+
+    def install(self, profile):
+        """แทนสคริปต์เดิมใน profile ด้วยสคริปต์ของสถานะปัจจุบัน"""
+        scripts = profile.scripts()
+        for script in scripts.findScripts(self.SCRIPT_NAME):
+            scripts.remove(script)
+        scripts.insert(self.script())
+
+    def attach(self, page):
+        """ติดตามหน้าและติดตั้งสคริปต์ใน profile ของหน้า (ครั้งเดียวต่อ profile)"""
+        key = id(page)
+        if key in self.pages:
+            return
+        self.pages[key] = page
+        page.destroyed.connect(lambda *args, key=key: self.pages.pop(key, None))
+        profile = page.profile()
+        profile_key = id(profile)
+        if profile_key not in self.profiles:
+            self.profiles[profile_key] = profile
+            profile.destroyed.connect(lambda *args, key=profile_key: self.profiles.pop(key, None))
+            self.install(profile)
+        if self.enabled:
+            page.setBackgroundColor(QColor(30, 30, 30))
+
+    def set_enabled(self, enabled):
+        """สลับโหมดกลางคืนของทุกหน้าทันที โดยไม่ต้องโหลดหน้าใหม่"""
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        for profile in self.profiles.values():
+            self.install(profile)
+        message = f"window.__uniqueDarkMode && window.__uniqueDarkMode({json.dumps(enabled)})"
+        background = QColor(30, 30, 30) if enabled else QColor(Qt.white)
+        for page in self.pages.values():
+            page.setBackgroundColor(background)
+            page.runJavaScript(message, QWebEngineScript.ApplicationWorld)
+
+class ThemeEngine:
+    """ธีมของโปรแกรม: คอมไพล์แต่ละธีมครั้งเดียวเป็น stylesheet ระดับแอปพลิเคชันและ palette แล้วเก็บไว้
+    การสลับธีมจึงเป็นการตั้งค่าที่ QApplication ครั้งเดียว ไม่ต้องไล่ตั้ง stylesheet ทีละแท็บหรือทีละ widget"""
+
+    _shared = None
+
+    # สีของแต่ละธีม (ธีมที่ไม่มีสีใช้ palette มาตรฐานของ style และไม่มี stylesheet)
+    THEMES = {
+        'light': None,
+        'dark': {
+            'window': (53, 53, 53),
+            'base': (25, 25, 25),
+            'text': (255, 255, 255),
+            'highlight': (42, 130, 218),
+            'highlighted_text': (0, 0, 0),
+            'bright_text': (255, 0, 0),
+            'panel': '#333333',
+            'tab': '#444444',
+            'tab_selected': '#666666',
+            'input': '#444444',
+            'border': '#555555'
+        }
+    }
+
+    STYLESHEET = """
+        QStatusBar {{ background-color: {panel}; color: white; }}
+        QTabWidget::pane {{ border: none; }}
+        QTabBar::tab {{ background-color: {tab}; color: white; padding: 8px; }}
+        QTabBar::tab:selected {{ background-color: {tab_selected}; }}
+        QLineEdit {{ background-color: {input}; color: white; border: 1px solid {border}; }}
+        QWebEngineView {{ background-color: {panel}; }}
+    """
+
+    def __init__(self):
+        # ชื่อธีม -> (stylesheet, palette)
+        self.cache = {}
+        self.current = None
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการธีมเดียวที่ทุกหน้าต่างใช้ร่วมกัน (ธีมตั้งที่ระดับแอปพลิเคชัน)"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def compile(self, name):
+        """stylesheet และ palette ของธีม (สร้างครั้งแรกครั้งเดียวแล้วใช้ซ้ำ)"""
+        compiled = self.cache.get(name)
+        if compiled is None:
+            compiled = self.cache[name] = self.build(self.THEMES[name])
+        return compiled
+
+    def build(self, colors):
+        if colors is None:
+            return "", QApplication.style().standardPalette()
+        palette = QPalette()
+        roles = [
+            (QPalette.Window, 'window'), (QPalette.WindowText, 'text'), (QPalette.Base, 'base'),
+            (QPalette.AlternateBase, 'window'), (QPalette.ToolTipBase, 'text'), (QPalette.ToolTipText, 'text'),
+            (QPalette.Text, 'text'), (QPalette.Button, 'window'), (QPalette.ButtonText, 'text'),
+            (QPalette.BrightText, 'bright_text'), (QPalette.Link, 'highlight'), (QPalette.Highlight, 'highlight'),
+            (QPalette.HighlightedText, 'highlighted_text')
+        ]
+        for role, key in roles:
+            palette.setColor(role, QColor(*colors[key]))
+        return self.STYLESHEET.format(**colors), palette
+
+    def apply(self, name):
+        """ใช้ธีมกับทั้งแอปพลิเคชัน (ไม่ทำอะไรถ้าเป็นธีมเดิม)"""
+        if name == self.current:
+            return
+        stylesheet, palette = self.compile(name)
+        app = QApplication.instance()
+        app.setPalette(palette)
+        app.setStyleSheet(stylesheet)
+        self.current = name
+
+class SiteZoom(QObject):
+    """จำระดับซูมต่อโฮสต์: map ในหน่วยความจำที่ใช้ตอน urlChanged ก่อนหน้าใหม่วาดครั้งแรก
+    การซูมมีผลกับทุกแท็บของโฮสต์เดียวกัน และบันทึกลงไฟล์แบบหน่วงเวลา"""
 
-    def createWindow(self, window_type):
-        """เมธอดที่ถูกเรียกเมื่อต้องการเปิดหน้าต่างใหม่"""
+    _shared = None
+
+    # รอให้หยุดกดซูมก่อนเขียนไฟล์ (มิลลิวินาที)
+    SAVE_DELAY = 2000
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "site_zoom.json"
+        )
+        # ระดับซูมของหน้าที่ไม่ได้ตั้งไว้ (settings['zoom_level'])
+        self.default = 1.0
+        self.levels = self.load()
+        # id ของ view -> (view, เป็นแท็บส่วนตัวหรือไม่)
+        self.views = {}
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(self.SAVE_DELAY)
+        self.save_timer.timeout.connect(self.save)
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจำระดับซูมเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @staticmethod
+    def host(url):
+        return url.host().lower()
+
+    def level(self, url):
+        """ระดับซูมของโฮสต์ของ url"""
+        return self.levels.get(self.host(url), self.default)
+
+    def attach(self, view, private=False):
+        """ติดตาม view และใช้ระดับซูมของโฮสต์ทุกครั้งที่ URL เปลี่ยน"""
+        key = id(view)
+        self.views[key] = (view, private)
+        view.destroyed.connect(lambda *args, key=key: self.views.pop(key, None))
+        view.urlChanged.connect(lambda url, view=view: self.apply(view, url))
+
+    def apply(self, view, url):
+        factor = self.level(url)
+        if abs(view.zoomFactor() - factor) > 0.001:
+            view.setZoomFactor(factor)
+
+    def set(self, view, factor):
+        """ตั้งระดับซูมของโฮสต์ของ view และทุกแท็บของโฮสต์เดียวกัน (แท็บส่วนตัวไม่ถูกจำ)"""
+        factor = round(factor, 2)
+        _, private = self.views.get(id(view), (view, False))
+        host = self.host(view.url())
+        if private or not host:
+            view.setZoomFactor(factor)
+            return factor
+        if abs(factor - self.default) < 0.001:
+            self.levels.pop(host, None)
+        else:
+            self.levels[host] = factor
+        for other, other_private in self.views.values():
+            if not other_private and self.host(other.url()) == host:
+                other.setZoomFactor(factor)
+        self.save_timer.start()
+        return factor
+
+    def load(self):
         try:
-            print(f"Creating new window of type: {window_type}")
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return {host: float(factor) for host, factor in json.load(f).items()}
+        except (OSError, ValueError, AttributeError, TypeError):
+            return {}
+
+    def save(self):
+        """บันทึก map ลงไฟล์ (เรียกจากตัวจับเวลา หรือก่อนปิดโปรแกรมถ้ายังมีค่าที่รอบันทึก)"""
+        self.save_timer.stop()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.levels, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Error saving site zoom: {e}")
+
+class FindBar(QToolBar):
+    """แถบค้นหาในหน้าแบบไม่บล็อก: ค้นหาขณะพิมพ์ (หน่วงไว้หนึ่งเฟรม) และแสดง "n จาก m"
+    จากผลแบบ asynchronous ของ findText (WebEngine ทิ้งผลของคำค้นเก่าเองเมื่อมีคำค้นใหม่)"""
+
+    # ช่วงหน่วงระหว่างพิมพ์ (มิลลิวินาที, ประมาณหนึ่งเฟรมที่ 60 Hz)
+    FRAME_MS = 16
+
+    def __init__(self, browser_window):
+        super().__init__("ค้นหาในหน้า", browser_window)
+        self.setObjectName("find_bar")
+        self.setMovable(False)
+        self.browser_window = browser_window
+        # หน้าที่กำลังค้นหาอยู่ (รับ findTextFinished จากหน้านี้)
+        self.page = None
+
+        self.field = QLineEdit()
+        self.field.setPlaceholderText("ค้นหาในหน้า")
+        self.field.setMaximumWidth(300)
+        self.field.textEdited.connect(self.schedule)
+        self.field.returnPressed.connect(self.find_next)
+        self.addWidget(self.field)
+        # ใช้เฉพาะตอนช่องค้นหามีโฟกัส ไม่แย่ง Esc และ Shift+Enter จากหน้าเว็บหรือแถบที่อยู่
+        for key, slot in ((QKeySequence("Shift+Return"), self.find_previous),
+                          (QKeySequence(Qt.Key_Escape), self.close_bar)):
+            QShortcut(key, self.field, slot).setContext(Qt.WidgetShortcut)
+
+        self.addAction("▲", self.find_previous).setToolTip("ก่อนหน้า (Shift+Enter)")
+        self.addAction("▼", self.find_next).setToolTip("ถัดไป (Enter)")
+        self.case_box = QCheckBox("ตรงตัวพิมพ์")
+        self.case_box.toggled.connect(self.schedule)
+        self.addWidget(self.case_box)
+        self.count_label = QLabel()
+        self.count_label.setContentsMargins(8, 0, 8, 0)
+        self.addWidget(self.count_label)
+        self.addAction("✕", self.close_bar).setToolTip("ปิด (Esc)")
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.FRAME_MS)
+        self.timer.timeout.connect(self.search)
+
+    def open(self):
+        """แสดงแถบและเลือกคำค้นเดิมไว้ให้พิมพ์ทับ"""
+        self.show()
+        self.field.setFocus()
+        self.field.selectAll()
+        if self.field.text():
+            self.schedule()
+
+    def schedule(self, *args):
+        """เริ่มนับหน่วงใหม่ทุกครั้งที่พิมพ์ จึงค้นหาเพียงครั้งเดียวต่อเฟรม"""
+        self.timer.start()
+
+    def find_next(self):
+        self.timer.stop()
+        self.search()
+
+    def find_previous(self):
+        self.timer.stop()
+        self.search(backward=True)
+
+    def search(self, backward=False):
+        """ส่งคำค้นให้หน้าปัจจุบัน (ไม่รอผล ผลมาทาง findTextFinished หรือ callback)"""
+        browser = self.browser_window.current_browser()
+        if not browser:
+            return
+        self.bind(browser.page())
+        text = self.field.text()
+        if not text:
+            self.page.findText("")
+            self.count_label.clear()
+            return
+        flags = QWebEnginePage.FindFlags()
+        if backward:
+            flags |= QWebEnginePage.FindBackward
+        if self.case_box.isChecked():
+            flags |= QWebEnginePage.FindCaseSensitively
+        self.page.findText(text, flags, self.found)
+
+    def bind(self, page):
+        """รับผลการค้นหาจากหน้าใหม่ และล้างไฮไลต์ของหน้าเดิม"""
+        if page is self.page:
+            return
+        self.unbind()
+        self.page = page
+        # findTextFinished มีตั้งแต่ Qt 5.14 (รุ่นก่อนหน้าได้แค่ว่าพบหรือไม่จาก callback)
+        if hasattr(page, 'findTextFinished'):
+            page.findTextFinished.connect(self.show_result)
+
+    def unbind(self):
+        if self.page is None:
+            return
+        try:
+            if hasattr(self.page, 'findTextFinished'):
+                self.page.findTextFinished.disconnect(self.show_result)
+            self.page.findText("")
+        except (TypeError, RuntimeError):
+            # หน้าถูกปิดไปแล้ว
+            pass
+        self.page = None
 
-            # ตรวจสอบประเภทของหน้าต่าง
-            if window_type == QWebEnginePage.WebBrowserWindow:
-                # เปิดในหน้าต่างใหม่
-                new_browser = UniqueBrowser()
-                new_browser.show()
-                # คืนค่า page ของแท็บแรกในหน้าต่างใหม่
-                return new_browser.current_browser().page()
+    def found(self, found):
+        if not found:
+            self.count_label.setText("ไม่พบ")
+        elif not hasattr(self.page, 'findTextFinished'):
+            self.count_label.setText("พบ")
+
+    def show_result(self, result):
+        """แสดงลำดับของคำที่เลือกและจำนวนที่พบทั้งหมด"""
+        if not self.field.text():
+            return
+        matches = result.numberOfMatches()
+        if matches:
+            self.count_label.setText(f"{result.activeMatch()} จาก {matches}")
+        else:
+            self.count_label.setText("ไม่พบ")
+
+    def tab_changed(self):
+        """เปลี่ยนแท็บขณะเปิดแถบ: ค้นหาคำเดิมในแท็บใหม่"""
+        if self.isVisible():
+            self.schedule()
+
+    def close_bar(self):
+        """ปิดแถบและล้างไฮไลต์"""
+        self.timer.stop()
+        self.unbind()
+        self.count_label.clear()
+        self.hide()
+        browser = self.browser_window.current_browser()
+        if browser:
+            browser.setFocus()
+
+class UserScript:
+    """สคริปต์ผู้ใช้หนึ่งไฟล์แบบ Greasemonkey: metadata, รูปแบบ URL ที่คอมไพล์แล้ว และเวลาที่ใช้รัน"""
+
+    METADATA = re.compile(r'//\s*==UserScript==(.*?)//\s*==/UserScript==', re.DOTALL)
+    META_LINE = re.compile(r'//\s*@([\w:-]+)(?:[ \t]+(.*?))?\s*$', re.MULTILINE)
+    MATCH_PATTERN = re.compile(r'^(\*|https?|file|ftp)://([^/]*)(/.*)$')
+    URL_PREFIX = re.compile(r'^[a-z*]+://([^/*]*\*?[^/*]*)(?:/|$)', re.IGNORECASE)
+
+    RUN_AT = {
+        'document-start': QWebEngineScript.DocumentCreation,
+        'document-end': QWebEngineScript.DocumentReady,
+        'document-idle': QWebEngineScript.Deferred
+    }
+
+    # ครอบสคริปต์: ตรวจ URL ของเฟรมอีกครั้ง จับเวลา แล้วส่งเวลาออกทาง console ให้ CustomWebEnginePage
+    WRAPPER = """
+    (function() {
+        var href = location.href;
+        var test = function(pattern) { return new RegExp(pattern).test(href); };
+        if (!%(includes)s.some(test) || %(excludes)s.some(test)) return;
+        var GM_info = {script: {name: %(name)s}};
+        var GM_addStyle = function(css) {
+            var style = document.createElement('style');
+            style.textContent = css;
+            (document.head || document.documentElement).appendChild(style);
+            return style;
+        };
+        var start = performance.now();
+        try {
+%(source)s
+        } catch (error) {
+            console.error('[userscript] ' + GM_info.script.name + ': ' + error);
+        }
+        console.debug(%(prefix)s + JSON.stringify([%(key)s, performance.now() - start]));
+    })();
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.key = os.path.basename(path)
+        self.source = source
+        meta = self.METADATA.search(source)
+        values = {}
+        for name, value in self.META_LINE.findall(meta.group(1) if meta else ''):
+            values.setdefault(name, []).append((value or '').strip())
+        self.name = (values.get('name') or [self.key])[0]
+        self.run_at = self.RUN_AT.get((values.get('run-at') or ['document-end'])[0], QWebEngineScript.DocumentReady)
+        self.noframes = 'noframes' in values
+        # (ชนิด, โฮสต์) สำหรับดัชนี: exact, suffix (โดเมนและโดเมนย่อย) หรือ any
+        self.hosts = []
+        self.includes = []
+        for pattern in values.get('match', []):
+            self.add_match(pattern)
+        for pattern in values.get('include', []):
+            self.add_include(pattern)
+        if not self.includes:
+            # ไม่ระบุรูปแบบใดเลย: ทำงานทุกหน้า เหมือน Greasemonkey
+            self.add_include('*')
+        self.excludes = [self.match_regex(pattern) for pattern in values.get('exclude-match', [])
+                         if self.MATCH_PATTERN.match(pattern)]
+        self.excludes += [self.glob_regex(pattern) for pattern in values.get('exclude', [])]
+        self.compiled_includes = [re.compile(pattern) for pattern in self.includes]
+        self.compiled_excludes = [re.compile(pattern) for pattern in self.excludes]
+        self.runs = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.script = None
+
+    def add_match(self, pattern):
+        """@match แบบ Chrome: scheme://host/path (host เป็น *, *.domain หรือชื่อเต็ม)"""
+        if pattern == '<all_urls>':
+            self.hosts.append(('any', ''))
+            self.includes.append(r'^(?:https?|file|ftp)://')
+            return
+        if not self.MATCH_PATTERN.match(pattern):
+            print(f"Error in user script {self.key}: bad @match {pattern}")
+            return
+        self.hosts.append(self.host_key(self.MATCH_PATTERN.match(pattern).group(2).lower()))
+        self.includes.append(self.match_regex(pattern))
+
+    def add_include(self, pattern):
+        """@include แบบ glob หรือ /regex/ (regex ไม่บอกโฮสต์ จึงต้องตรวจทุกหน้า)"""
+        prefix = None if self.is_regex(pattern) else self.URL_PREFIX.match(pattern)
+        self.hosts.append(self.host_key(prefix.group(1).lower()) if prefix else ('any', ''))
+        self.includes.append(self.glob_regex(pattern))
+
+    @staticmethod
+    def host_key(host):
+        host = host.split(':')[0]
+        if not host or host == '*' or '*' in host.lstrip('*.'):
+            return ('any', '')
+        if host.startswith('*.'):
+            return ('suffix', host[2:])
+        if host.startswith('*'):
+            return ('any', '')
+        return ('exact', host)
+
+    @classmethod
+    def match_regex(cls, pattern):
+        """แปลง match pattern เป็น regex (ใช้ได้ทั้ง Python และ JavaScript)"""
+        scheme, host, path = cls.MATCH_PATTERN.match(pattern).groups()
+        scheme = 'https?' if scheme == '*' else re.escape(scheme)
+        if host == '*':
+            host = '[^/]*'
+        elif host.startswith('*.'):
+            host = r'(?:[^/]*\.)?' + re.escape(host[2:])
+        else:
+            host = re.escape(host)
+        path = '.*'.join(re.escape(part) for part in path.split('*'))
+        return f"^{scheme}://{host}(?::\\d+)?{path}$"
+
+    @staticmethod
+    def is_regex(pattern):
+        return len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/')
+
+    @classmethod
+    def glob_regex(cls, pattern):
+        if cls.is_regex(pattern):
+            return pattern[1:-1]
+        return '^' + '.*'.join(re.escape(part) for part in pattern.split('*')) + '$'
+
+    def matches(self, url):
+        return (any(regex.search(url) for regex in self.compiled_includes)
+                and not any(regex.search(url) for regex in self.compiled_excludes))
+
+    def web_script(self):
+        """QWebEngineScript ของสคริปต์นี้ (สร้างครั้งเดียวแล้วใช้ซ้ำทุกหน้า)"""
+        if self.script is None:
+            self.script = QWebEngineScript()
+            self.script.setName(UserScriptEngine.SCRIPT_PREFIX + self.key)
+            self.script.setSourceCode(self.WRAPPER % {
+                'includes': json.dumps(self.includes),
+                'excludes': json.dumps(self.excludes),
+                'name': json.dumps(self.name),
+                'key': json.dumps(self.key),
+                'prefix': json.dumps(UserScriptEngine.TIMING_PREFIX),
+                'source': self.source
+            })
+            self.script.setInjectionPoint(self.run_at)
+            self.script.setWorldId(QWebEngineScript.UserWorld)
+            self.script.setRunsOnSubFrames(not self.noframes)
+        return self.script
+
+    def record(self, elapsed):
+        self.runs += 1
+        self.total_ms += elapsed
+        self.max_ms = max(self.max_ms, elapsed)
+
+class UserScriptEngine:
+    """โหลดสคริปต์ผู้ใช้ (*.user.js) ทำดัชนีตามโฮสต์ และติดตั้งเฉพาะสคริปต์ที่ตรงกับหน้าลงในหน้านั้นตอนนำทาง
+    หน้าของโฮสต์ที่ไม่มีสคริปต์ใช้แค่การค้นดัชนี ไม่มีสคริปต์ใดถูกฉีด"""
+
+    _shared = None
+
+    SCRIPT_PREFIX = 'userscript:'
+    TIMING_PREFIX = 'unique-userscript-timing:'
+
+    def __init__(self, directory=None):
+        self.directory = directory or self.scripts_dir()
+        self.scripts = []
+        self.by_key = {}
+        self.exact = {}
+        self.suffix = {}
+        self.anywhere = []
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการสคริปต์ผู้ใช้เดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+            cls._shared.load()
+        return cls._shared
+
+    @staticmethod
+    def scripts_dir():
+        """โฟลเดอร์ที่เก็บสคริปต์ผู้ใช้ (*.user.js)"""
+        return os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "userscripts"
+        )
+
+    def load(self):
+        """อ่านทุกไฟล์ *.user.js ในโฟลเดอร์และสร้างดัชนีใหม่"""
+        scripts = []
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.user.js'))
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    scripts.append(UserScript(path, f.read()))
+            except (OSError, UnicodeDecodeError, re.error) as e:
+                print(f"Error loading user script {name}: {e}")
+        self.index(scripts)
+        return len(scripts)
+
+    def index(self, scripts):
+        """ดัชนีโฮสต์ -> สคริปต์ (ชื่อเต็ม, โดเมนพร้อมโดเมนย่อย และสคริปต์ที่ทำงานทุกโฮสต์)"""
+        self.scripts = scripts
+        self.by_key = {script.key: script for script in scripts}
+        self.exact, self.suffix, self.anywhere = {}, {}, []
+        for script in scripts:
+            for kind, host in dict.fromkeys(script.hosts):
+                if kind == 'exact':
+                    self.exact.setdefault(host, []).append(script)
+                elif kind == 'suffix':
+                    self.suffix.setdefault(host, []).append(script)
+                elif script not in self.anywhere:
+                    self.anywhere.append(script)
+
+    def scripts_for(self, url):
+        """สคริปต์ที่ตรงกับ url ตามลำดับชื่อไฟล์ (ตรวจ regex เฉพาะสคริปต์ที่ดัชนีโฮสต์เลือกมา)"""
+        host = url.host().lower()
+        candidates = list(self.anywhere)
+        candidates += self.exact.get(host, ())
+        labels = host.split('.')
+        for i in range(len(labels)):
+            candidates += self.suffix.get('.'.join(labels[i:]), ())
+        if not candidates:
+            return []
+        href = url.toString()
+        matched = {script.key: script for script in candidates if script.matches(href)}
+        return [matched[key] for key in sorted(matched)]
+
+    def prepare(self, page, url):
+        """ก่อนสร้างเอกสาร main frame ใหม่: ให้สคริปต์ของหน้าตรงกับ url (ไม่แตะ collection ถ้าเป็นชุดเดิม)"""
+        scripts = self.scripts_for(url)
+        installed = getattr(page, 'user_scripts', [])
+        if scripts == installed:
+            return
+        collection = page.scripts()
+        for script in installed:
+            for web_script in collection.findScripts(self.SCRIPT_PREFIX + script.key):
+                collection.remove(web_script)
+        for script in scripts:
+            collection.insert(script.web_script())
+        page.user_scripts = scripts
+
+    def record(self, message):
+        """รับเวลาที่สคริปต์ใช้จากข้อความ console ของ wrapper คืนค่า False ถ้าไม่ใช่ข้อความจับเวลา"""
+        if not message.startswith(self.TIMING_PREFIX):
+            return False
+        try:
+            key, elapsed = json.loads(message[len(self.TIMING_PREFIX):])
+            script = self.by_key.get(key)
+            if script is not None:
+                script.record(float(elapsed))
+        except (ValueError, TypeError):
+            pass
+        return True
+
+    def stats_text(self):
+        """สรุปสคริปต์ จำนวนครั้งที่รัน และเวลาเฉลี่ย/สูงสุด"""
+        if not self.scripts:
+            return f"ยังไม่มีสคริปต์ผู้ใช้ (วางไฟล์ *.user.js ไว้ที่ {self.directory})"
+        lines = []
+        for script in self.scripts:
+            average = script.total_ms / script.runs if script.runs else 0.0
+            lines.append(f"{script.name}: รัน {script.runs} ครั้ง, เฉลี่ย {average:.1f} ms, สูงสุด {script.max_ms:.1f} ms")
+        return "\n".join(lines)
+
+# ปลั๊กอิน Python (*.py ในโฟลเดอร์ plugins) ที่ลงทะเบียน hook ด้วยชื่อฟังก์ชันระดับโมดูล
+class Plugin:
+    """ปลั๊กอินหนึ่งไฟล์: hook ที่ประกาศไว้ (อ่านจากซอร์สโดยไม่ import) โมดูลที่โหลดเมื่อต้องใช้ และเวลาของแต่ละ hook"""
+
+    def __init__(self, name, path, hooks, description=''):
+        self.name = name
+        self.path = path
+        self.hooks = hooks
+        self.description = description
+        self.module = None
+        self.load_ms = 0.0
+        # เหตุผลที่ถูกปิด ('' = ยังใช้งานได้)
+        self.disabled = ''
+        # hook -> [จำนวนครั้ง, เวลารวม ms, เวลาสูงสุด ms, จำนวนครั้งที่เกินงบ]
+        self.stats = {hook: [0, 0.0, 0.0, 0] for hook in hooks}
+
+class PluginManager(QObject):
+    """โหลดปลั๊กอินเมื่อเกิดเหตุการณ์แรกที่ปลั๊กอินนั้นรอ (ยกเว้นปลั๊กอินที่มี on_request ซึ่งโหลดบน UI thread ทันทีที่เปิดใช้)
+    จับเวลาทุกครั้งที่เรียก hook และปิดปลั๊กอินที่ใช้เวลาเกินงบซ้ำหลายครั้ง เพื่อไม่ให้ปลั๊กอินตัวเดียวทำให้การท่องเว็บช้า"""
+
+    # ปลั๊กอินถูกปิด (ชื่อ, เหตุผล) - อาจส่งจาก IO thread ของ WebEngine
+    disabled = pyqtSignal(str, str)
+
+    _shared = None
+
+    # เหตุการณ์ -> ชื่อฟังก์ชันในโมดูลปลั๊กอิน
+    HOOKS = {
+        'navigation': 'on_navigation',
+        'load_finished': 'on_load_finished',
+        'request': 'on_request',
+        'context_menu': 'on_context_menu'
+    }
+
+    # งบเวลาต่อการเรียกหนึ่งครั้ง (ms) - on_request รันกับทุกคำขอบน IO thread จึงได้งบน้อยที่สุด
+    BUDGET_MS = {
+        'navigation': 10.0,
+        'load_finished': 50.0,
+        'request': 2.0,
+        'context_menu': 20.0
+    }
+
+    # เกินงบได้กี่ครั้งก่อนถูกปิด (ครั้งเดียวอาจเป็นแค่ GC หรือเครื่องไม่ว่าง)
+    MAX_OVERRUNS = 3
+
+    def __init__(self, directory=None, parent=None):
+        super().__init__(parent)
+        self.directory = directory or self.plugins_dir()
+        self.plugins = {}
+        self.enabled = set()
+        # เหตุการณ์ -> ปลั๊กอินที่เปิดอยู่และมี hook นั้น (สร้าง list ใหม่ทุกครั้งที่เปลี่ยน จึงอ่านจากหลาย thread ได้)
+        self.active = {hook: [] for hook in self.HOOKS}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """คืนค่าตัวจัดการปลั๊กอินเดียวที่ทุกหน้าต่างใช้ร่วมกัน"""
+        if cls._shared is None:
+            cls._shared = cls()
+            cls._shared.discover()
+        return cls._shared
+
+    @staticmethod
+    def plugins_dir():
+        """โฟลเดอร์ที่เก็บปลั๊กอิน (*.py)"""
+        return os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.AppDataLocation),
+            "UniqueBrowser",
+            "plugins"
+        )
+
+    def discover(self):
+        """หาปลั๊กอินในโฟลเดอร์และ hook ที่แต่ละตัวประกาศ โดยอ่าน AST ของซอร์ส (ยังไม่รันโค้ดของปลั๊กอิน)"""
+        plugins = {}
+        try:
+            names = sorted(name for name in os.listdir(self.directory)
+                           if name.endswith('.py') and not name.startswith('_'))
+        except OSError:
+            names = []
+        functions = {function: hook for hook, function in self.HOOKS.items()}
+        for filename in names:
+            name = filename[:-3]
+            path = os.path.join(self.directory, filename)
+            previous = self.plugins.get(name)
+            if previous is not None and previous.module is not None:
+                # โหลดแล้ว ใช้ตัวเดิม (Python ไม่สามารถ unload โมดูลได้อย่างปลอดภัย)
+                plugins[name] = previous
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    tree = ast.parse(f.read(), filename)
+            except (OSError, SyntaxError, ValueError) as e:
+                print(f"Error reading plugin {filename}: {e}")
+                continue
+            hooks = [functions[node.name] for node in tree.body
+                     if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name in functions]
+            description = (ast.get_docstring(tree) or '').strip().split('\n')[0]
+            plugins[name] = Plugin(name, path, hooks, description)
+        self.plugins = plugins
+        self.rebuild()
+        self.preload()
+        return len(plugins)
+
+    def configure(self, enabled):
+        """ตั้งรายชื่อปลั๊กอินที่เปิดใช้ (settings['extensions'])"""
+        self.enabled = set(enabled or [])
+        self.rebuild()
+        self.preload()
+
+    def preload(self):
+        """import ปลั๊กอินที่มี on_request ทันที (เรียกจาก UI thread) เพื่อไม่ให้การ import ไปเกิดบน IO thread
+        ระหว่าง interceptRequest ซึ่งทุกคำขอต้องรอ"""
+        for plugin in self.active['request']:
+            if plugin.module is None:
+                self.load(plugin)
+
+    def rebuild(self):
+        with self.lock:
+            self.active = {
+                hook: [plugin for plugin in self.plugins.values()
+                       if hook in plugin.hooks and plugin.name in self.enabled and not plugin.disabled]
+                for hook in self.HOOKS
+            }
+
+    def has_hook(self, hook):
+        """มีปลั๊กอินที่รอเหตุการณ์นี้หรือไม่ (ใช้ตัดงานทั้งหมดในเส้นทางที่ถูกเรียกบ่อย)"""
+        return bool(self.active[hook])
+
+    def load(self, plugin):
+        """import โมดูลของปลั๊กอิน (ครั้งเดียว) คืนค่า False ถ้าโหลดไม่สำเร็จ"""
+        with self.lock:
+            if plugin.module is not None:
+                return True
+            if plugin.disabled:
+                return False
+            start = time.perf_counter()
+            try:
+                spec = importlib.util.spec_from_file_location(f"unique_browser_plugins.{plugin.name}", plugin.path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+            except Exception as e:
+                error = e
             else:
-                # สร้างแท็บใหม่และคืนค่า QWebEnginePage
-                if hasattr(self.main_browser, 'browser_window'):
-                    # ใช้เมธอดของคลาสหลักที่จะสร้างแท็บใหม่
-                    new_tab = self.main_browser.browser_window.add_new_tab()
-                    if new_tab:
-                        # คืนค่า page ไม่ใช่ view
-                        return new_tab.page()
-            return None
-        except Exception as e:
-            print(f"Error in CustomWebEnginePage.createWindow: {e}")
-            return None
+                plugin.module = module
+                plugin.load_ms = (time.perf_counter() - start) * 1000
+                print(f"Loaded plugin {plugin.name} in {plugin.load_ms:.1f} ms")
+                return True
+        self.disable(plugin, f"โหลดไม่สำเร็จ: {error}")
+        return False
+
+    def dispatch(self, hook, *args):
+        """เรียก hook ของทุกปลั๊กอินที่รอเหตุการณ์นี้ คืนค่า False ถ้ามีปลั๊กอินตัวใดคืนค่า False (เช่นยกเลิกการนำทาง)"""
+        allowed = True
+        budget = self.BUDGET_MS[hook]
+        for plugin in self.active[hook]:
+            if plugin.module is None and (hook == 'request' or not self.load(plugin)):
+                # ปลั๊กอิน on_request ถูก preload ตอนเปิดใช้ ถ้ายังไม่เสร็จก็ข้ามไปก่อน ไม่ import บน IO thread
+                continue
+            function = getattr(plugin.module, self.HOOKS[hook], None)
+            if function is None:
+                continue
+            start = time.perf_counter()
+            try:
+                result = function(*args)
+            except Exception as e:
+                self.disable(plugin, f"{self.HOOKS[hook]} ผิดพลาด: {e}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            if result is False:
+                allowed = False
+            stats = plugin.stats[hook]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            if elapsed > budget:
+                stats[3] += 1
+                if stats[3] >= self.MAX_OVERRUNS:
+                    self.disable(plugin, f"{self.HOOKS[hook]} ใช้เวลาเกิน {budget:g} ms "
+                                         f"{stats[3]} ครั้ง (ล่าสุด {elapsed:.1f} ms)")
+        return allowed
+
+    def disable(self, plugin, reason):
+        """ปิดปลั๊กอินและแจ้งเตือน (ปลั๊กอินจะไม่ถูกเรียกอีกจนกว่าผู้ใช้จะเปิดใหม่)"""
+        if plugin.disabled:
+            return
+        plugin.disabled = reason
+        self.rebuild()
+        print(f"Warning: plugin {plugin.name} disabled: {reason}")
+        self.disabled.emit(plugin.name, reason)
+
+    def set_enabled(self, name, enabled):
+        """เปิด/ปิดปลั๊กอินจากหน้ารายการ การเปิดใหม่ล้างสถานะถูกปิดและสถิติการเกินงบ"""
+        plugin = self.plugins.get(name)
+        if enabled:
+            self.enabled.add(name)
+            if plugin is not None:
+                plugin.disabled = ''
+                for stats in plugin.stats.values():
+                    stats[3] = 0
+        else:
+            self.enabled.discard(name)
+        self.rebuild()
+        self.preload()
+
+    def describe(self, plugin):
+        """สถานะและเวลาของปลั๊กอินสำหรับแสดงในรายการ"""
+        if plugin.disabled:
+            state = f"ถูกปิด: {plugin.disabled}"
+        elif plugin.name not in self.enabled:
+            state = "ไม่ได้เปิดใช้"
+        elif plugin.module is None:
+            state = "ยังไม่โหลด (โหลดเมื่อเกิดเหตุการณ์แรก)"
+        else:
+            state = f"โหลดแล้ว ({plugin.load_ms:.1f} ms)"
+        lines = [f"{plugin.name} — {plugin.description}" if plugin.description else plugin.name, state]
+        for hook in plugin.hooks:
+            calls, total, longest, overruns = plugin.stats[hook]
+            average = total / calls if calls else 0.0
+            lines.append(f"{self.HOOKS[hook]}: {calls} ครั้ง, เฉลี่ย {average:.2f} ms, "
+                         f"สูงสุด {longest:.2f} ms (งบ {self.BUDGET_MS[hook]:g} ms)")
+        return "\n".join(lines)
+
+class PluginsDialog(QDialog):
+    """รายการปลั๊กอิน: เปิด/ปิด สถานะการโหลด และเวลาที่แต่ละ hook ใช้"""
+
+    def __init__(self, manager, browser_window, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.browser_window = browser_window
+
+        self.setWindowTitle("ส่วนขยาย")
+        self.resize(560, 380)
+
+        layout = QVBoxLayout(self)
+        self.plugin_list = QListWidget()
+        self.plugin_list.itemChanged.connect(self.item_changed)
+        layout.addWidget(self.plugin_list)
+
+        buttons = QHBoxLayout()
+        refresh_button = QPushButton("ค้นหาปลั๊กอินใหม่")
+        refresh_button.clicked.connect(self.rescan)
+        buttons.addWidget(refresh_button)
+        folder_button = QPushButton("เปิดโฟลเดอร์ปลั๊กอิน")
+        folder_button.clicked.connect(self.open_folder)
+        buttons.addWidget(folder_button)
+        close_button = QPushButton("ปิด")
+        close_button.clicked.connect(self.accept)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        """สร้างรายการใหม่จากสถานะปัจจุบัน"""
+        self.plugin_list.blockSignals(True)
+        self.plugin_list.clear()
+        for plugin in self.manager.plugins.values():
+            item = QListWidgetItem(self.manager.describe(plugin))
+            item.setData(Qt.UserRole, plugin.name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            enabled = plugin.name in self.manager.enabled and not plugin.disabled
+            item.setCheckState(Qt.Checked if enabled else Qt.Unchecked)
+            self.plugin_list.addItem(item)
+        if not self.manager.plugins:
+            self.plugin_list.addItem(f"ยังไม่มีปลั๊กอิน (วางไฟล์ *.py ไว้ที่ {self.manager.directory})")
+        self.plugin_list.blockSignals(False)
+
+    def item_changed(self, item):
+        """เปิด/ปิดปลั๊กอินและบันทึกลง settings['extensions']"""
+        self.manager.set_enabled(item.data(Qt.UserRole), item.checkState() == Qt.Checked)
+        window = self.browser_window
+        window.settings['extensions'] = sorted(self.manager.enabled)
+        window.save_settings()
+        self.refresh()
+
+    def rescan(self):
+        self.manager.discover()
+        self.refresh()
+
+    def open_folder(self):
+        directory = self.manager.directory
+        os.makedirs(directory, exist_ok=True)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(directory))
 
 class UniqueBrowser(QMainWindow):
     def __init__(self):
@@ -60,9 +5891,55 @@ class UniqueBrowser(QMainWindow):
         self.version = "3.0"
         self.dark_mode = False
         self.private_mode = False
-        self.downloads = []
         self.extensions = []
 
+        # ดัชนีแท็บสำหรับค้นหาข้ามหน้าต่าง
+        self.tab_index = TabSearchIndex.shared()
+
+        # ตัวบล็อกโฆษณาและตัวติดตาม (ใช้ร่วมกันทุกหน้าต่าง)
+        self.content_blocker = RequestBlocker.shared()
+
+        # บันทึกคำขอเครือข่ายสำหรับส่งออกเป็น HAR (ใช้ร่วมกันทุกหน้าต่าง)
+        self.network_log = NetworkLog.shared()
+
+        # การตั้งค่า proxy (ใช้ร่วมกันทุกหน้าต่าง)
+        self.proxy_manager = ProxyManager.shared()
+
+        # คิวดาวน์โหลด และความคืบหน้ารวมที่อัพเดท 4 ครั้งต่อวินาที (ใช้ร่วมกันทุกหน้าต่าง)
+        self.download_manager = DownloadManager.shared()
+        self.download_progress = DownloadProgressAggregator.shared()
+        self.download_verifier = DownloadVerifier.shared()
+
+        # ธีมของโปรแกรม และโหมดกลางคืนของเนื้อหาเว็บ (ใช้ร่วมกันทุกหน้าต่าง)
+        self.theme = ThemeEngine.shared()
+        self.content_dark_mode = ContentDarkMode.shared()
+        self.dark_mode = self.theme.current == 'dark'
+
+        # ระดับซูมต่อโฮสต์ (ใช้ร่วมกันทุกหน้าต่าง)
+        self.site_zoom = SiteZoom.shared()
+
+        # สคริปต์ผู้ใช้ที่ทำดัชนีตามโฮสต์ (ใช้ร่วมกันทุกหน้าต่าง)
+        self.user_scripts = UserScriptEngine.shared()
+
+        # ปลั๊กอิน Python ที่โหลดเมื่อใช้ครั้งแรก (ใช้ร่วมกันทุกหน้าต่าง)
+        self.plugins = PluginManager.shared()
+        self.plugins.disabled.connect(self.plugin_disabled)
+
+        # ดัชนีคุกกี้ของ profile หลัก (ใช้ร่วมกันทุกหน้าต่าง)
+        self.cookie_manager = CookieManager.shared()
+
+        # นโยบายแคช HTTP ของทุก profile
+        self.cache_policy = HttpCachePolicy.shared()
+
+        # คลังหน้าเว็บสำหรับอ่านออฟไลน์ (ใช้ร่วมกันทุกหน้าต่าง)
+        self.offline_archive = OfflineArchive.shared()
+        self.offline_archive.saved.connect(self.archive_saved)
+        self.offline_archive.failed.connect(self.archive_failed)
+
+        # หน้าภายใน unique:// (ประวัติ ดาวน์โหลด ตั้งค่า ...)
+        self.internal_pages = InternalSchemeHandler.shared()
+        self.internal_pages.add_window(self)
+
         # ตรวจสอบระบบปฏิบัติการ
         self.is_linux = platform.system() == "Linux"
         self.is_wayland = self.check_wayland()
@@ -81,6 +5958,25 @@ class UniqueBrowser(QMainWindow):
 
         # โหลดการตั้งค่า
         self.load_settings()
+        # ต้องตั้งค่า proxy ก่อนเริ่มใช้ profile แรก
+        self.setup_proxy_config()
+        self.setup_content_blocking()
+        self.setup_network_log()
+        self.setup_http_cache()
+        self.setup_cookie_manager()
+        self.download_manager.configure(self.settings.get('downloads', {}), self.settings.get('download_location'))
+        self.download_manager.resume_pending()
+        self.site_zoom.default = self.settings.get('zoom_level', 1.0)
+        self.plugins.configure(self.settings.get('extensions', []))
+        self.offline_archive.concurrency = self.settings.get('archive_concurrency', 3)
+
+        # ตัวคาดเดาการนำทาง สำหรับ preconnect และ prerender ระหว่างพิมพ์ URL
+        self.predictor = NavigationPredictor(self)
+        self.predictor.load_history(self.settings.get('history', []))
+
+        # ตัวล้างข้อมูลการท่องเว็บ (สร้างหน้าต่างเมื่อเปิดใช้ครั้งแรก)
+        self.data_cleaner = BrowsingDataCleaner(self)
+        self.clear_data_dialog = None
 
         # สร้างระบบแท็บ
         self.setup_tabs()
@@ -152,6 +6048,43 @@ class UniqueBrowser(QMainWindow):
                 'extensions': []
             }
 
+    def setup_content_blocking(self):
+        """เปิดใช้งานตัวบล็อกโฆษณาตามการตั้งค่า และโหลดรายการตัวกรองครั้งแรก"""
+        try:
+            self.content_blocker.enabled = self.settings.get('content_blocking', True)
+            if self.content_blocker.enabled and not self.content_blocker.loaded:
+                self.content_blocker.load_filters()
+        except Exception as e:
+            print(f"Error setting up content blocking: {e}")
+
+    def setup_proxy_config(self):
+        """ติดตั้งการตั้งค่า proxy ตาม settings['proxy']"""
+        try:
+            self.proxy_manager.configure(self.settings.get('proxy', {}))
+            self.proxy_manager.apply()
+        except Exception as e:
+            print(f"Error setting up proxy: {e}")
+
+    def setup_http_cache(self):
+        """กำหนดนโยบายแคช HTTP ของ profile หลักก่อนเปิดแท็บแรก"""
+        try:
+            self.cache_policy.configure(self.settings.get('http_cache', {}))
+            self.cache_policy.apply(QWebEngineProfile.defaultProfile())
+        except Exception as e:
+            print(f"Error setting up HTTP cache: {e}")
+
+    def setup_cookie_manager(self):
+        """เริ่มติดตามคุกกี้ของ profile หลัก"""
+        try:
+            self.cookie_manager.attach(QWebEngineProfile.defaultProfile().cookieStore())
+        except Exception as e:
+            print(f"Error setting up cookie manager: {e}")
+
+    def setup_network_log(self):
+        """ตั้งค่าการบันทึกคำขอเครือข่ายตามการตั้งค่า"""
+        self.network_log.enabled = self.settings.get('network_log', True)
+        self.network_log.set_capacity(self.settings.get('network_log_size', 5000))
+
     def save_settings(self):
         """บันทึกการตั้งค่า"""
         with open(self.settings_file, 'w', encoding='utf-8') as f:
@@ -166,11 +6099,101 @@ class UniqueBrowser(QMainWindow):
         self.tabs.currentChanged.connect(self.tab_changed)
         self.setCentralWidget(self.tabs)
 
+        # แถบแท็บแนวตั้ง (ทางเลือก)
+        self.setup_tab_tree()
+
+        # เมนูคลิกขวาที่แถบแท็บ
+        self.tabs.tabBar().setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tabs.tabBar().customContextMenuRequested.connect(self.show_tab_bar_menu)
+
+        # ระบบลดการทำงานของแท็บพื้นหลัง
+        self.throttler = TabThrottler(self)
+
+        # คิวคืนทรัพยากรของแท็บที่ปิด และรายการแท็บที่ปิดล่าสุด
+        self.teardown_queue = TabTeardownQueue()
+        self.closed_tabs = deque(maxlen=self.settings.get('recently_closed_limit', 25))
+
+    def setup_tab_tree(self):
+        """ตั้งค่าแถบแท็บแนวตั้งแบบต้นไม้"""
+        self.tab_tree = TabTreeModel(self)
+
+        # QTreeView วาดเฉพาะแถวที่มองเห็น จึงรองรับแท็บจำนวนมากได้
+        self.tab_tree_view = QTreeView()
+        self.tab_tree_view.setModel(self.tab_tree)
+        self.tab_tree_view.setHeaderHidden(True)
+        self.tab_tree_view.setUniformRowHeights(True)
+        self.tab_tree_view.setExpandsOnDoubleClick(False)
+        self.tab_tree_view.clicked.connect(self.tab_tree_clicked)
+        self.tab_tree_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.tab_tree_view.customContextMenuRequested.connect(self.show_tab_tree_menu)
+        # แท็บลูกที่เพิ่งเปิดจะแสดงทันที
+        self.tab_tree.rowsInserted.connect(lambda parent, first, last: self.tab_tree_view.expand(parent))
+
+        self.tab_tree_dock = QDockWidget("แท็บ", self)
+        self.tab_tree_dock.setObjectName("tab_tree_dock")
+        self.tab_tree_dock.setWidget(self.tab_tree_view)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.tab_tree_dock)
+
+        self.set_vertical_tabs(self.settings.get('vertical_tabs', False))
+
+        # แผงดาวน์โหลด (ซ่อนไว้จนกว่าจะมีการดาวน์โหลดหรือเปิดเอง)
+        self.downloads_panel = DownloadsPanel(self.download_manager, self.download_progress, self)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.downloads_panel)
+        self.downloads_panel.hide()
+        self.download_manager.added.connect(self.download_added)
+        self.download_manager.changed.connect(self.download_changed)
+        self.download_verifier.checked.connect(self.download_checked)
+
+    def show_tab_bar_menu(self, pos):
+        """เมนูคลิกขวาของแถบแท็บ"""
+        browser = self.tabs.widget(self.tabs.tabBar().tabAt(pos))
+        if browser:
+            menu = QMenu()
+            self.add_tab_actions(menu, browser)
+            menu.exec_(self.tabs.tabBar().mapToGlobal(pos))
+
+    def add_tab_actions(self, menu, browser):
+        """เพิ่มตัวเลือกของแท็บ (ปักหมุด/ปิด) ลงในเมนู"""
+        pin_text = "เลิกปักหมุดแท็บ" if self.throttler.is_pinned(browser) else "ปักหมุดแท็บ"
+        menu.addAction(pin_text).triggered.connect(lambda: self.toggle_pin_tab(browser))
+        menu.addAction("ปิดแท็บ").triggered.connect(lambda: self.close_tab(self.tabs.indexOf(browser)))
+
+    def toggle_pin_tab(self, browser):
+        """ปักหมุดแท็บเพื่อไม่ให้ถูกแช่แข็งเมื่ออยู่เบื้องหลัง"""
+        pinned = self.throttler.toggle_pin(browser)
+        self.status.showMessage("ปักหมุดแท็บแล้ว" if pinned else "เลิกปักหมุดแท็บแล้ว", 3000)
+
+    def set_vertical_tabs(self, enabled):
+        """เปิด/ปิดแถบแท็บแนวตั้ง"""
+        self.tab_tree_dock.setVisible(enabled)
+        self.tabs.tabBar().setVisible(not enabled)
+
+    def toggle_vertical_tabs(self):
+        """สลับแถบแท็บแนวตั้ง"""
+        enabled = not self.settings.get('vertical_tabs', False)
+        self.settings['vertical_tabs'] = enabled
+        self.save_settings()
+        self.set_vertical_tabs(enabled)
+
+    def tab_tree_clicked(self, index):
+        """สลับแท็บเมื่อคลิกในแถบแท็บแนวตั้ง"""
+        browser = self.tab_tree.browser_at(index)
+        if browser:
+            self.tabs.setCurrentWidget(browser)
+
+    def show_tab_tree_menu(self, pos):
+        """เมนูคลิกขวาของแถบแท็บแนวตั้ง"""
+        browser = self.tab_tree.browser_at(self.tab_tree_view.indexAt(pos))
+        menu = QMenu()
+        if browser:
+            self.add_tab_actions(menu, browser)
+            menu.addSeparator()
+        menu.addAction("ยุบทั้งหมด").triggered.connect(self.tab_tree_view.collapseAll)
+        menu.addAction("ขยายทั้งหมด").triggered.connect(self.tab_tree_view.expandAll)
+        menu.exec_(self.tab_tree_view.viewport().mapToGlobal(pos))
+
     def setup_ui(self):
         """ตั้งค่า UI พื้นฐาน"""
-        # ตั้งค่า proxy (ถ้ามี)
-        QNetworkProxyFactory.setUseSystemConfiguration(True)
-
         # ตั้งค่า style
         self.setStyle(QStyleFactory.create('Fusion'))
 
@@ -250,56 +6273,7 @@ class UniqueBrowser(QMainWindow):
     def update_theme(self):
         """อัพเดทธีมตามการตั้งค่า"""
         try:
-            palette = QPalette()
-
-            if self.dark_mode:
-                # ตั้งค่าสีสำหรับโหมดกลางคืน
-                palette.setColor(QPalette.Window, QColor(53, 53, 53))
-                palette.setColor(QPalette.WindowText, Qt.white)
-                palette.setColor(QPalette.Base, QColor(25, 25, 25))
-                palette.setColor(QPalette.AlternateBase, QColor(53, 53, 53))
-                palette.setColor(QPalette.ToolTipBase, Qt.white)
-                palette.setColor(QPalette.ToolTipText, Qt.white)
-                palette.setColor(QPalette.Text, Qt.white)
-                palette.setColor(QPalette.Button, QColor(53, 53, 53))
-                palette.setColor(QPalette.ButtonText, Qt.white)
-                palette.setColor(QPalette.BrightText, Qt.red)
-                palette.setColor(QPalette.Link, QColor(42, 130, 218))
-                palette.setColor(QPalette.Highlight, QColor(42, 130, 218))
-                palette.setColor(QPalette.HighlightedText, Qt.black)
-            else:
-                # ใช้ธีมปกติ
-                palette = QApplication.style().standardPalette()
-
-            # ตั้งค่าธีมให้กับแอพพลิเคชัน
-            self.setPalette(palette)
-
-            # อัพเดทแท็บทั้งหมด
-            for i in range(self.tabs.count()):
-                browser = self.tabs.widget(i)
-                if browser:
-                    # ตั้งค่าพื้นหลังของ WebView
-                    if self.dark_mode:
-                        browser.setStyleSheet("background-color: #333333;")
-                    else:
-                        browser.setStyleSheet("")
-
-            # อัพเดทแถบสถานะ
-            status_style = "QStatusBar { background-color: #333333; color: white; }" if self.dark_mode else ""
-            self.status.setStyleSheet(status_style)
-
-            # อัพเดทแถบแท็บ
-            tab_style = """
-                QTabWidget::pane { border: none; }
-                QTabBar::tab { background-color: #444444; color: white; padding: 8px; }
-                QTabBar::tab:selected { background-color: #666666; }
-            """ if self.dark_mode else ""
-            self.tabs.setStyleSheet(tab_style)
-
-            # อัพเดท URL bar
-            url_style = "QLineEdit { background-color: #444444; color: white; border: 1px solid #555555; }" if self.dark_mode else ""
-            self.url_bar.setStyleSheet(url_style)
-
+            self.theme.apply('dark' if self.dark_mode else 'light')
         except Exception as e:
             print(f"Error in update_theme: {e}")
 
@@ -320,6 +6294,12 @@ class UniqueBrowser(QMainWindow):
         # ปุ่มเพิ่มเติม
         self.setup_secondary_toolbar()
 
+        # แถบค้นหาในหน้า (แถวของตัวเองเหนือแถบเครื่องมือรอง ซ่อนไว้จนกด Ctrl+F)
+        self.find_bar = FindBar(self)
+        self.addToolBarBreak(Qt.BottomToolBarArea)
+        self.addToolBar(Qt.BottomToolBarArea, self.find_bar)
+        self.find_bar.hide()
+
     def setup_toolbar_buttons(self):
         """ตั้งค่าปุ่มแถบเครื่องมือ"""
         actions = [
@@ -346,6 +6326,7 @@ class UniqueBrowser(QMainWindow):
         self.url_bar = QLineEdit()
         self.url_bar.setPlaceholderText("พิมพ์ URL หรือคำค้นหา...")
         self.url_bar.returnPressed.connect(self.navigate_to_url)
+        self.url_bar.textEdited.connect(self.predictor.text_edited)
         self.main_toolbar.addWidget(self.url_bar)
 
     def setup_secondary_toolbar(self):
@@ -400,11 +6381,15 @@ class UniqueBrowser(QMainWindow):
         """ตั้งค่าเมนู File"""
         actions = [
             ('แท็บใหม่', 'Ctrl+T', lambda: self.add_new_tab()),
-            ('แท็บส่วนตัว', 'Ctrl+Shift+T', lambda: self.add_new_tab(QUrl(self.settings['homepage']), "แท็บส่วนตัว", private=True)),
+            ('แท็บส่วนตัว', None, lambda: self.add_new_tab(QUrl(self.settings['homepage']), "แท็บส่วนตัว", private=True)),
             ('ปิดแท็บปัจจุบัน', 'Ctrl+W', self.close_current_tab),
+            ('เปิดแท็บที่ปิดล่าสุด', 'Ctrl+Shift+T', self.reopen_closed_tab),
             ('ปิดเบราว์เซอร์', 'Ctrl+Q', self.close),
             None,  # Separator
             ('บันทึกหน้าเว็บ...', 'Ctrl+S', self.save_page),
+            ('บันทึกหน้าไว้อ่านออฟไลน์', 'Ctrl+Shift+S', self.archive_current_page),
+            ('บันทึกทุกแท็บไว้อ่านออฟไลน์', None, self.archive_all_tabs),
+            ('หน้าที่บันทึกไว้อ่านออฟไลน์', None, lambda: self.open_internal_page('archive')),
             ('พิมพ์...', 'Ctrl+P', self.print_page),
             None,  # Separator
             ('ตั้งค่า...', 'Ctrl+,', self.show_settings),
@@ -443,7 +6428,8 @@ class UniqueBrowser(QMainWindow):
         appearance_actions = [
             ('โหมดกลางคืน', 'Ctrl+Shift+D', self.toggle_dark_mode),
             ('โหมดเต็มหน้าจอ', 'F11', self.toggle_fullscreen),
-            ('แสดงแถบเครื่องมือ', None, self.toggle_toolbar)
+            ('แสดงแถบเครื่องมือ', None, self.toggle_toolbar),
+            ('แถบแท็บแนวตั้ง', None, self.toggle_vertical_tabs)
         ]
         self.add_menu_actions(appearance_menu, appearance_actions)
 
@@ -478,6 +6464,7 @@ class UniqueBrowser(QMainWindow):
         """ตั้งค่าเมนู Tools"""
         actions = [
             ('ดาวน์โหลด', 'Ctrl+J', self.show_downloads),
+            ('ดาวน์โหลดไฟล์ใหญ่แบบหลายการเชื่อมต่อ', None, self.toggle_segmented_downloads),
             ('ประวัติ', 'Ctrl+H', self.show_history),
             ('ส่วนขยาย', 'Ctrl+Shift+E', self.show_extensions),
             None,
@@ -486,9 +6473,24 @@ class UniqueBrowser(QMainWindow):
             None,
             ('ตั้งค่าการเล่นวิดีโอ', None, self.setup_video_support),
             ('ตั้งค่าโปรxy...', None, self.setup_proxy),
+            ('คุกกี้และข้อมูลไซต์...', None, self.show_cookie_manager),
             ('เคลียร์ข้อมูลการท่องเว็บ...', None, self.clear_browsing_data),
             None,
-            ('ปรับแต่งประสิทธิภาพ', None, self.optimize_for_linux)
+            ('ปรับแต่งประสิทธิภาพ', None, self.optimize_for_linux),
+            ('สถิติการพักแท็บพื้นหลัง', None, self.show_throttling_stats),
+            ('สถิติการโหลดหน้าล่วงหน้า', None, self.show_speculation_stats),
+            ('แคช HTTP...', None, self.show_cache_stats),
+            None,
+            ('บล็อกโฆษณาและตัวติดตาม', None, self.toggle_content_blocking),
+            ('โหลดรายการตัวกรองใหม่', None, self.reload_filter_lists),
+            ('เปิดโฟลเดอร์รายการตัวกรอง', None, self.open_filters_folder),
+            None,
+            ('สคริปต์ผู้ใช้...', None, self.show_user_scripts),
+            ('โหลดสคริปต์ผู้ใช้ใหม่', None, self.reload_user_scripts),
+            ('เปิดโฟลเดอร์สคริปต์ผู้ใช้', None, self.open_user_scripts_folder),
+            None,
+            ('ส่งออกบันทึกเครือข่าย (HAR)...', None, self.export_network_log),
+            ('ล้างบันทึกเครือข่าย', None, self.clear_network_log)
         ]
 
         self.add_menu_actions(menu, actions)
@@ -533,6 +6535,7 @@ class UniqueBrowser(QMainWindow):
             ('Ctrl+N', self.new_window),
             ('Ctrl+Shift+N', self.new_private_window),
             ('Ctrl+Shift+Del', self.clear_browsing_data),
+            ('Ctrl+Shift+A', self.show_tab_switcher),
             ('F6', self.focus_url_bar),
             ('Esc', self.stop_loading)
         ]
@@ -550,6 +6553,21 @@ class UniqueBrowser(QMainWindow):
         self.progress_label = QLabel()
         self.status.addPermanentWidget(self.progress_label)
 
+        # ความคืบหน้ารวมของการดาวน์โหลด
+        self.download_status_label = QLabel()
+        self.status.addPermanentWidget(self.download_status_label)
+        self.download_status_bar = QProgressBar()
+        self.download_status_bar.setMaximumWidth(120)
+        self.download_status_bar.setMaximumHeight(14)
+        self.download_status_bar.setTextVisible(False)
+        self.download_status_bar.hide()
+        self.status.addPermanentWidget(self.download_status_bar)
+        self.download_progress.updated.connect(self.update_download_status)
+
+        # จำนวนคำขอที่ถูกบล็อกในแท็บปัจจุบัน
+        self.block_label = QLabel()
+        self.status.addPermanentWidget(self.block_label)
+
         # ตัวชี้วัดโหมด
         self.mode_label = QLabel()
         self.status.addPermanentWidget(self.mode_label)
@@ -591,6 +6609,46 @@ class UniqueBrowser(QMainWindow):
             # ปิดการใช้งาน Tray Icon เนื่องจากไม่พบไอคอน
             pass
 
+    def update_download_status(self, summary):
+        """แสดงความคืบหน้ารวมของการดาวน์โหลดในแถบสถานะและ tray icon"""
+        self.download_status_label.setText(self.download_manager.summary_text(summary))
+        if summary is None:
+            self.download_status_bar.hide()
+        else:
+            # ไม่รู้ขนาดรวม: แสดงแบบไม่ระบุเปอร์เซ็นต์
+            self.download_status_bar.setRange(0, 100 if summary['percent'] >= 0 else 0)
+            self.download_status_bar.setValue(max(0, summary['percent']))
+            self.download_status_bar.show()
+
+        tray_icon = getattr(self, 'tray_icon', None)
+        if tray_icon is None:
+            return
+        percent = summary['percent'] if summary else None
+        if percent != getattr(self, 'tray_percent', None):
+            # วาดไอคอนใหม่เฉพาะเมื่อเปอร์เซ็นต์เปลี่ยน
+            self.tray_percent = percent
+            tray_icon.setIcon(self.tray_progress_icon(percent))
+        tooltip = f"{self.app_name} {self.version}"
+        if summary:
+            tooltip += "\n" + self.download_manager.summary_text(summary)
+        tray_icon.setToolTip(tooltip)
+
+    def tray_progress_icon(self, percent):
+        """ไอคอน tray พร้อมแถบความคืบหน้าด้านล่าง (percent เป็น None เมื่อไม่มีการดาวน์โหลด)"""
+        if not hasattr(self, 'tray_base_icon'):
+            self.tray_base_icon = self.tray_icon.icon()
+        if percent is None:
+            return self.tray_base_icon
+        pixmap = self.tray_base_icon.pixmap(64, 64)
+        painter = QPainter(pixmap)
+        painter.fillRect(0, 50, 64, 14, QColor(0, 0, 0, 160))
+        if percent >= 0:
+            painter.fillRect(2, 52, 60 * percent // 100, 10, QColor(76, 175, 80))
+        else:
+            painter.fillRect(2, 52, 60, 10, QColor(33, 150, 243))
+        painter.end()
+        return QIcon(pixmap)
+
     def tray_icon_activated(self, reason):
         """เมื่อคลิกที่ tray icon"""
         if reason == QSystemTrayIcon.Trigger:
@@ -609,6 +6667,10 @@ class UniqueBrowser(QMainWindow):
         """อัพเดท UI เป็นระยะ"""
         current_browser = self.current_browser()
         if current_browser:
+            # อัพเดทจำนวนที่บล็อกของแท็บปัจจุบัน
+            blocked = self.content_blocker.blocked_count(current_browser.url())
+            self.block_label.setText(f"บล็อก: {blocked}" if blocked else "")
+
             # อัพเดท URL บาร์
             if current_browser.hasFocus() or self.url_bar.hasFocus():
                 return
@@ -619,8 +6681,8 @@ class UniqueBrowser(QMainWindow):
         """คืนค่าเบราว์เซอร์ปัจจุบัน"""
         return self.tabs.currentWidget()
 
-    def add_new_tab(self, qurl=None, label="แท็บใหม่", private=False):
-        """เพิ่มแท็บใหม่"""
+    def add_new_tab(self, qurl=None, label="แท็บใหม่", private=False, opener=None, load=True):
+        """เพิ่มแท็บใหม่ (load=False ไม่โหลด qurl เช่นเมื่อจะกู้ประวัติของแท็บเอง)"""
         try:
             if qurl is None:
                 qurl = QUrl(self.settings['homepage'])
@@ -630,12 +6692,13 @@ class UniqueBrowser(QMainWindow):
             # ตั้งค่าโพรไฟล์หากเป็นโหมดส่วนตัว
             if private or self.private_mode:
                 profile = QWebEngineProfile("PrivateProfile", browser)
+                self.cache_policy.apply(profile, private=True)
                 # สร้าง page ใหม่ด้วย profile ส่วนตัว
                 page = QWebEnginePage(profile, browser)
                 browser.setPage(page)
             else:
                 # ตั้งค่าการดาวน์โหลด
-                browser.page().profile().downloadRequested.connect(self.download_requested)
+                self.download_manager.attach(browser.page().profile())
 
             # ตั้งค่าการจัดการลิงก์ภายนอก
             browser.page().linkHovered.connect(self.link_hovered)
@@ -645,15 +6708,22 @@ class UniqueBrowser(QMainWindow):
 
             # ใช้ profile ที่มีอยู่แล้ว
             current_profile = browser.page().profile()
+            self.content_blocker.install(current_profile, private=private or self.private_mode)
+            self.internal_pages.install(current_profile)
             custom_page = CustomWebEnginePage(current_profile, browser)
             custom_page.main_browser = browser  # ตั้งค่า main_browser attribute
             browser.setPage(custom_page)
+            self.content_dark_mode.attach(custom_page)
 
             # เพิ่มเมนูคลิกขวา
             browser.setContextMenuPolicy(Qt.CustomContextMenu)
             browser.customContextMenuRequested.connect(lambda pos, browser=browser: self.show_context_menu(pos, browser))
 
-            browser.setUrl(qurl)
+            # ใช้ระดับซูมของโฮสต์ตั้งแต่ก่อนวาดหน้าแรก
+            self.site_zoom.attach(browser, private or self.private_mode)
+            browser.setZoomFactor(self.site_zoom.level(qurl))
+            if load:
+                browser.setUrl(qurl)
 
             # เชื่อมต่อสัญญาณ
             browser.urlChanged.connect(lambda qurl, browser=browser:
@@ -665,9 +6735,19 @@ class UniqueBrowser(QMainWindow):
             browser.loadFinished.connect(lambda _, browser=browser:
                 self.on_load_finished(browser))
 
-            # เพิ่มแท็บ
+            # อัพเดทดัชนีค้นหาแท็บเมื่อชื่อหรือ URL เปลี่ยน
+            browser.titleChanged.connect(lambda title, browser=browser:
+                self.tab_index.update(self, browser, title=title))
+            browser.titleChanged.connect(lambda title, browser=browser:
+                self.tab_tree.set_title(browser, title))
+            browser.urlChanged.connect(lambda qurl, browser=browser:
+                self.tab_index.update(self, browser, url=qurl.toString()))
+
+            # เพิ่มแท็บ (ในแถบแท็บแนวตั้งจะอยู่ใต้แท็บที่เปิดมัน)
+            self.tab_tree.add_tab(browser, label, opener)
             index = self.tabs.addTab(browser, label)
             self.tabs.setCurrentIndex(index)
+            self.tab_index.update(self, browser, title=label, url=qurl.toString(), private=private or self.private_mode)
 
             # บันทึกประวัติ (ยกเว้นโหมดส่วนตัว)
             if not private and not self.private_mode:
@@ -682,96 +6762,73 @@ class UniqueBrowser(QMainWindow):
     def show_context_menu(self, pos, browser):
         """แสดงเมนูคลิกขวา"""
         try:
-            # สร้างเมนูคลิกขวา
-            menu = QMenu()
-
-            # ใช้ JavaScript เพื่อตรวจสอบว่าตำแหน่งที่คลิกมีลิงก์หรือไม่
-            # เก็บข้อมูลลิงก์ไว้ในตัวแปรชั่วคราว
-            self.context_link_url = None
-
-            # ตัวเลือกทั่วไปที่แสดงเสมอ
-            back_action = menu.addAction("ย้อนกลับ")
-            forward_action = menu.addAction("ไปข้างหน้า")
-            refresh_action = menu.addAction("รีเฟรช")
-            menu.addSeparator()
-
-            # เชื่อมต่อการกระทำทั่วไป
-            back_action.triggered.connect(browser.back)
-            forward_action.triggered.connect(browser.forward)
-            refresh_action.triggered.connect(browser.reload)
-
-            # ตรวจสอบว่ามีข้อความที่เลือกไว้หรือไม่
-            browser.page().triggerAction(QWebEnginePage.Copy)
-            selected_text = QApplication.clipboard().text()
-
-            if selected_text:
-                # เพิ่มตัวเลือกสำหรับข้อความที่เลือก
-                copy_action = menu.addAction("คัดลอก")
-                search_action = menu.addAction("ค้นหา")
-
-                # เชื่อมต่อการกระทำ
-                copy_action.triggered.connect(lambda: browser.page().triggerAction(QWebEnginePage.Copy))
-                search_action.triggered.connect(lambda: self.search_text(selected_text))
-
-                menu.addSeparator()
-
-            # เพิ่มตัวเลือกสำหรับลิงก์ (ถ้ามี)
-            # ใช้ JavaScript เพื่อตรวจสอบลิงก์ที่ตำแหน่งที่คลิก
-            browser.page().runJavaScript("""
-                (function() {
-                    var element = document.elementFromPoint(%d, %d);
-                    while (element && element.tagName !== 'A') {
-                        element = element.parentElement;
-                    }
-                    if (element && element.tagName === 'A') {
-                        return element.href;
-                    }
-                    return '';
-                })();
-            """ % (pos.x(), pos.y()), self.handle_link_context_menu_result)
-
-            # เพิ่มตัวเลือกทั่วไป
-            menu.addSeparator()
-            view_source_action = menu.addAction("ดูซอร์สโค้ด")
-            inspect_action = menu.addAction("ตรวจสอบองค์ประกอบ")
-
-            # เชื่อมต่อการกระทำ
-            view_source_action.triggered.connect(lambda: browser.page().triggerAction(QWebEnginePage.ViewSource))
-            inspect_action.triggered.connect(lambda: browser.page().triggerAction(QWebEnginePage.InspectElement))
-
-            # แสดงเมนู
+            menu = self.build_context_menu(browser, browser.page().contextMenuData())
             menu.exec_(browser.mapToGlobal(pos))
-
         except Exception as e:
             print(f"Error in show_context_menu: {e}")
 
-    def handle_link_context_menu_result(self, result):
-        """จัดการผลลัพธ์จาก JavaScript สำหรับเมนูคลิกขวาที่ลิงก์"""
-        try:
-            if result and isinstance(result, str) and result.startswith(('http://', 'https://')):
-                # เก็บ URL ไว้ในตัวแปรชั่วคราว
-                self.context_link_url = QUrl(result)
+    def build_context_menu(self, browser, data):
+        """สร้างเมนูคลิกขวาครั้งเดียวจาก contextMenuData ของหน้า (ลิงก์ รูป/สื่อ ข้อความที่เลือก และช่องแก้ไข)
+        ข้อมูลมาพร้อมเหตุการณ์คลิกขวา จึงไม่ต้องอ่านผ่านคลิปบอร์ดหรือรัน JavaScript ในหน้า"""
+        menu = QMenu()
+        page = browser.page()
+
+        def add(label, handler):
+            menu.addAction(label).triggered.connect(lambda checked=False: handler())
+
+        link = data.linkUrl() if data.isValid() else QUrl()
+        if link.isValid() and not link.isEmpty():
+            add("เปิดในแท็บใหม่", lambda: self.open_link_in_new_tab(link))
+            add("เปิดในหน้าต่างใหม่", lambda: self.open_link_in_new_window(link))
+            add("เปิดในหน้าต่างส่วนตัว", lambda: self.open_link_in_private_window(link))
+            add("บันทึกลิงก์...", lambda: page.triggerAction(QWebEnginePage.DownloadLinkToDisk))
+            add("คัดลอกลิงก์", lambda: QApplication.clipboard().setText(link.toString()))
+            menu.addSeparator()
 
-                # สร้างเมนูเพิ่มเติมสำหรับลิงก์
-                link_menu = QMenu("ตัวเลือกลิงก์")
+        media_type = data.mediaType() if data.isValid() else QWebEngineContextMenuData.MediaTypeNone
+        media = data.mediaUrl() if data.isValid() else QUrl()
+        if media_type == QWebEngineContextMenuData.MediaTypeImage and media.isValid():
+            add("เปิดรูปในแท็บใหม่", lambda: self.open_link_in_new_tab(media))
+            add("บันทึกรูป...", lambda: page.triggerAction(QWebEnginePage.DownloadImageToDisk))
+            add("คัดลอกรูป", lambda: page.triggerAction(QWebEnginePage.CopyImageToClipboard))
+            add("คัดลอกที่อยู่รูป", lambda: QApplication.clipboard().setText(media.toString()))
+            menu.addSeparator()
+        elif media_type in (QWebEngineContextMenuData.MediaTypeVideo,
+                            QWebEngineContextMenuData.MediaTypeAudio) and media.isValid():
+            add("เปิดสื่อในแท็บใหม่", lambda: self.open_link_in_new_tab(media))
+            add("บันทึกสื่อ...", lambda: page.triggerAction(QWebEnginePage.DownloadMediaToDisk))
+            add("คัดลอกที่อยู่สื่อ", lambda: QApplication.clipboard().setText(media.toString()))
+            menu.addSeparator()
+
+        selected_text = data.selectedText() if data.isValid() else ""
+        if data.isValid() and data.isContentEditable():
+            add("ตัด", lambda: page.triggerAction(QWebEnginePage.Cut))
+            add("คัดลอก", lambda: page.triggerAction(QWebEnginePage.Copy))
+            add("วาง", lambda: page.triggerAction(QWebEnginePage.Paste))
+            add("เลือกทั้งหมด", lambda: page.triggerAction(QWebEnginePage.SelectAll))
+            menu.addSeparator()
+        elif selected_text:
+            add("คัดลอก", lambda: page.triggerAction(QWebEnginePage.Copy))
+        if selected_text.strip():
+            preview = selected_text.strip()
+            preview = preview if len(preview) <= 30 else preview[:30] + "…"
+            add(f"ค้นหา \"{preview}\"", lambda: self.search_text(selected_text.strip()))
+            menu.addSeparator()
 
-                # เพิ่มตัวเลือกสำหรับลิงก์
-                open_in_new_tab_action = link_menu.addAction("เปิดในแท็บใหม่")
-                open_in_new_window_action = link_menu.addAction("เปิดในหน้าต่างใหม่")
-                open_in_private_window_action = link_menu.addAction("เปิดในหน้าต่างส่วนตัว")
-                link_menu.addSeparator()
-                copy_link_action = link_menu.addAction("คัดลอกลิงก์")
+        # ตัวเลือกการนำทางเมื่อคลิกที่ว่างของหน้า
+        if menu.isEmpty():
+            history = browser.history()
+            menu.addAction("ย้อนกลับ", browser.back).setEnabled(history.canGoBack())
+            menu.addAction("ไปข้างหน้า", browser.forward).setEnabled(history.canGoForward())
+            menu.addAction("รีเฟรช", browser.reload)
+            menu.addSeparator()
 
-                # เชื่อมต่อการกระทำ
-                open_in_new_tab_action.triggered.connect(lambda: self.open_link_in_new_tab(self.context_link_url))
-                open_in_new_window_action.triggered.connect(lambda: self.open_link_in_new_window(self.context_link_url))
-                open_in_private_window_action.triggered.connect(lambda: self.open_link_in_private_window(self.context_link_url))
-                copy_link_action.triggered.connect(lambda: QApplication.clipboard().setText(self.context_link_url.toString()))
+        # รายการที่ปลั๊กอินเพิ่มเอง
+        self.plugins.dispatch('context_menu', menu, data, browser)
 
-                # แสดงเมนู
-                link_menu.exec_(QCursor.pos())
-        except Exception as e:
-            print(f"Error in handle_link_context_menu_result: {e}")
+        add("ดูซอร์สโค้ด", lambda: page.triggerAction(QWebEnginePage.ViewSource))
+        add("ตรวจสอบองค์ประกอบ", lambda: page.triggerAction(QWebEnginePage.InspectElement))
+        return menu
 
     def search_text(self, text):
         """ค้นหาข้อความในเครื่องมือค้นหา"""
@@ -843,7 +6900,7 @@ class UniqueBrowser(QMainWindow):
             print(f"Opening link in new tab: {url.toString()}")
 
             # สร้างแท็บใหม่
-            new_tab = self.add_new_tab(url, url.toString())
+            new_tab = self.add_new_tab(url, url.toString(), opener=self.current_browser())
 
             # ถ้าไม่ใช่แท็บพื้นหลัง ให้เปลี่ยนไปที่แท็บใหม่
             if not background:
@@ -891,6 +6948,12 @@ class UniqueBrowser(QMainWindow):
             if title:
                 self.tabs.setTabText(index, title[:20] + '...' if len(title) > 20 else title)
                 self.tabs.setTabToolTip(index, title)
+
+            # เก็บเวลาโหลดของทรัพยากร และเก็บอีกครั้งภายหลังสำหรับทรัพยากรที่โหลดช้า
+            self.collect_resource_timing(browser)
+            QTimer.singleShot(10000, lambda: self.collect_resource_timing(browser))
+
+            self.plugins.dispatch('load_finished', browser)
         except Exception as e:
             # ป้องกันข้อผิดพลาดที่อาจเกิดขึ้น
             print(f"Error in on_load_finished: {e}")
@@ -898,6 +6961,28 @@ class UniqueBrowser(QMainWindow):
         # อัพเดท favicon (ตัวอย่างเท่านั้น)
         # ในทางปฏิบัติต้องใช้ QWebEnginePage.iconChanged signal
 
+    def collect_resource_timing(self, browser):
+        """อ่าน Resource Timing จากหน้าเว็บเพื่อเติมข้อมูลเวลาในบันทึกเครือข่าย"""
+        try:
+            if browser is None or not self.network_log.enabled or self.tabs.indexOf(browser) < 0:
+                return
+            # ไม่เก็บข้อมูลของแท็บส่วนตัว (profile ส่วนตัวมีชื่อ จึงไม่ใช่ off-the-record)
+            if self.is_private_browser(browser):
+                return
+            page = browser.page()
+            title = page.title()
+
+            def add_timing(result):
+                if result:
+                    self.network_log.add_timing(title, json.loads(result))
+
+            page.runJavaScript(NetworkLog.TIMING_SCRIPT, QWebEngineScript.ApplicationWorld, add_timing)
+        except RuntimeError:
+            # แท็บถูกปิดไปก่อนถึงเวลาเก็บข้อมูล
+            pass
+        except Exception as e:
+            print(f"Error collecting resource timing: {e}")
+
     def update_progress(self, progress):
         """อัพเดทความคืบหน้า"""
         try:
@@ -926,7 +7011,10 @@ class UniqueBrowser(QMainWindow):
             # อัพเดท URL บาร์
             browser = self.tabs.widget(index)
             if browser:
+                self.throttler.tab_activated(browser)
                 self.update_urlbar(browser.url(), browser)
+                self.find_bar.tab_changed()
+                self.tab_tree_view.setCurrentIndex(self.tab_tree.index_for_browser(browser))
 
     def suspend_inactive_tabs(self, active_index):
         """พักการทำงานของแท็บที่ไม่ได้ใช้งาน"""
@@ -960,41 +7048,54 @@ class UniqueBrowser(QMainWindow):
         # ดึง browser widget ที่จะปิด
         browser = self.tabs.widget(index)
         if browser:
-            try:
-                # หยุดการเล่นมีเดียทั้งหมดในแท็บ
-                browser.page().runJavaScript("""
-                    // หยุดวิดีโอทั้งหมด
-                    document.querySelectorAll('video').forEach(v => {
-                        v.pause();
-                        v.src = '';
-                    });
-
-                    // หยุดเสียงทั้งหมด
-                    document.querySelectorAll('audio').forEach(a => {
-                        a.pause();
-                        a.src = '';
-                    });
-
-                    // หยุด iframe ที่อาจมีมีเดีย
-                    document.querySelectorAll('iframe').forEach(i => {
-                        i.src = 'about:blank';
-                    });
-
-                    // ล้างแหล่งข้อมูลมีเดีย
-                    document.querySelectorAll('source').forEach(s => {
-                        s.src = '';
-                    });
-                """)
-
-                # ล้างหน่วยความจำและหยุดการทำงานของเพจ
-                browser.stop()
-                browser.page().deleteLater()
-                browser.deleteLater()
-            except Exception as e:
-                print(f"Error cleaning up tab resources: {e}")
+            self.tab_index.remove(browser)
+            self.tab_tree.remove_tab(browser)
+            self.throttler.remove(browser)
 
-        # ลบแท็บ
+            # เก็บประวัติของแท็บไว้สำหรับเปิดกลับ (Ctrl+Shift+T)
+            self.remember_closed_tab(browser)
+
+        # ถอดแท็บออกทันที แล้วค่อยคืนทรัพยากรของเพจเมื่อว่าง
         self.tabs.removeTab(index)
+        if browser:
+            self.teardown_queue.enqueue(browser)
+
+    def remember_closed_tab(self, browser):
+        """บันทึก URL ชื่อ และประวัติของแท็บที่ปิดลงใน recently closed"""
+        try:
+            # ไม่เก็บแท็บส่วนตัว เพื่อไม่ให้ประวัติรั่วไปยังโปรไฟล์ปกติ
+            # (profile ส่วนตัวมีชื่อ จึงไม่ใช่ off-the-record ต้องเทียบกับ profile หลัก)
+            if self.is_private_browser(browser):
+                return
+            page = browser.page()
+
+            history = QByteArray()
+            stream = QDataStream(history, QIODevice.WriteOnly)
+            stream << page.history()
+
+            self.closed_tabs.append({
+                'url': browser.url().toString(),
+                'title': page.title() or browser.url().toString(),
+                'history': history
+            })
+        except Exception as e:
+            print(f"Error in remember_closed_tab: {e}")
+
+    def reopen_closed_tab(self):
+        """เปิดแท็บที่ปิดล่าสุดกลับมาพร้อมประวัติย้อนกลับ/ไปข้างหน้า"""
+        if not self.closed_tabs:
+            self.status.showMessage("ไม่มีแท็บที่ปิดล่าสุด", 3000)
+            return
+
+        entry = self.closed_tabs.pop()
+        # ไม่โหลด URL เอง การกู้ประวัติจะโหลดรายการปัจจุบันเพียงครั้งเดียว
+        browser = self.add_new_tab(QUrl(entry['url']), entry['title'], load=False)
+        if browser:
+            try:
+                stream = QDataStream(entry['history'], QIODevice.ReadOnly)
+                stream >> browser.page().history()
+            except Exception as e:
+                print(f"Error restoring tab history: {e}")
 
     def close_current_tab(self):
         """ปิดแท็บปัจจุบัน"""
@@ -1017,6 +7118,20 @@ class UniqueBrowser(QMainWindow):
         if index < self.tabs.count():
             self.tabs.setCurrentIndex(index)
 
+    def activate_tab(self, browser):
+        """แสดงหน้าต่างนี้และสลับไปยังแท็บที่ระบุ"""
+        self.tabs.setCurrentWidget(browser)
+        self.show()
+        self.raise_()
+        self.activateWindow()
+
+    def show_tab_switcher(self):
+        """เปิดหน้าต่างค้นหาแท็บจากทุกหน้าต่าง"""
+        browser = self.current_browser()
+        private = self.is_private_browser(browser) if browser else self.private_mode
+        dialog = TabSwitcherDialog(self.tab_index, self, private)
+        dialog.exec_()
+
     def navigate_to_url(self):
         """ไปยัง URL ที่ป้อน"""
         text = self.url_bar.text().strip()
@@ -1025,7 +7140,9 @@ class UniqueBrowser(QMainWindow):
             return
 
         # ตรวจสอบว่าเป็น URL หรือคำค้นหา
-        if '.' in text and ' ' not in text:
+        if text.startswith('unique:'):
+            qurl = QUrl(text)
+        elif '.' in text and ' ' not in text:
             if not text.startswith(('http://', 'https://')):
                 text = 'https://' + text
             qurl = QUrl(text)
@@ -1034,13 +7151,35 @@ class UniqueBrowser(QMainWindow):
             search_url = self.settings.get('search_engine', 'https://www.google.com/search?q=')
             qurl = QUrl(search_url + text.replace(' ', '+'))
 
+        # ถ้ามีแท็บที่เปิด URL นี้อยู่แล้ว ให้สลับไปแทนการโหลดซ้ำ
+        browser = self.current_browser()
+        private = self.is_private_browser(browser) if browser else self.private_mode
+        existing = self.tab_index.find_by_url(qurl.toString(), exclude=browser, private=private)
+        if existing:
+            if browser:
+                self.update_urlbar(browser.url(), browser)
+            existing['window'].activate_tab(existing['browser'])
+            existing['window'].status.showMessage(f"สลับไปยังแท็บที่เปิดอยู่แล้ว: {qurl.toString()}", 3000)
+            return
+
         self.navigate_in_current_tab(qurl)
 
     def navigate_in_current_tab(self, qurl):
         """นำทางในแท็บปัจจุบัน"""
         browser = self.current_browser()
         if browser:
-            browser.setUrl(qurl)
+            previous_url = browser.url().toString()
+
+            # ใช้หน้าที่โหลดล่วงหน้าไว้ถ้าตรงกัน (เฉพาะแท็บที่ไม่มีประวัติย้อนกลับให้เสีย)
+            # เอกสารที่โหลดล่วงหน้าไม่มีสคริปต์ผู้ใช้ จึงใช้ได้เฉพาะหน้าที่ไม่มีสคริปต์ตรงกัน
+            page = None
+            if browser.history().count() <= 1 and not self.user_scripts.scripts_for(qurl):
+                page = self.predictor.take_prerendered(qurl.toString(), browser.page().profile())
+            if page:
+                self.swap_in_page(browser, page)
+            else:
+                browser.setUrl(qurl)
+            self.predictor.navigated(previous_url, qurl.toString(), remember=not self.private_mode)
 
             # บันทึกประวัติ (ยกเว้นโหมดส่วนตัว)
             if not self.private_mode:
@@ -1054,8 +7193,32 @@ class UniqueBrowser(QMainWindow):
                     print(f"Error in navigate_in_current_tab: {e}")
                     self.add_to_history(qurl.toString(), qurl.toString())
 
+    def swap_in_page(self, browser, page):
+        """สลับหน้าที่โหลดล่วงหน้าเข้ามาแทนหน้าเดิมของแท็บ (ปลั๊กอินเห็นการนำทางนี้ตอนรับหน้าเข้าแท็บ)"""
+        page.speculative = False
+        if self.plugins.has_hook('navigation') and not self.plugins.dispatch(
+                'navigation', page, page.url(), QWebEnginePage.NavigationTypeTyped, True):
+            page.deleteLater()
+            return
+        # ติดตั้งสคริปต์ผู้ใช้ของโฮสต์นี้ไว้สำหรับการนำทางครั้งต่อไปของหน้า
+        self.user_scripts.prepare(page, page.url())
+        old_page = browser.page()
+        page.setParent(browser)
+        page.main_browser = browser
+        page.setAudioMuted(False)
+        browser.setPage(page)
+        self.content_dark_mode.attach(page)
+        old_page.deleteLater()
+
+        self.update_urlbar(page.url(), browser)
+        self.tab_index.update(self, browser, title=page.title(), url=page.url().toString())
+        self.tab_tree.set_title(browser, page.title())
+        self.on_load_finished(browser)
+
     def add_to_history(self, url, title):
         """เพิ่มรายการในประวัติ"""
+        if url.startswith('unique:'):
+            return
         self.settings['history'].append({
             'url': url,
             'title': title,
@@ -1100,19 +7263,25 @@ class UniqueBrowser(QMainWindow):
         """ซูมเข้า"""
         browser = self.current_browser()
         if browser:
-            browser.setZoomFactor(min(browser.zoomFactor() + 0.1, 3.0))
+            self.set_site_zoom(browser, min(browser.zoomFactor() + 0.1, 3.0))
 
     def zoom_out(self):
         """ซูมออก"""
         browser = self.current_browser()
         if browser:
-            browser.setZoomFactor(max(browser.zoomFactor() - 0.1, 0.25))
+            self.set_site_zoom(browser, max(browser.zoomFactor() - 0.1, 0.25))
 
     def zoom_reset(self):
         """รีเซ็ตซูม"""
         browser = self.current_browser()
         if browser:
-            browser.setZoomFactor(1.0)
+            self.set_site_zoom(browser, self.site_zoom.default)
+
+    def set_site_zoom(self, browser, factor):
+        """ตั้งระดับซูมให้ทุกแท็บของไซต์เดียวกัน และจำไว้สำหรับครั้งต่อไป"""
+        factor = self.site_zoom.set(browser, factor)
+        host = browser.url().host() or browser.url().toString()
+        self.status.showMessage(f"ซูม {round(factor * 100)}%: {host}", 2000)
 
     def toggle_fullscreen(self):
         """สลับโหมดเต็มหน้าจอ"""
@@ -1138,8 +7307,8 @@ class UniqueBrowser(QMainWindow):
     def toggle_dark_mode(self):
         """สลับโหมดกลางคืน"""
         try:
-            # สลับโหมด
-            self.dark_mode = not self.dark_mode
+            # สลับโหมด (ธีมใช้ร่วมกันทุกหน้าต่าง จึงสลับจากธีมที่ใช้อยู่จริง)
+            self.dark_mode = self.theme.current != 'dark'
 
             # บันทึกการตั้งค่า
             self.settings['dark_mode'] = self.dark_mode
@@ -1149,15 +7318,12 @@ class UniqueBrowser(QMainWindow):
             self.update_theme()
             self.update_mode_label()
 
+            # อัพเดทเนื้อหาเว็บทุกหน้าทันทีโดยไม่ต้องโหลดใหม่
+            self.content_dark_mode.set_enabled(self.dark_mode)
+
             # แสดงข้อความแจ้งเตือน
             mode = "เปิด" if self.dark_mode else "ปิด"
             self.status.showMessage(f"โหมดกลางคืน: {mode}", 3000)
-
-            # อัพเดทเนื้อหาเว็บ (ถ้าต้องการ)
-            current_browser = self.current_browser()
-            if current_browser:
-                # รีเฟรชหน้าเว็บเพื่ออัพเดทสี
-                current_browser.reload()
         except Exception as e:
             print(f"Error in toggle_dark_mode: {e}")
 
@@ -1220,16 +7386,19 @@ class UniqueBrowser(QMainWindow):
         QMessageBox.information(self, 'จัดการบุ๊กมาร์ก',
                               'ระบบจัดการบุ๊กมาร์กแบบเต็มจะมาในเวอร์ชันถัดไป!')
 
+    def open_internal_page(self, name):
+        """เปิดหน้าภายใน unique://<name> (สลับไปแท็บเดิมถ้าเปิดอยู่แล้ว)"""
+        url = f"unique://{name}"
+        existing = self.tab_index.find_by_url(url, private=self.private_mode)
+        if existing:
+            existing['window'].activate_tab(existing['browser'])
+            existing['browser'].reload()
+            return
+        self.add_new_tab(QUrl(url), InternalSchemeHandler.PAGES[name])
+
     def show_history(self):
         """แสดงประวัติ"""
-        from datetime import datetime
-        history_text = ""
-
-        for item in reversed(self.settings['history'][-20:]):
-            dt = datetime.fromtimestamp(item['timestamp'])
-            history_text += f"{dt.strftime('%Y-%m-%d %H:%M')} - {item['title']}\n{item['url']}\n\n"
-
-        QMessageBox.information(self, 'ประวัติการเข้าชม', history_text or 'ไม่มีประวัติ')
+        self.open_internal_page('history')
 
     def clear_history(self):
         """ล้างประวัติ"""
@@ -1247,89 +7416,55 @@ class UniqueBrowser(QMainWindow):
 
     def clear_browsing_data(self):
         """เคลียร์ข้อมูลการท่องเว็บ"""
-        items = ['ประวัติการเข้าชม', 'คุกกี้และข้อมูลไซต์', 'แคชและไฟล์ชั่วคราว']
-
-        item, ok = QInputDialog.getItem(
-            self, 'เคลียร์ข้อมูลการท่องเว็บ',
-            'เลือกประเภทข้อมูลที่จะล้าง:', items, 0, False
-        )
-
-        if ok and item:
-            if item == 'ประวัติการเข้าชม':
-                self.settings['history'] = []
-                self.save_settings()
-                QMessageBox.information(self, 'สำเร็จ', 'ล้างประวัติเรียบร้อยแล้ว')
-            else:
-                QMessageBox.information(self, 'กำลังพัฒนา',
-                                      'ฟังก์ชันนี้จะพร้อมใช้งานในเวอร์ชันถัดไป')
-
-    def download_requested(self, download: QWebEngineDownloadItem):
-        """จัดการการดาวน์โหลด"""
-        # ตั้งค่า path เริ่มต้น
-        download_dir = self.settings.get('download_location',
-                                       QStandardPaths.writableLocation(QStandardPaths.DownloadLocation))
-        default_path = os.path.join(download_dir, download.url().fileName())
-
-        # ถามตำแหน่งบันทึก
-        path, _ = QFileDialog.getSaveFileName(
-            self, "บันทึกไฟล์", default_path,
-            "ไฟล์ทั้งหมด (*);;ไฟล์ข้อความ (*.txt);;ไฟล์รูปภาพ (*.png *.jpg *.jpeg)"
-        )
-
-        if path:
-            download.setPath(path)
-            download.accept()
-
-            # บันทึกข้อมูลดาวน์โหลด
-            self.downloads.append({
-                'path': path,
-                'url': download.url().toString(),
-                'start_time': time.time()
-            })
-
-            # แสดงสถานะ
-            self.status.showMessage(f'กำลังดาวน์โหลด: {os.path.basename(path)}')
-
-            # เชื่อมต่อสัญญาณ
-            download.finished.connect(lambda: self.download_finished(path))
-            download.downloadProgress.connect(
-                lambda bytes_received, bytes_total:
-                    self.update_download_progress(path, bytes_received, bytes_total))
-
-    def download_finished(self, path):
-        """เมื่อดาวน์โหลดเสร็จสิ้น"""
-        self.status.showMessage(f'ดาวน์โหลดเสร็จสิ้น: {os.path.basename(path)}', 5000)
-
-        # เปิดไฟล์ที่ดาวน์โหลด (ถามผู้ใช้ก่อน)
-        reply = QMessageBox.question(
-            self, 'ดาวน์โหลดเสร็จสิ้น',
-            'ต้องการเปิดไฟล์ที่ดาวน์โหลดหรือไม่?',
-            QMessageBox.Yes | QMessageBox.No,
-            QMessageBox.Yes
-        )
-
-        if reply == QMessageBox.Yes:
-            QDesktopServices.openUrl(QUrl.fromLocalFile(path))
-
-    def update_download_progress(self, path, bytes_received, bytes_total):
-        """อัพเดทความคืบหน้าการดาวน์โหลด"""
-        if bytes_total > 0:
-            percent = int((bytes_received / bytes_total) * 100)
-            self.status.showMessage(
-                f'กำลังดาวน์โหลด {os.path.basename(path)}: {percent}%', 1000)
+        if self.clear_data_dialog is None:
+            self.clear_data_dialog = ClearBrowsingDataDialog(
+                self.data_cleaner, self.settings.get('clear_data_types', ['history', 'cookies', 'cache']), self)
+            self.clear_data_dialog.cookies_button.clicked.connect(self.show_cookie_manager)
+            self.data_cleaner.finished.connect(self.browsing_data_cleared)
+        self.clear_data_dialog.show()
+        self.clear_data_dialog.raise_()
+
+    def browsing_data_cleared(self, summary):
+        """จำชนิดข้อมูลที่เลือกไว้สำหรับครั้งถัดไป"""
+        self.settings['clear_data_types'] = self.clear_data_dialog.selected_types()
+        self.save_settings()
+        self.status.showMessage("ล้างข้อมูลการท่องเว็บเรียบร้อยแล้ว", 3000)
+
+    def download_added(self, item):
+        """แสดงแผงดาวน์โหลดเมื่อเริ่มดาวน์โหลดจากหน้าต่างนี้"""
+        if self.isActiveWindow():
+            self.downloads_panel.show()
+        self.status.showMessage(f'กำลังดาวน์โหลด: {os.path.basename(item.path)}', 3000)
+
+    def download_changed(self, item):
+        """แจ้งเมื่อดาวน์โหลดเสร็จ (ไม่ถามด้วยกล่องข้อความเพื่อไม่ขัดการใช้งาน)"""
+        if item.state == 'completed' and item.check in ('', 'hashing'):
+            self.status.showMessage(f'ดาวน์โหลดเสร็จสิ้น: {os.path.basename(item.path)}', 5000)
+        elif item.state == 'failed':
+            self.status.showMessage(f'ดาวน์โหลดล้มเหลว: {os.path.basename(item.path)} ({item.error})', 5000)
+
+    def download_checked(self, item):
+        """แจ้งผลตรวจ SHA-256 และการใช้ไฟล์ร่วมกับไฟล์ที่มีอยู่แล้ว"""
+        name = os.path.basename(item.path)
+        if item.check == 'mismatch':
+            self.status.showMessage(f'SHA-256 ของ {name} ไม่ตรงกับค่าที่ระบุ ไฟล์อาจเสียหายหรือถูกแก้ไข', 10000)
+        elif item.check == 'ok':
+            self.status.showMessage(f'SHA-256 ของ {name} ตรงกัน', 5000)
+        elif item.duplicate_of:
+            self.status.showMessage(f'{name} เหมือนกับ {os.path.basename(item.duplicate_of)} จึงใช้ไฟล์ร่วมกัน', 5000)
 
     def show_downloads(self):
-        """แสดงรายการดาวน์โหลด"""
-        if not self.downloads:
-            QMessageBox.information(self, 'ดาวน์โหลด', 'ไม่มีรายการดาวน์โหลด')
-            return
-
-        downloads_text = "\n".join([
-            f"{os.path.basename(d['path'])} - {d['url']}"
-            for d in self.downloads[-10:]
-        ])
+        """แสดง/ซ่อนแผงดาวน์โหลด"""
+        self.downloads_panel.setVisible(not self.downloads_panel.isVisible())
 
-        QMessageBox.information(self, 'ดาวน์โหลดล่าสุด', downloads_text)
+    def toggle_segmented_downloads(self):
+        """เปิด/ปิดการดาวน์โหลดไฟล์ใหญ่แบบแบ่งช่วงหลายการเชื่อมต่อ"""
+        downloads = self.settings.setdefault('downloads', {})
+        downloads['segmented'] = not downloads.get('segmented', False)
+        self.save_settings()
+        self.download_manager.configure(downloads, self.settings.get('download_location'))
+        status = "เปิด" if downloads['segmented'] else "ปิด"
+        self.status.showMessage(f"ดาวน์โหลดไฟล์ใหญ่แบบหลายการเชื่อมต่อ: {status}", 3000)
 
     def print_page(self):
         """พิมพ์หน้าเว็บ"""
@@ -1363,15 +7498,62 @@ class UniqueBrowser(QMainWindow):
             browser.page().save(path)
             self.status.showMessage(f'บันทึกหน้าเว็บเรียบร้อยที่ {path}', 5000)
 
+    def is_private_browser(self, browser):
+        """ตรวจว่าแท็บนี้เป็นแท็บส่วนตัวหรือไม่ (แท็บปกติใช้ profile หลักเสมอ)"""
+        return self.private_mode or browser.page().profile() is not QWebEngineProfile.defaultProfile()
+
+    def archive_current_page(self):
+        """บันทึกหน้าปัจจุบันลงคลังออฟไลน์"""
+        browser = self.current_browser()
+        if browser:
+            self.archive_tabs([browser])
+
+    def archive_all_tabs(self):
+        """บันทึกทุกแท็บลงคลังออฟไลน์ (บันทึกพร้อมกันตามจำนวนที่จำกัด)"""
+        self.archive_tabs([self.tabs.widget(i) for i in range(self.tabs.count())])
+
+    def archive_tabs(self, browsers):
+        """เพิ่มแท็บในคิวบันทึก (ข้ามแท็บส่วนตัวและหน้าที่ไม่ใช่เว็บ)"""
+        count = 0
+        for browser in browsers:
+            if browser is None or self.is_private_browser(browser):
+                continue
+            if browser.url().scheme() not in ('http', 'https'):
+                continue
+            self.offline_archive.request_save(browser.page())
+            count += 1
+        if count:
+            self.status.showMessage(f"กำลังบันทึก {count} หน้าไว้อ่านออฟไลน์...", 3000)
+        else:
+            self.status.showMessage("ไม่มีหน้าที่บันทึกได้ (ไม่รวมแท็บส่วนตัว)", 3000)
+
+    def archive_saved(self, new_bytes, total_bytes, title):
+        """เมื่อบันทึกหน้าลงคลังเสร็จ"""
+        self.status.showMessage(f"บันทึกไว้อ่านออฟไลน์: {title} "
+                                f"(ข้อมูลใหม่ {new_bytes / 1024:.0f} KB จาก {total_bytes / 1024:.0f} KB)", 5000)
+
+    def archive_failed(self, message, title):
+        """เมื่อบันทึกหน้าลงคลังไม่สำเร็จ"""
+        print(f"Error archiving page {title}: {message}")
+        self.status.showMessage(f"บันทึกไว้อ่านออฟไลน์ไม่สำเร็จ: {title}", 5000)
+
+    def open_archived(self, entry_id):
+        """เปิดหน้าที่บันทึกไว้ในคลังในแท็บใหม่"""
+        try:
+            path = self.offline_archive.assemble(entry_id)
+            entry = self.offline_archive.entries[entry_id]
+            self.add_new_tab(QUrl.fromLocalFile(path), entry['title'])
+        except (KeyError, OSError, ValueError) as e:
+            print(f"Error opening archived page: {e}")
+            self.status.showMessage("ไม่สามารถเปิดหน้าที่บันทึกไว้ได้", 3000)
+
     def find_in_page(self):
         """ค้นหาในหน้า"""
         browser = self.current_browser()
         if not browser:
             return
 
-        text, ok = QInputDialog.getText(self, 'ค้นหาในหน้า', 'คำค้นหา:')
-        if ok and text:
-            browser.findText(text)
+        self.find_bar.open()
 
     def toggle_dev_tools(self):
         """สลับเครื่องมือนักพัฒนา"""
@@ -1387,20 +7569,126 @@ class UniqueBrowser(QMainWindow):
             browser.page().runJavaScript("console.log('เปิดคอนโซล JavaScript');")
             self.toggle_dev_tools()
 
+    def show_throttling_stats(self):
+        """แสดงสถิติการพักแท็บพื้นหลัง"""
+        stats = self.throttler.stats()
+        QMessageBox.information(self, 'การพักแท็บพื้นหลัง',
+                                f"แท็บทั้งหมด: {stats['tabs']}\n"
+                                f"แท็บที่ถูกแช่แข็ง: {stats['frozen']}\n"
+                                f"แท็บที่ปักหมุด: {stats['pinned']}\n"
+                                f"เวลา CPU ที่ประหยัดได้ (โดยประมาณ): {stats['cpu_saved']:.1f} วินาที")
+
+    def show_cookie_manager(self):
+        """แสดงหน้าต่างจัดการคุกกี้ของ profile หลัก"""
+        dialog = CookieManagerDialog(self.cookie_manager, self)
+        dialog.exec_()
+
+    def show_cache_stats(self):
+        """แสดงแผงสถิติแคช HTTP ของ profile ของแท็บปัจจุบัน"""
+        browser = self.current_browser()
+        profile = browser.page().profile() if browser else QWebEngineProfile.defaultProfile()
+        dialog = CacheStatsDialog(self.cache_policy, profile, self.network_log, self)
+        dialog.exec_()
+
+    def show_speculation_stats(self):
+        """แสดงสถิติการเชื่อมต่อและโหลดหน้าล่วงหน้า"""
+        stats = self.predictor.stats()
+        QMessageBox.information(self, 'การโหลดหน้าล่วงหน้า',
+                                f"Preconnect: {stats['preconnects']} ครั้ง "
+                                f"(ตรง {stats['preconnect_hits']}, พลาด {stats['preconnect_misses']})\n"
+                                f"Prerender: {stats['prerenders']} ครั้ง "
+                                f"(ตรง {stats['prerender_hits']} โดยสลับหน้า {stats['prerender_swaps']}, "
+                                f"พลาด {stats['prerender_misses']})\n"
+                                f"ข้ามเพราะเกินโควตาหรือหน่วยความจำไม่พอ: {stats['skipped_by_cap']} ครั้ง")
+
+    def toggle_content_blocking(self):
+        """เปิด/ปิดการบล็อกโฆษณาและตัวติดตาม"""
+        self.settings['content_blocking'] = not self.settings.get('content_blocking', True)
+        self.save_settings()
+        self.setup_content_blocking()
+        status = "เปิด" if self.content_blocker.enabled else "ปิด"
+        self.status.showMessage(f"การบล็อกโฆษณา: {status}", 3000)
+
+    def reload_filter_lists(self):
+        """โหลดรายการตัวกรองจากโฟลเดอร์ใหม่อีกครั้ง"""
+        self.content_blocker.load_filters()
+        if self.content_blocker.is_compiling():
+            self.status.showMessage("กำลังคอมไพล์รายการตัวกรองในเบื้องหลัง...", 3000)
+        else:
+            self.status.showMessage(f"โหลดกฎตัวกรอง {self.content_blocker.engine.rule_count} รายการ", 3000)
+
+    def open_filters_folder(self):
+        """เปิดโฟลเดอร์ที่เก็บรายการตัวกรอง (วางไฟล์ EasyList *.txt ไว้ที่นี่)"""
+        directory = RequestBlocker.filters_dir()
+        os.makedirs(directory, exist_ok=True)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(directory))
+
+    def show_user_scripts(self):
+        """แสดงสคริปต์ผู้ใช้และเวลาที่แต่ละสคริปต์ใช้"""
+        QMessageBox.information(self, 'สคริปต์ผู้ใช้', self.user_scripts.stats_text())
+
+    def reload_user_scripts(self):
+        """โหลดสคริปต์ผู้ใช้จากโฟลเดอร์ใหม่ (มีผลตั้งแต่การนำทางครั้งถัดไป)"""
+        count = self.user_scripts.load()
+        self.status.showMessage(f"โหลดสคริปต์ผู้ใช้ {count} รายการ", 3000)
+
+    def open_user_scripts_folder(self):
+        """เปิดโฟลเดอร์ที่เก็บสคริปต์ผู้ใช้ (วางไฟล์ *.user.js ไว้ที่นี่)"""
+        directory = UserScriptEngine.scripts_dir()
+        os.makedirs(directory, exist_ok=True)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(directory))
+
+    def export_network_log(self):
+        """ส่งออกบันทึกคำขอเครือข่ายเป็นไฟล์ HAR"""
+        # เก็บเวลาของแท็บปัจจุบันก่อน (ผลจะมาถึงก่อนบันทึกไฟล์เนื่องจากกล่องโต้ตอบรอผู้ใช้)
+        self.collect_resource_timing(self.current_browser())
+        default_path = os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation),
+            time.strftime("unique-browser-%Y%m%d-%H%M%S.har")
+        )
+        path, _ = QFileDialog.getSaveFileName(self, "ส่งออกบันทึกเครือข่าย", default_path, "HTTP Archive (*.har)")
+        if not path:
+            return
+        try:
+            count = self.network_log.export_har(path, self.app_name, self.version)
+            self.status.showMessage(f"ส่งออกคำขอ {count} รายการไปยัง {os.path.basename(path)}", 5000)
+        except OSError as e:
+            QMessageBox.warning(self, "ส่งออกบันทึกเครือข่าย", f"ไม่สามารถบันทึกไฟล์ได้: {e}")
+
+    def clear_network_log(self):
+        """ล้างบันทึกคำขอเครือข่าย"""
+        self.network_log.clear()
+        self.status.showMessage("ล้างบันทึกเครือข่ายแล้ว", 3000)
+
     def show_extensions(self):
-        """แสดงส่วนขยาย"""
-        QMessageBox.information(self, 'ส่วนขยาย',
-                              'ระบบส่วนขยายจะมาในเวอร์ชันถัดไป!')
+        """แสดงรายการปลั๊กอิน"""
+        PluginsDialog(self.plugins, self, self).exec_()
+
+    def plugin_disabled(self, name, reason):
+        """ปลั๊กอินถูกปิดเพราะช้าหรือผิดพลาด: แจ้งเตือนและไม่เปิดอีกในครั้งถัดไป"""
+        self.status.showMessage(f"ปิดปลั๊กอิน {name}: {reason}", 10000)
+        extensions = self.settings.get('extensions', [])
+        if name in extensions:
+            self.settings['extensions'] = [extension for extension in extensions if extension != name]
+            self.save_settings()
 
     def show_settings(self):
         """แสดงหน้าตั้งค่า"""
-        QMessageBox.information(self, 'ตั้งค่า',
-                              'หน้าตั้งค่าแบบเต็มจะมาในเวอร์ชันถัดไป!')
+        self.open_internal_page('settings')
 
     def setup_proxy(self):
         """ตั้งค่า proxy"""
-        QMessageBox.information(self, 'ตั้งค่า Proxy',
-                              'การตั้งค่า Proxy จะมาในเวอร์ชันถัดไป!')
+        dialog = ProxySettingsDialog(self.proxy_manager, self.settings.get('proxy', {}), self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        previous = self.proxy_manager.config('mode')
+        self.settings['proxy'] = dialog.proxy_settings()
+        self.save_settings()
+        self.setup_proxy_config()
+        if 'pac' in (previous, self.proxy_manager.config('mode')):
+            # Chromium รับสคริปต์ PAC ได้เฉพาะตอนเริ่มโปรแกรม
+            QMessageBox.information(self, 'ตั้งค่า Proxy',
+                                  'การเปลี่ยนสคริปต์ PAC จะมีผลกับหน้าเว็บหลังเริ่มโปรแกรมใหม่')
 
     def show_main_menu(self):
         """แสดงเมนูหลัก"""
@@ -1429,22 +7717,7 @@ class UniqueBrowser(QMainWindow):
 
     def show_about(self):
         """แสดงเกี่ยวกับโปรแกรม"""
-        about_text = f"""
-        <b>{self.app_name}</b><br><br>
-        เวอร์ชัน {self.version}<br>
-        สร้างด้วย Python และ PyQt5<br><br>
-        คุณสมบัติ:<br>
-        - ระบบแท็บขั้นสูง<br>
-        - โหมดส่วนตัว<br>
-        - โหมดกลางคืน<br>
-        - การจัดการบุ๊กมาร์ก<br>
-        - ประวัติการเข้าชม<br>
-        - ระบบดาวน์โหลด<br>
-        - เครื่องมือนักพัฒนา<br><br>
-        © 2023 ผู้พัฒนาซอฟต์แวร์
-        """
-
-        QMessageBox.about(self, "เกี่ยวกับโปรแกรม", about_text)
+        self.open_internal_page('about')
 
     def check_for_updates(self):
         """ตรวจสอบอัปเดต"""
@@ -1461,33 +7734,7 @@ class UniqueBrowser(QMainWindow):
 
     def show_shortcuts(self):
         """แสดงปุ่มลัด"""
-        shortcuts = """
-        <b>ปุ่มลัดหลัก:</b><br>
-        Ctrl+T - แท็บใหม่<br>
-        Ctrl+W - ปิดแท็บปัจจุบัน<br>
-        Ctrl+Tab - แท็บถัดไป<br>
-        Ctrl+Shift+Tab - แท็บก่อนหน้า<br>
-        Ctrl+1-8 - ไปแท็บที่ 1-8<br>
-        Ctrl+9 - ไปแท็บสุดท้าย<br>
-        Alt+Left - ย้อนกลับ<br>
-        Alt+Right - ไปข้างหน้า<br>
-        F5 - รีเฟรช<br>
-        Ctrl+F - ค้นหาในหน้า<br>
-        F11 - โหมดเต็มหน้าจอ<br>
-        Ctrl+Shift+D - โหมดกลางคืน<br>
-        Ctrl+Shift+P - โหมดส่วนตัว<br>
-        F12 - เครื่องมือนักพัฒนา<br><br>
-        <b>การนำทาง:</b><br>
-        Alt+Home - หน้าแรก<br>
-        Ctrl+L - โฟกัสที่แถบที่อยู่<br>
-        Ctrl+Enter - เพิ่ม www. และ .com<br><br>
-        <b>อื่นๆ:</b><br>
-        Ctrl+Shift+Del - เคลียร์ข้อมูลการท่องเว็บ<br>
-        Ctrl+, - ตั้งค่า<br>
-        F1 - วิธีใช้
-        """
-
-        QMessageBox.information(self, "ปุ่มลัด", shortcuts)
+        self.open_internal_page('shortcuts')
 
     def new_window(self):
         """หน้าต่างใหม่"""
@@ -1557,6 +7804,13 @@ class UniqueBrowser(QMainWindow):
 
         if reply == QMessageBox.Yes:
             # ทำความสะอาดทุกแท็บก่อนปิดโปรแกรม
+            self.tab_index.remove_window(self)
+            self.internal_pages.remove_window(self)
+            self.predictor.discard_spare()
+            self.cookie_manager.save_ages(prune=True)
+            self.download_manager.save_state()
+            if self.site_zoom.save_timer.isActive():
+                self.site_zoom.save()
             self.cleanup_all_tabs()
             event.accept()
         else:
@@ -1597,20 +7851,13 @@ class UniqueBrowser(QMainWindow):
                         document.querySelectorAll('source').forEach(s => {
                             s.src = '';
                         });
-
-                        // ล้างแคช
-                        if (window.caches) {
-                            caches.keys().then(function(names) {
-                                for (let name of names) caches.delete(name);
-                            });
-                        }
                     """)
 
                     # ล้างหน่วยความจำ
                     browser.page().deleteLater()
 
-            # ล้างแคชของ WebEngine
-            QWebEngineProfile.defaultProfile().clearHttpCache()
+            # ไม่ล้างแคช HTTP ตอนปิดโปรแกรม เพื่อให้การเข้าชมครั้งถัดไปเร็วขึ้น
+            # (ขนาดถูกจำกัดโดย HttpCachePolicy และล้างได้จากแผงแคช HTTP)
 
         except Exception as e:
             print(f"Error cleaning up tabs: {e}")
@@ -1753,9 +8000,6 @@ MimeType=text/html;text/xml;application/xhtml+xml;application/xml;application/rs
             font.setFamily("Noto Sans")  # ฟอนต์ที่มีในระบบ Linux ส่วนใหญ่
             QApplication.setFont(font)
 
-            # ปรับแต่งการใช้งานหน่วยความจำ
-            QWebEngineProfile.defaultProfile().setHttpCacheMaximumSize(100 * 1024 * 1024)  # 100MB cache
-
             QMessageBox.information(self, "สำเร็จ", "ปรับแต่งเบราว์เซอร์สำหรับ Linux แล้ว")
 
         except Exception as e:
@@ -1839,6 +8083,9 @@ MimeType=text/html;text/xml;application/xhtml+xml;application/xml;application/rs
 
 def main():
     """ฟังก์ชันหลักสำหรับการรันแอปพลิเคชัน"""
+    # ลงทะเบียน scheme ของหน้าภายใน (ต้องทำก่อนสร้าง QApplication)
+    InternalSchemeHandler.register_scheme()
+
     app = QApplication(sys.argv)
 
     # ตั้งค่าฟอนต์